@@ -0,0 +1,128 @@
+"""Startup time of ``main.py`` for commands that do little or no real work.
+
+Each command is run in a fresh interpreter with ``-X importtime``, so the
+numbers include everything a user waits for before the command starts::
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget 0.5 --runs 10
+
+Exits with status 1 when a command's median wall time exceeds ``--budget`` or
+when it imports a heavy module it does not need itself.
+"""
+
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import polars as pl
+from typer import Exit, Option, Typer
+
+from src.config import PROJECT_ROOT, logger
+
+# Arguments of each command, ``{tmp}`` is a fresh temporary directory, and the
+# heavy modules it needs.
+COMMANDS = (
+    (("--help",), ()),
+    (("view-schema", "--help"), ()),
+    (("get-replies", "--help"), ()),
+    (("rapidapi-tweets", "--help"), ()),
+    (("view-schema", "--db", "{tmp}/tweets.duckdb"), ("duckdb", "polars")),
+)
+
+# Top-level packages that must only be imported by the commands using them.
+HEAVY_MODULES = ("polars", "duckdb", "pocketbase", "requests", "tweety", "twikit")
+
+cli = Typer()
+
+
+def run_command(args: tuple[str, ...]) -> tuple[float, dict[str, int]]:
+    """Run ``main.py`` once, returning its wall time and per-module import time.
+
+    Returns:
+        tuple[float, dict[str, int]]: Seconds until exit and the cumulative
+        import time in microseconds of every package, by its top-level name.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", str(PROJECT_ROOT / "main.py"), *args],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(f"main.py {' '.join(args)} failed:\n{process.stderr}")
+
+    modules: dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        name = name.strip().split(".")[0]
+        modules[name] = max(modules.get(name, 0), int(cumulative))
+    return elapsed, modules
+
+
+@cli.command()
+def main(
+    runs: int = Option(5, help="Runs per command, the median is reported"),
+    budget: float = Option(1.0, help="Seconds a command may take to start"),
+    top: int = Option(5, help="Slowest imports listed per command"),
+    output: Path = Option(None, help="Also write the results to this CSV file"),
+) -> None:
+    """Time how long trivial ``main.py`` commands take to start."""
+    rows = []
+    failed = False
+    for template, needs in COMMANDS:
+        command = " ".join(template)
+        times, modules = [], {}
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as tmp:
+                args = tuple(arg.format(tmp=tmp) for arg in template)
+                elapsed, modules = run_command(args)
+            times.append(elapsed)
+        median = statistics.median(times)
+        heavy = sorted(set(HEAVY_MODULES).difference(needs) & set(modules))
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)
+        rows.append(
+            {
+                "command": command,
+                "median": round(median, 3),
+                "best": round(min(times), 3),
+                "heavy": ", ".join(heavy),
+                "slowest": ", ".join(
+                    f"{name} {us / 1000:.0f}ms" for name, us in slowest[:top]
+                ),
+            }
+        )
+        if median > budget:
+            logger.error(f"{command} took {median:.2f}s, over the {budget}s budget")
+            failed = True
+        if heavy:
+            logger.error(f"{command} imported {', '.join(heavy)}")
+            failed = True
+
+    table = pl.DataFrame(rows)
+    with pl.Config(
+        tbl_rows=-1,
+        tbl_width_chars=160,
+        fmt_str_lengths=100,
+        tbl_hide_dataframe_shape=True,
+    ):
+        print(table)
+
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        table.write_csv(output)
+        logger.success(f"Results written to {output}")
+    if failed:
+        raise Exit(1)
+
+
+if __name__ == "__main__":
+    cli()
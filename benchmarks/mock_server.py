@@ -0,0 +1,349 @@
+"""Local stand-in for the paid APIs and PocketBase, for offline benchmarks.
+
+Serves the endpoints the fetchers and writers call:
+
+- twitter154 ``/search/search/continuation`` and ``/tweet/replies/continuation``
+- twitter241 ``/tweet-by-ids``
+- PocketBase ``/api/admins/auth-with-password``, ``/api/batch`` and the
+  ``/api/collections/<name>/records`` list/create/update endpoints
+
+Tweets are generated from ``data/schemas/old-bird-search-continuation.json``
+plus the fields ``src.models`` requires, so staged data validates. Latency,
+rate limits and error rates are configurable through ``MockConfig``.
+
+Run standalone with ``python -m benchmarks.mock_server --port 8765``.
+"""
+
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pydantic import BaseModel
+from typer import Option, Typer
+
+from src.config import DATA_DIR, logger
+
+SCHEMA_FILE = DATA_DIR / "schemas" / "old-bird-search-continuation.json"
+
+# Fields the Tweet/User models require that the search schema leaves out.
+EXTRA_TWEET_FIELDS = {
+    "bookmark_count": 0,
+    "views": None,
+    "in_reply_to_status_id": None,
+    "retweet_tweet_id": None,
+    "quoted_status_id": None,
+    "community_note": None,
+    "source": "Twitter Web App",
+}
+EXTRA_USER_FIELDS = {"favourites_count": 0, "is_blue_verified": False, "listed_count": 0}
+WORDS = ["justice", "protest", "george", "floyd", "march", "police", "reform", "today"]
+HASHTAGS = ["#BlackLivesMatter", "#BLM", "#blm", "#JusticeForGeorge", "#news"]
+PB_FILTER = re.compile(r'(\w+)\s*=\s*("(?:[^"\\]|\\.)*")')
+
+
+class MockConfig(BaseModel):
+    """Behaviour of the mock server.
+
+    Args:
+        latency (float): Seconds added to every response.
+        rate_limit (float | None): Requests per second served before
+            answering 429, ``None`` for no limit.
+        error_rate (float): Fraction of requests answered with a 503.
+        page_size (int): Tweets per search or replies page.
+        pages (int): Continuation pages per query before the token runs out.
+        seed (int): Seed of the payload generator.
+    """
+
+    latency: float = 0.0
+    rate_limit: float | None = None
+    error_rate: float = 0.0
+    page_size: int = 20
+    pages: int = 5
+    seed: int = 0
+
+
+class TweetFactory:
+    """Generate tweets shaped like the Oldbird search schema."""
+
+    def __init__(self, seed: int = 0) -> None:
+        with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        self.schema = schema["properties"]["results"]["items"]
+        self.random = random.Random(seed)
+        self._ids = itertools.count(1_250_000_000_000_000_000)
+        self._lock = threading.Lock()
+
+    def tweet(self, tweet_id: str | None = None) -> dict:
+        with self._lock:
+            tweet = self._sample(self.schema, "tweet")
+            if tweet_id is not None:
+                tweet["tweet_id"] = tweet_id
+        tweet.update(EXTRA_TWEET_FIELDS)
+        tweet["conversation_id"] = tweet["tweet_id"]
+        tweet["user"].update(EXTRA_USER_FIELDS)
+        return tweet
+
+    def tweets(self, n: int) -> list[dict]:
+        return [self.tweet() for _ in range(n)]
+
+    def _sample(self, schema: dict, name: str):
+        kind = schema.get("type")
+        if kind == "object":
+            return {
+                key: self._sample(value, key)
+                for key, value in schema.get("properties", {}).items()
+            }
+        if kind == "array":
+            return [self._sample(schema["items"], name) for _ in range(3)]
+        if kind == "integer":
+            if name == "timestamp":
+                return 1_590_000_000 + self.random.randrange(5_000_000)
+            return self.random.randrange(10_000)
+        if kind == "boolean":
+            return self.random.random() < 0.1
+        if kind == "string":
+            return self._string(name)
+        return None
+
+    def _string(self, name: str) -> str:
+        if name in ("tweet_id", "user_id"):
+            return str(next(self._ids))
+        if name == "creation_date":
+            day = self.random.randrange(1, 29)
+            return f"Mon Jun {day:02d} 12:00:00 +0000 2020"
+        if name == "text":
+            words = self.random.choices(WORDS, k=12) + self.random.choices(HASHTAGS, k=2)
+            self.random.shuffle(words)
+            return " ".join(words)
+        if name == "language":
+            return "en"
+        return f"{name}-{self.random.randrange(1_000_000)}"
+
+
+class MockState:
+    def __init__(self, config: MockConfig) -> None:
+        self.config = config
+        self.factory = TweetFactory(config.seed)
+        self.random = random.Random(config.seed)
+        self.collections: dict[str, dict[str, dict]] = {}
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self._record_ids = itertools.count(1)
+        self._tokens = config.rate_limit or 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def admit(self) -> int | None:
+        """Return an error status for this request, or ``None`` to serve it."""
+        with self._lock:
+            self.requests += 1
+            if self.config.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.config.rate_limit,
+                    self._tokens + (now - self._updated) * self.config.rate_limit,
+                )
+                self._updated = now
+                if self._tokens < 1:
+                    self.rate_limited += 1
+                    return 429
+                self._tokens -= 1
+            if self.random.random() < self.config.error_rate:
+                self.errors += 1
+                return 503
+        return None
+
+    def create(self, collection: str, body: dict) -> dict:
+        with self._lock:
+            record = {"id": f"r{next(self._record_ids):014d}", **body}
+            self.collections.setdefault(collection, {})[record["id"]] = record
+        return record
+
+    def update(self, collection: str, record_id: str, body: dict) -> dict | None:
+        with self._lock:
+            record = self.collections.get(collection, {}).get(record_id)
+            if record is not None:
+                record.update(body)
+        return record
+
+    def query(self, collection: str, params: dict) -> dict:
+        records = list(self.collections.get(collection, {}).values())
+        wanted: dict[str, set] = {}
+        for field, value in PB_FILTER.findall(params.get("filter", "")):
+            wanted.setdefault(field, set()).add(json.loads(value))
+        if wanted:
+            records = [
+                r for r in records if any(str(r.get(f)) in v for f, v in wanted.items())
+            ]
+
+        page = int(params.get("page", 1))
+        per_page = int(params.get("perPage", 30))
+        items = records[(page - 1) * per_page : page * per_page]
+        return {
+            "page": page,
+            "perPage": per_page,
+            "totalItems": len(records),
+            "totalPages": -(-len(records) // per_page),
+            "items": items,
+        }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockServer"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PATCH(self) -> None:
+        self._handle("PATCH")
+
+    def _handle(self, method: str) -> None:
+        state = self.server.state
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("content-length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        if state.config.latency:
+            time.sleep(state.config.latency)
+        status = state.admit()
+        if status is not None:
+            return self._send(status, {"message": "mock error"}, retry_after=1)
+
+        path = url.path
+        if path.endswith("/continuation") or path == "/search/search":
+            return self._send(200, self._page(path, params))
+        if path == "/tweet-by-ids":
+            return self._send(200, self._tweets_by_ids(params))
+        if path == "/api/admins/auth-with-password":
+            return self._send(200, {"token": "mock-token", "admin": {"id": "admin"}})
+        if path == "/api/batch" and method == "POST":
+            responses = [
+                {"status": 200, "body": self._pb(r["method"], r["url"], r.get("body"))}
+                for r in body["requests"]
+            ]
+            return self._send(200, responses)
+        if path.startswith("/api/collections/"):
+            return self._send(200, self._pb(method, self.path, body, params))
+        self._send(404, {"message": "not found"})
+
+    def _page(self, path: str, params: dict) -> dict:
+        config = self.server.state.config
+        token = params.get("continuation_token") or ""
+        page = int(token[5:]) if token.startswith("page-") else 0
+
+        key = "replies" if "replies" in path else "results"
+        data: dict = {key: self.server.state.factory.tweets(config.page_size)}
+        if page + 1 < config.pages:
+            data["continuation_token"] = f"page-{page + 1}"
+        return data
+
+    def _tweets_by_ids(self, params: dict) -> dict:
+        factory = self.server.state.factory
+        results = []
+        for tweet_id in params.get("tweetIds", "").split(","):
+            tweet = factory.tweet(tweet_id)
+            results.append(
+                {
+                    "result": {
+                        "rest_id": tweet_id,
+                        "legacy": {
+                            "full_text": tweet["text"],
+                            "created_at": tweet["creation_date"],
+                            "favorite_count": tweet["favorite_count"],
+                            "retweet_count": tweet["retweet_count"],
+                            "reply_count": tweet["reply_count"],
+                            "quote_count": tweet["quote_count"],
+                            "lang": tweet["language"],
+                        },
+                    }
+                }
+            )
+        return {"result": {"tweetResult": results}}
+
+    def _pb(self, method: str, path: str, body: dict | None, params: dict | None = None):
+        state = self.server.state
+        parts = urlparse(path).path.strip("/").split("/")
+        # api / collections / <name> / records [/ <id>]
+        collection = parts[2]
+        if method == "GET":
+            return state.query(collection, params or {})
+        if method == "PATCH":
+            return state.update(collection, parts[4], body or {})
+        return state.create(collection, body or {})
+
+    def _send(self, status: int, data, retry_after: int | None = None) -> None:
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(payload)))
+        if status == 429 and retry_after is not None:
+            self.send_header("retry-after", str(retry_after))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MockServer(ThreadingHTTPServer):
+    """Threaded mock server, usable as a context manager on a free port.
+
+    Args:
+        config (MockConfig | None): Latency, rate limit and error settings.
+        port (int): Port to bind, ``0`` for any free port.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: MockConfig | None = None, port: int = 0) -> None:
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.state = MockState(config or MockConfig())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+cli = Typer()
+
+
+@cli.command()
+def serve(
+    port: int = Option(8765, help="Port to listen on"),
+    latency: float = Option(0.0, help="Seconds added to every response"),
+    rate_limit: float = Option(None, help="Requests/sec before answering 429"),
+    error_rate: float = Option(0.0, help="Fraction of requests answered with 503"),
+) -> None:
+    """Serve the mock APIs until interrupted."""
+    config = MockConfig(latency=latency, rate_limit=rate_limit, error_rate=error_rate)
+    server = MockServer(config, port=port)
+    logger.info(f"Mock Twitter/PocketBase server on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,223 @@
+"""Offline throughput benchmarks for the fetch, stage, ingest and DuckDB paths.
+
+Every benchmark runs against ``benchmarks.mock_server`` and a temporary
+directory, so no paid API, PocketBase instance or project data is touched::
+
+    python -m benchmarks.run                      # everything
+    python -m benchmarks.run --only fetch --latency 0.05 --error-rate 0.02
+    python -m benchmarks.run --output reports/bench.json
+
+Results are printed as a table and can be saved as JSON to compare runs.
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import polars as pl
+from pydantic import BaseModel
+from typer import Option, Typer
+
+from benchmarks.mock_server import MockConfig, MockServer
+from src.config import logger
+from src.db.database import DB, TWEET_COLUMNS
+from src.db.membership import MembershipIndex
+from src.db.pb_warehouse import PBWriter
+from src.db.staging import SegmentReader, SegmentWriter
+from src.pipeline import IngestPipeline
+from src.scraper.RapidApi import RapidApi
+from src.utils.get_tweets_replies import get_tweet_replies
+
+
+class BenchResult(BaseModel):
+    name: str
+    items: int
+    unit: str
+    seconds: float
+    requests: int = 0
+
+    @property
+    def per_sec(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+
+def bench_fetch_replies(server: MockServer, workdir: Path, tweets: int) -> BenchResult:
+    # A temporary index, so mock replies never reach the project's seen index.
+    index = MembershipIndex("tweets", directory=workdir / "membership")
+    before = server.state.requests
+    with SegmentWriter(workdir / "replies", prefix="replies", index=index) as writer:
+        stats = get_tweet_replies(
+            [str(i) for i in range(tweets)],
+            writer.directory,
+            base_url=server.url,
+            concurrency=8,
+            rate=1_000.0,
+            writer=writer,
+        )
+    return BenchResult(
+        name="fetch: twitter154 replies",
+        items=stats.replies,
+        unit="tweets",
+        seconds=stats.elapsed,
+        requests=server.state.requests - before,
+    )
+
+
+def bench_fetch_by_ids(server: MockServer, workdir: Path, batches: int) -> BenchResult:
+    api = RapidApi(api_key="x" * 50, base_url=server.url, rate=1_000.0)
+    ids = [[str(i * 250 + j) for j in range(250)] for i in range(batches)]
+    fetched = 0
+    before = server.state.requests
+
+    def count(result) -> None:
+        nonlocal fetched
+        fetched += len(result.tweet_ids) if result.ok else 0
+
+    start = time.perf_counter()
+    api.run_batches(ids, count, concurrency=4)
+    return BenchResult(
+        name="fetch: twitter241 by IDs",
+        items=fetched,
+        unit="tweets",
+        seconds=time.perf_counter() - start,
+        requests=server.state.requests - before,
+    )
+
+
+def bench_stage(server: MockServer, workdir: Path, records: int) -> BenchResult:
+    tweets = server.state.factory.tweets(records)
+    start = time.perf_counter()
+    with SegmentWriter(workdir / "stage", prefix="bench") as writer:
+        writer.write_many(tweets)
+    return BenchResult(
+        name="stage: segment write",
+        items=records,
+        unit="tweets",
+        seconds=time.perf_counter() - start,
+    )
+
+
+def bench_stage_read(server: MockServer, workdir: Path, records: int) -> BenchResult:
+    if not (workdir / "stage").exists():
+        bench_stage(server, workdir, records)
+    start = time.perf_counter()
+    read = sum(len(batch) for batch in SegmentReader(workdir / "stage").iter_batches())
+    return BenchResult(
+        name="stage: segment read",
+        items=read,
+        unit="tweets",
+        seconds=time.perf_counter() - start,
+    )
+
+
+def bench_ingest(server: MockServer, workdir: Path, records: int) -> BenchResult:
+    staging = workdir / "ingest"
+    with SegmentWriter(staging, prefix="bench") as writer:
+        writer.write_many(server.state.factory.tweets(records))
+
+    before = server.state.requests
+    with PBWriter(server.url, concurrency=8, batch_size=50) as pb_writer:
+        stats = IngestPipeline(pb_writer, workers=2).run(staging)
+    return BenchResult(
+        name="ingest: validate + PocketBase",
+        items=stats.validated,
+        unit="tweets",
+        seconds=stats.elapsed,
+        requests=server.state.requests - before,
+    )
+
+
+def bench_duckdb(server: MockServer, workdir: Path, records: int) -> BenchResult:
+    factory = server.state.factory
+    rows = []
+    for tweet in factory.tweets(records):
+        row = dict.fromkeys(TWEET_COLUMNS)
+        row.update(
+            id=tweet["tweet_id"],
+            text=tweet["text"],
+            retweet_count=tweet["retweet_count"],
+            like_count=tweet["favorite_count"],
+            lang=tweet["language"],
+        )
+        rows.append(row)
+
+    db = DB(workdir / "bench.duckdb")
+    start = time.perf_counter()
+    with db.sink("tweets", TWEET_COLUMNS, batch_size=5_000, flush_interval=None) as sink:
+        for row in rows:
+            sink.add(row)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return BenchResult(
+        name="duckdb: buffered insert",
+        items=sink.written,
+        unit="rows",
+        seconds=elapsed,
+    )
+
+
+# name -> (benchmark, size parameter)
+BENCHMARKS: dict[str, list[tuple[Callable[..., BenchResult], str]]] = {
+    "fetch": [(bench_fetch_replies, "tweets"), (bench_fetch_by_ids, "batches")],
+    "stage": [(bench_stage, "records"), (bench_stage_read, "records")],
+    "ingest": [(bench_ingest, "records")],
+    "duckdb": [(bench_duckdb, "records")],
+}
+
+cli = Typer()
+
+
+@cli.command()
+def main(
+    only: list[str] = Option(None, help=f"Benchmarks to run: {', '.join(BENCHMARKS)}"),
+    tweets: int = Option(200, help="Tweets whose replies are fetched"),
+    batches: int = Option(40, help="twitter241 requests of 250 IDs"),
+    records: int = Option(20_000, help="Records staged, ingested and inserted"),
+    latency: float = Option(0.0, help="Mock server seconds per response"),
+    rate_limit: float = Option(None, help="Mock server requests/sec before 429"),
+    error_rate: float = Option(0.0, help="Mock server fraction of 503 responses"),
+    output: Path = Option(None, help="Also write the results to this JSON file"),
+) -> None:
+    """Run the benchmarks against a local mock server."""
+    sizes = {"tweets": tweets, "batches": batches, "records": records}
+    config = MockConfig(latency=latency, rate_limit=rate_limit, error_rate=error_rate)
+
+    results: list[BenchResult] = []
+    with MockServer(config) as server, tempfile.TemporaryDirectory() as tmp:
+        for group, benchmarks in BENCHMARKS.items():
+            if only and group not in only:
+                continue
+            for benchmark, size in benchmarks:
+                logger.info(f"Running {benchmark.__name__} ({size}={sizes[size]:,})")
+                results.append(benchmark(server, Path(tmp), sizes[size]))
+
+    table = pl.DataFrame(
+        [
+            {
+                "benchmark": r.name,
+                "items": r.items,
+                "unit": r.unit,
+                "seconds": round(r.seconds, 3),
+                "per_sec": round(r.per_sec, 1),
+                "requests": r.requests,
+            }
+            for r in results
+        ]
+    )
+    with pl.Config(tbl_rows=-1, tbl_width_chars=120, tbl_hide_dataframe_shape=True):
+        print(table)
+
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "config": config.model_dump(),
+            "results": [r.model_dump() | {"per_sec": r.per_sec} for r in results],
+        }
+        output.write_text(json.dumps(payload, indent=2))
+        logger.success(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    cli()
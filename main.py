@@ -1,32 +1,80 @@
-import asyncio
-import json
-from itertools import count
-from pprint import pprint
+import sys
+from pathlib import Path
+from typing import Iterator
 
-import polars as pl
-import requests
-from pocketbase.models import Record
-from tqdm import tqdm
-from typer import Option, Typer
+from typer import Context, Option, Typer
 
 from src.config import (
-    EXTERNAL_DATA_DIR,
     INTERIM_DATA_DIR,
     PROJECT_ROOT,
     Settings,
     logger,
 )
-from src.db import DB, PBWarehouse
-from src.models import Tweet
-from src.scraper import RapidApi, TweetyScraper
-from src.utils import get_tweet_replies
+
+# Commands import what they use in their own body, so that a command only pays
+# for its own dependencies and `--help` stays fast (see benchmarks/import_time.py).
+METRICS_DB = INTERIM_DATA_DIR / "metrics.duckdb"
+# Commands that record metrics, the others skip starting the exporter.
+METRICS_COMMANDS = frozenset(
+    {
+        "get-replies",
+        "ingest-data",
+        "get-from-oldbird",
+        "tweety",
+        "tag-hashtags",
+        "dedup",
+        "build-index",
+        "search",
+        "sync-warehouse",
+        "build-lake",
+        "rapidapi-tweets",
+    }
+)
 
 cli = Typer()
 
 
+@cli.callback()
+def main(
+    ctx: Context,
+    metrics: bool = Option(True, help="Export run metrics to DuckDB and Prometheus"),
+    metrics_interval: float = Option(15.0, help="Seconds between metric exports"),
+) -> None:
+    command = ctx.invoked_subcommand
+    # The callback also runs for `<command> --help`, before the help is shown.
+    wants_help = set(ctx.help_option_names) & set(sys.argv[1:])
+    if not metrics or command not in METRICS_COMMANDS or wants_help:
+        return
+
+    from src.utils.metrics import MetricsExporter
+
+    exporter = MetricsExporter(
+        command,
+        METRICS_DB,
+        prom_path=PROJECT_ROOT / "reports" / "metrics" / f"{command}.prom",
+        interval=metrics_interval,
+    ).start()
+    ctx.call_on_close(exporter.close)
+
+
 @cli.command()
-def get_replies() -> None:
+def get_replies(
+    concurrency: int = Option(8, help="Tweets fetched concurrently"),
+    rate: float = Option(None, help="Requests per second, the plan's limit by default"),
+    max_pages: int = Option(None, help="Continuation pages to follow per tweet"),
+    base_url: str = Option(None, help="API root, e.g. a local mock"),
+    retry_failed: bool = Option(False, help="Retry tweets that failed before"),
+    cache: bool = Option(True, help="Serve pages fetched before from disk"),
+    full: bool = Option(False, help="Ignore the watermark and rescan every tweet"),
+    page_size: int = Option(500, help="Tweets read from PocketBase per request"),
+) -> None:
     """Get replies to tweets from the Oldbird API."""
+    from src.db import Frontier, PBWarehouse
+    from src.db.response_cache import ResponseCache
+    from src.pipeline import HashtagTagger
+    from src.utils import get_tweet_replies
+    from src.utils.get_tweets_replies import TWITTER154_RATE, TWITTER154_URL
+
     logger.add(PROJECT_ROOT / "reports" / "logs" / "get_replies.logs")
     logger.info("Starting to fetch replies from Oldbird API...")
 
@@ -39,22 +87,66 @@ def get_replies() -> None:
         "has_blm_hashtag = TRUE && "
         "creation_date <= '2020-07-24'"
     )
-
-    records: list[Record] = pb.client.collection("tweets").get_full_list(
-        query_params={"filter": filter_params}
-    )
-
-    tweets: list[Tweet] = [Tweet(**r.__dict__) for r in records]
-    tweet_ids: list[str] = [tweet.tweet_id for tweet in tweets]
-
-    get_tweet_replies(tweet_ids, INTERIM_DATA_DIR / "oldbird")
-    logger.info(f"Total tweets with replies: {len(tweets)}")
+    tagger = HashtagTagger()
+    selected = 0
+
+    def select_tweet_ids(frontier: Frontier) -> Iterator[list[str]]:
+        nonlocal selected
+        watermark = None if full else frontier.watermark()
+        if watermark:
+            logger.info(f"Only considering tweets updated since {watermark}")
+        for records in pb.iter_records(
+            "tweets",
+            filter=filter_params,
+            fields=["tweet_id", "text"],
+            after=watermark,
+            per_page=page_size,
+        ):
+            # The stored flag also matched hashtags like #blmfoo, so re-check the text.
+            tagged = tagger.tag_texts([record["text"] for record in records])
+            tweet_ids = [
+                record["tweet_id"]
+                for record, keep in zip(records, tagged["has_blm_hashtag"])
+                if keep
+            ]
+            selected += len(tweet_ids)
+            yield tweet_ids
+            # The chunk is seeded into the frontier by now, so it is safe to skip.
+            frontier.set_watermark(records[-1]["updated"])
+
+    response_cache = ResponseCache() if cache else None
+    with Frontier("replies") as frontier:
+        get_tweet_replies(
+            select_tweet_ids(frontier),
+            INTERIM_DATA_DIR / "oldbird",
+            base_url=base_url or TWITTER154_URL,
+            concurrency=concurrency,
+            rate=rate or TWITTER154_RATE,
+            max_pages=max_pages,
+            frontier=frontier,
+            retry_failed=retry_failed,
+            cache=response_cache,
+        )
+        logger.info(f"Frontier status: {frontier.summary()}")
+    if response_cache:
+        response_cache.close()
+    logger.info(f"Total new tweets with replies: {selected}")
     logger.success("Replies fetched successfully.")
 
 
 @cli.command()
-def ingest_data() -> None:
+def ingest_data(
+    concurrency: int = Option(8, help="Write requests in flight"),
+    batch_size: int = Option(50, help="Records per PocketBase batch request"),
+    use_batch: bool = Option(True, help="Use the PocketBase /api/batch endpoint"),
+    upsert: bool = Option(False, help="Only write new or changed records"),
+    workers: int = Option(None, help="Parse/validate processes, default CPU count"),
+) -> None:
     """Ingest data from stagign area to warehouse."""
+    from src.db import PBWarehouse
+    from src.db.membership import collection_indexes
+    from src.pipeline import IngestPipeline
+
     logger.add(PROJECT_ROOT / "reports" / "logs" / "ingest_data.logs")
     logger.info("Starting data ingestion process...")
 
@@ -62,29 +154,27 @@ def ingest_data() -> None:
     staging_area = INTERIM_DATA_DIR / "oldbird"
     logger.info(f"Staging area: {staging_area}")
 
-    for tweet_file in staging_area.iterdir():
-        if tweet_file.suffix == ".json":
-            try:
-                with open(tweet_file, "r", encoding="utf-8") as f:
-                    tweet_data = json.load(f)
-
-                assert isinstance(tweet_data, dict), "Tweet data must be a dictionary"
-                assert "tweet_id" in tweet_data, "Tweet data must contain 'tweet_id'"
-
-                if tweet_data["retweet_status"]:
-                    pb_client.ingest_tweet(tweet_data["retweet_status"])
-                if tweet_data["quoted_status"]:
-                    pb_client.ingest_tweet(tweet_data["quoted_status"])
-
-                pb_client.ingest_tweet(tweet_data)
-
-                logger.info(f"Successfully ingested {tweet_file.name}")
-            except Exception as e:
-                logger.error(
-                    f"Error ingesting {tweet_file.name}: {type(e).__name__} - {e}"
-                )
-        else:
-            logger.warning(f"Skipping non-JSON file: {tweet_file.name}")
+    with pb_client.writer(
+        concurrency=concurrency,
+        batch_size=batch_size,
+        use_batch=use_batch,
+        upsert=upsert,
+        indexes=collection_indexes(),
+    ) as writer:
+        pipeline = IngestPipeline(writer, workers=workers)
+        ingest_stats = pipeline.run(staging_area)
+
+    logger.info(
+        f"Validated {ingest_stats.validated:,} tweets ({ingest_stats.invalid:,} invalid) "
+        f"from {ingest_stats.units:,} units - {ingest_stats.rows_per_sec:.1f} rows/sec"
+    )
+    stats = writer.stats
+    logger.success(
+        f"Ingested {stats.written:,} new and {stats.updated:,} updated records "
+        f"({stats.skipped:,} unchanged, {stats.failed:,} failed) with "
+        f"{stats.requests:,} requests in {stats.elapsed:.1f}s - "
+        f"{stats.rows_per_sec:.1f} rows/sec"
+    )
 
 
 @cli.command()
@@ -95,18 +185,49 @@ def get_from_oldbird(
     continuation_token: str = Option(
         None, "--continuation-token", "-c", help="Optional continuation token"
     ),
+    cache: bool = Option(True, help="Serve pages fetched before from disk"),
 ):
     """Grab tweets from the Oldbird API and save them to a staging area."""
+    import time
+
+    import requests
+    from tqdm import tqdm
+
+    from src.db import Frontier
+    from src.db.frontier import DONE
+    from src.db.membership import SEEN_TWEETS, MembershipIndex
+    from src.db.response_cache import ResponseCache
+    from src.db.staging import SegmentReader, SegmentWriter
+    from src.utils.metrics import METRICS
+
     logger.add(PROJECT_ROOT / "reports" / "logs" / "oldbird.logs")
     logger.info("Starting to fetch tweets from Oldbird API...")
     staging = INTERIM_DATA_DIR / "oldbird"
     token_file = staging / "continuation_token.txt"
-
-    if (token_file).exists():
-        with open(staging / "continuation_token.txt", "r") as f:
-            continuation_token = f.read().strip()
+    search_id = "#blacklivesmatter:en:2020-03-26:2020-07-24"
+
+    # Every page is a paid request, so checkpoint the cursor after each one.
+    frontier = Frontier("oldbird-search", batch_size=1)
+    if continuation_token is None and frontier.get_status(search_id) == DONE:
+        # The cursor of a finished search is its last page, not a new one.
+        logger.info("The search was already fetched to its last page")
+        frontier.close()
+        return
+
+    if token_file.exists():
+        # Carry over the cursor of runs made before the frontier existed.
+        with open(token_file, "r") as f:
+            initial_token = f.read().strip()
     else:
-        continuation_token = "DAACCgACF_Sz76EAJxAKAAMX9LPvoP_Y8AgABAAAAAILAAUAAABQRW1QQzZ3QUFBZlEvZ0dKTjB2R3AvQUFBQUFVWDlJWmx4cHZBZkJmMG5RNUxHdUVQRi9TdTZPSGJzQ0VYOUp6Y3psdUJ3UmYwbFE3Q1dxQWsIAAYAAAAACAAHAAAAAAwACAoAARf0hmXGm8B8AAAA"
+        initial_token = "DAACCgACF_Sz76EAJxAKAAMX9LPvoP_Y8AgABAAAAAILAAUAAABQRW1QQzZ3QUFBZlEvZ0dKTjB2R3AvQUFBQUFVWDlJWmx4cHZBZkJmMG5RNUxHdUVQRi9TdTZPSGJzQ0VYOUp6Y3psdUJ3UmYwbFE3Q1dxQWsIAAYAAAAACAAHAAAAAAwACAoAARf0hmXGm8B8AAAA"
+
+    writer = SegmentWriter(
+        staging, prefix="search", index=MembershipIndex(SEEN_TWEETS)
+    )
+    frontier.before_flush = writer.flush
+    frontier.seed([search_id], cursor=initial_token)
+    if continuation_token is None:
+        continuation_token = frontier.get_cursor(search_id)
 
     logger.info(f"Using continuation token: {continuation_token}")
     querystring = {
@@ -118,6 +239,8 @@ def get_from_oldbird(
         "continuation_token": continuation_token,
     }
 
+    response_cache = ResponseCache() if cache else None
+
     def get_tweets(querystring, num_requests=5):
         url = "https://twitter154.p.rapidapi.com/search/search/continuation"
         headers = {
@@ -129,14 +252,25 @@ def get_from_oldbird(
 
         for _ in tqdm(range(num_requests), desc="Fetching tweets", unit="request"):
 
-            response = requests.get(url, headers=headers, params=querystring_cp)
-            data = response.json()
-
-            if response.status_code != 200:
-                logger.error(
-                    f"Error fetching data: {response.status_code} - {data.get('message', 'No message')}"
+            data = response_cache.get(url, querystring_cp) if response_cache else None
+            if data is None:
+                started = time.perf_counter()
+                response = requests.get(url, headers=headers, params=querystring_cp)
+                METRICS.record_response(
+                    url,
+                    response.status_code,
+                    time.perf_counter() - started,
+                    len(response.content),
                 )
-                break
+                data = response.json()
+
+                if response.status_code != 200:
+                    logger.error(
+                        f"Error fetching data: {response.status_code} - {data.get('message', 'No message')}"
+                    )
+                    break
+                if response_cache and "results" in data:
+                    response_cache.put(url, querystring_cp, data)
 
             if "results" not in data:
                 logger.error("No results found in the response")
@@ -147,68 +281,398 @@ def get_from_oldbird(
             if len(results) == 0:
                 logger.warning("No tweets found in this request.")
 
-            for tweet in results:
-                json_filename = staging / f"{tweet['tweet_id']}.json"
-                with open(json_filename, "w", encoding="utf-8") as f:
-                    json.dump(tweet, f, ensure_ascii=False, indent=4)
+            writer.write_many(results)
 
             if "continuation_token" not in data:
                 logger.info("No continuation token found, stopping further requests.")
+                frontier.complete(search_id)
                 break
 
-            with open(token_file, "w") as f:
-                f.write(data["continuation_token"])
+            frontier.checkpoint(search_id, data["continuation_token"])
 
             querystring_cp["continuation_token"] = data["continuation_token"]
 
-    get_tweets(querystring, num_requests=num_requests)
+    try:
+        get_tweets(querystring, num_requests=num_requests)
+    finally:
+        writer.close()
+        frontier.close()
+        if response_cache:
+            response_cache.log_stats()
+            response_cache.close()
 
-    tweet_list = list(staging.iterdir())
-    logger.info(f"Total tweets fetched: {len(tweet_list)-1}")
+    total = SegmentReader(staging, prefix="search").count()
+    logger.info(f"Total tweets fetched: {total}")
 
 
 @cli.command()
-def tweety() -> None:
+def tweety(
+    retry_failed: bool = Option(False, help="Retry tweets that failed before"),
+    delay: int = Option(10, help="Starting seconds between requests per session"),
+    sessions: str = Option(None, help="Comma-separated session names"),
+) -> None:
     """Run the Tweety script."""
+    import asyncio
+
+    from src.scraper import TweetyScraper
+
     logger.add(PROJECT_ROOT / "reports" / "logs" / "tweet.logs")
     scraper = TweetyScraper(previous_session=True)
-    asyncio.run(scraper.get_data())
+    asyncio.run(
+        scraper.get_data(
+            delay=delay,
+            retry_failed=retry_failed,
+            sessions=sessions.split(",") if sessions else None,
+        )
+    )
 
 
 @cli.command()
-def tweety_login() -> None:
+def tweety_login(
+    session: str = Option("session", help="Session name to save the login under"),
+) -> None:
     """Login to Twitter using Tweety."""
-    scraper = TweetyScraper(previous_session=False)
+    import asyncio
+
+    from src.scraper import TweetyScraper
+
+    scraper = TweetyScraper(previous_session=False, session_name=session)
     asyncio.run(scraper.login())
 
 
 @cli.command()
 def tweety_trends() -> None:
     """Run the Tweety script."""
+    import asyncio
+
+    from src.scraper import TweetyScraper
+
     scraper = TweetyScraper(previous_session=True)
     asyncio.run(scraper.get_blm_trends())
 
 
 @cli.command()
-def view_db_data() -> None:
+def tag_hashtags(
+    target: str = Option("duckdb", help="Where to backfill: duckdb or pocketbase"),
+    families: str = Option(None, help="JSON file of hashtag families"),
+) -> None:
+    """Backfill hashtag family flags on existing tweets."""
+    from src.db import DB, PBWarehouse
+    from src.pipeline import HashtagTagger
+    from src.pipeline.hashtags import backfill_duckdb, backfill_pocketbase
+
+    tagger = HashtagTagger.from_json(families) if families else HashtagTagger()
+    logger.info(f"Hashtag families: {tagger.families}")
+
+    if target == "duckdb":
+        with DB() as db:
+            total = backfill_duckdb(db, tagger)
+    elif target == "pocketbase":
+        total = backfill_pocketbase(PBWarehouse(), tagger)
+    else:
+        raise ValueError(f"Unknown target: {target}")
+
+    logger.success(f"Tagged {total:,} tweets in {target}")
+
+
+@cli.command()
+def dedup(
+    rebuild: bool = Option(False, help="Rehash every tweet instead of only new ones"),
+    batch_size: int = Option(50_000, help="Tweets hashed per batch"),
+    workers: int = Option(None, help="Signature processes, default CPU count"),
+    bands: int = Option(16, help="LSH bands; fewer bands only match closer copies"),
+    top: int = Option(10, help="Largest clusters to show"),
+) -> None:
+    """Cluster near-duplicate tweets in DuckDB into the dup_cluster column."""
+    import polars as pl
+
+    from src.analytics.dedup import NearDuplicateIndex
+    from src.db import DB
+
+    with DB() as db, NearDuplicateIndex(db, bands=bands, workers=workers) as index:
+        if rebuild:
+            index.rebuild()
+        added = index.update(batch_size=batch_size)
+        with pl.Config(tbl_rows=top, tbl_width_chars=160, fmt_str_lengths=80):
+            print(index.clusters(limit=top))
+    logger.success(f"Clustered {added:,} new tweets")
+
+
+@cli.command()
+def build_index(
+    rebuild: bool = Option(False, help="Delete the index before indexing"),
+    batch_size: int = Option(100_000, help="Tweets per index segment"),
+) -> None:
+    """Add the DuckDB tweets not indexed yet to the full-text search index."""
+    from src.analytics.search_index import SearchIndex
+    from src.db import DB
+
+    index = SearchIndex()
+    if rebuild:
+        index.clear()
+    with DB() as db:
+        added = index.update(db, batch_size=batch_size)
+    logger.success(f"Indexed {added:,} new tweets, {len(index):,} in total")
+
+
+@cli.command()
+def search(
+    query: str = Option(
+        ..., "--query", "-q", help="Terms that must all match, a|b and -term"
+    ),
+    limit: int = Option(20, help="Maximum tweets to show"),
+    text: bool = Option(False, help="Also show the text of the tweets"),
+) -> None:
+    """Search the tweets by words, #hashtags and @mentions."""
+    from src.analytics.search_index import SearchIndex
+
+    result = SearchIndex().search(query, limit=limit)
+    logger.info(f"{result.count:,} tweets match, in {result.seconds * 1000:.1f} ms")
+    if not text:
+        print("\n".join(result.tweet_ids))
+        return
+
+    import polars as pl
+
+    from src.db import DB
+
+    with DB() as db:
+        ids = pl.DataFrame({"id": result.tweet_ids})
+        tweets = db.connection.execute(
+            "SELECT id, text FROM tweets JOIN ids USING (id)"
+        ).pl()
+    with pl.Config(tbl_rows=limit, tbl_width_chars=160, fmt_str_lengths=120):
+        print(ids.join(tweets, on="id", how="left"))
+
+
+@cli.command()
+def view_db_data(
+    table: str = Option("tweets", help="Table to view, e.g. tweets or errors"),
+    columns: list[str] = Option(None, help="Columns to show, all by default"),
+    where: str = Option(None, help="SQL filter, e.g. \"retweet_count > 100\""),
+    order_by: str = Option(None, help="SQL ordering, e.g. \"retweet_count DESC\""),
+    limit: int = Option(20, help="Maximum rows to show"),
+    page_size: int = Option(20, help="Rows per printed page"),
+    summary: bool = Option(False, help="Show per-column statistics instead of rows"),
+) -> None:
+    """View rows of a DuckDB table, or summary statistics of it."""
+    from src.db import DB
+
     db = DB()
-    db.view_data()
+    db.view_data(
+        table,
+        columns=columns,
+        where=where,
+        order_by=order_by,
+        limit=limit,
+        page_size=page_size,
+        summary=summary,
+    )
     db.close()
 
 
 @cli.command()
-def view_schema() -> None:
+def view_schema(
+    db_path: Path = Option(None, "--db", help="DuckDB file, the warehouse by default"),
+) -> None:
     """View the schema of the tweets table."""
-    db = DB()
+    from pprint import pprint
+
+    from src.db import DB
+
+    db = DB(db_path) if db_path else DB()
     schema = db.connection.execute("DESCRIBE tweets").fetchall()
     pprint(schema)
+    db.close()
+
+
+@cli.command()
+def plan_work(
+    order: str = Option("file", help="One of file, id or random"),
+    shards: int = Option(1, help="Split the remaining IDs into this many shards"),
+    shard: int = Option(0, help="Shard to output, from 0"),
+    skip_errors: bool = Option(True, help="Treat IDs in the errors table as done"),
+    output: str = Option(None, help="Write the IDs to this file instead of a summary"),
+) -> None:
+    """Show or export the BLM tweet IDs that have not been fetched yet."""
+    import polars as pl
+
+    from src.db.planner import plan_remaining
+
+    remaining = plan_remaining(
+        skip_errors=skip_errors, order=order, shards=shards, shard=shard
+    )
+    if output:
+        remaining.to_series().cast(pl.Utf8).to_frame().write_csv(output)
+        logger.success(f"Wrote {len(remaining):,} tweet IDs to {output}")
+    else:
+        print(remaining.to_series().head(10))
+
+
+@cli.command()
+def index_seen() -> None:
+    """Rebuild the seen-tweets index from DuckDB and every staging area."""
+    from src.db.planner import build_seen_index
+
+    index = build_seen_index()
+    logger.success(f"Indexed {len(index):,} tweet IDs in {index.path}")
+
+
+@cli.command()
+def sync_warehouse(
+    collections: list[str] = Option(None, help="Collections to mirror, all by default"),
+    full: bool = Option(False, help="Ignore the watermark and re-read everything"),
+    concurrency: int = Option(4, help="Time windows fetched at once"),
+    windows: int = Option(16, help="Time windows each sync is cut into"),
+    per_page: int = Option(500, help="Records per PocketBase request"),
+    parquet: bool = Option(True, help="Also export each collection to Parquet"),
+) -> None:
+    """Mirror PocketBase collections into a local DuckDB copy for analytics."""
+    from src.db import PBWarehouse
+    from src.db.mirror import MIRRORED, WarehouseMirror
+
+    pb = PBWarehouse()
+    with WarehouseMirror(
+        pb, concurrency=concurrency, windows=windows, per_page=per_page
+    ) as mirror:
+        for collection in collections or list(MIRRORED):
+            mirror.sync(collection, full=full)
+            if parquet:
+                path = mirror.export_parquet(collection)
+                logger.info(f"Exported {collection} to {path}")
+    logger.success(f"Warehouse mirrored to {mirror.db_path}")
+
+
+@cli.command()
+def build_lake(
+    staging: list[str] = Option(["oldbird", "twttr"], help="Staging areas to load"),
+    rebuild: bool = Option(False, help="Delete the lake before loading"),
+    batch_size: int = Option(50_000, help="Records normalized per batch"),
+    compact_every: float = Option(60.0, help="Seconds between background compactions"),
+) -> None:
+    """Load staged tweets into the date-partitioned Parquet lake."""
+    from tqdm import tqdm
+
+    from src.db.lake import Lake
+    from src.db.staging import iter_staged_records
+    from src.pipeline.normalize import normalize
+
+    lake = Lake()
+    if rebuild:
+        lake.clear()
+
+    tweets = 0
+    with lake.start_compactor(compact_every):
+        for name in staging:
+            for records in tqdm(
+                iter_staged_records(INTERIM_DATA_DIR / name, batch_size),
+                desc=f"Loading {name}",
+                unit="batch",
+            ):
+                batch = normalize(records)
+                lake.write(batch)
+                tweets += len(batch.tweets)
+    lake.compact()
+    logger.success(f"Loaded {tweets:,} tweets into {lake.root}")
+
+
+@cli.command()
+def query_lake(
+    sql: str = Option(
+        "SELECT day, COUNT(*) AS tweets FROM tweets GROUP BY day ORDER BY day",
+        help="SQL over the tweets and users views",
+    ),
+) -> None:
+    """Run SQL over the Parquet lake, e.g. filtered on a ``day`` window."""
+    import polars as pl
+
+    from src.db.lake import Lake
+
+    with pl.Config(tbl_rows=50, tbl_width_chars=160):
+        print(Lake().query(sql))
+
+
+@cli.command()
+def build_graph(
+    source: str = Option("lake", help="Where to read tweets from: lake or duckdb"),
+    kind: str = Option("reply", help="Edges to follow: reply, quote or retweet"),
+    top: int = Option(10, help="Largest cascades to show"),
+) -> None:
+    """Build the thread graph of the corpus and show its largest cascades."""
+    import polars as pl
+
+    from src.analytics.graph import GRAPH_DIR, ThreadGraph, load_edges
+
+    graph = ThreadGraph.build(load_edges(source, kind))
+    path = graph.save(GRAPH_DIR / kind)
+    with pl.Config(tbl_rows=top, tbl_width_chars=160):
+        print(graph.cascades().head(top))
+    logger.success(f"Saved the {kind} graph of {len(graph):,} tweets to {path}")
+
+
+@cli.command()
+def thread(
+    tweet_id: str = Option(..., help="Any tweet of the thread"),
+    kind: str = Option("reply", help="Graph to read: reply, quote or retweet"),
+    limit: int = Option(50, help="Maximum tweets to show"),
+) -> None:
+    """Show the thread a tweet belongs to, from the built thread graph."""
+    import polars as pl
+
+    from src.analytics.graph import GRAPH_DIR, ThreadGraph
+
+    tweets = ThreadGraph.load(GRAPH_DIR / kind).thread(tweet_id)
+    logger.info(
+        f"Thread of {len(tweets):,} tweets, {tweets['depth'].max()} replies deep"
+    )
+    with pl.Config(tbl_rows=limit, tbl_width_chars=160):
+        print(tweets.head(limit))
+
+
+@cli.command()
+def stats(
+    run_id: str = Option(None, help="Run to summarize, by default the latest"),
+    command: str = Option(None, help="Only consider runs of this command"),
+) -> None:
+    """Summarize the throughput, latency and errors of a recorded run."""
+    import polars as pl
+
+    from src.utils.metrics import summarize_run
+
+    run, summary = summarize_run(METRICS_DB, run_id=run_id, command=command)
+    logger.info(
+        f"Run {run['run_id']} of {run['command']}, started {run['started_at']:%Y-%m-%d %H:%M:%S}, "
+        f"{run['duration']:.1f}s"
+    )
+    with pl.Config(tbl_rows=-1, tbl_width_chars=160, fmt_str_lengths=60):
+        print(summary)
 
 
 @cli.command()
 def rapidapi_tweets(
-    start: int = 0, step: int = 250, max_requests: int | None = None
+    start: int = 0,
+    step: int = 250,
+    max_requests: int | None = None,
+    retry_failed: bool = False,
+    concurrency: int = Option(4, help="Requests in flight at once"),
+    rate: float = Option(None, help="Requests per second, the plan's limit by default"),
+    base_url: str = Option(None, help="API root, e.g. a local mock"),
+    cache: bool = Option(True, help="Serve responses fetched before from disk"),
 ) -> None:
     """Scrape tweets using RapidAPI using Tweet IDs from the BLM dataset."""
+    import time
+    from itertools import islice
+
+    from tqdm import tqdm
+
+    from src.db import Frontier
+    from src.db.membership import SEEN_TWEETS, MembershipIndex
+    from src.db.planner import plan_remaining
+    from src.db.response_cache import ResponseCache
+    from src.db.staging import SegmentWriter
+    from src.scraper import RapidApi
+    from src.scraper.RapidApi import TWITTER241_RATE, TWITTER241_URL, BatchResult
+    from src.utils.id_source import IdSource, as_strings
 
     logger.add(
         f"{PROJECT_ROOT}/logs/ingest_external_data.log",
@@ -218,48 +682,73 @@ def rapidapi_tweets(
     )
     logger.info("Starting RapidAPI data scraping...")
 
-    BLM_DATA = pl.read_csv(
-        EXTERNAL_DATA_DIR / "TAPS dataset" / "blacklivesmatter.txt",
-        schema={"tweetIds": pl.Utf8},
-    ).unique()
-    length = BLM_DATA.shape[0]
-
-    ra = RapidApi(api_key=Settings.X_RAPIDAPI_KEY.value)
+    # Skip IDs already in DuckDB or already staged by an earlier run.
+    remaining = plan_remaining(skip_errors=not retry_failed)
+
+    frontier = Frontier("twttr-ids")
+    # Each record is a whole 250-tweet response, so flush small frames.
+    writer = SegmentWriter(
+        INTERIM_DATA_DIR / "twttr",
+        prefix="blacklivesmatter",
+        id_field=None,
+        flush_records=10,
+        index=MembershipIndex(SEEN_TWEETS),
+    )
+    frontier.before_flush = writer.flush
+    frontier.seed(remaining.to_series())
+    pending = IdSource(frontier.pending_ids(retry_failed=retry_failed))[start:]
+    # Only the batch being requested is turned into strings.
+    batches = (as_strings(chunk) for chunk in pending.chunks(step))
+    num_batches = -(-len(pending) // step)
+    if max_requests is not None:
+        batches = islice(batches, max_requests)
+        num_batches = min(num_batches, max_requests)
+
+    ra = RapidApi(
+        api_key=Settings.X_RAPIDAPI_KEY.value,
+        base_url=base_url or TWITTER241_URL,
+        rate=rate or TWITTER241_RATE,
+        cache=ResponseCache() if cache else None,
+    )
 
-    logger.info(f"Total tweet IDs: {length:,}")
+    logger.info(f"Tweet IDs remaining: {len(pending):,}")
     logger.info(f"Tweets per request: {step}")
-    logger.info(f"Total requests needed: {length / step:,}")
-
-    counter = count(start=1)
-    num_requests = 0
-
-    for i in tqdm(range(start, length, step), desc="Scraping tweets", unit="request"):
-        data: dict = ra.get_data(
-            data=BLM_DATA,
-            start=i,
-            end=i + 250,
+    logger.info(f"Requests this run: {num_batches:,}")
+
+    progress = tqdm(total=num_batches, desc="Scraping tweets", unit="request")
+    failed = 0
+
+    def on_result(result: BatchResult) -> None:
+        nonlocal failed
+        progress.update(1)
+        if result.ok:
+            writer.write(
+                {"tweet_ids": result.tweet_ids, "response": result.data},
+                ids=result.tweet_ids,
+            )
+            for tweet_id in result.tweet_ids:
+                frontier.complete(tweet_id)
+            return
+
+        failed += 1
+        logger.error(
+            f"Batch of {len(result.tweet_ids)} IDs failed after "
+            f"{result.attempts} attempts: {result.error}"
         )
+        for tweet_id in result.tweet_ids:
+            frontier.fail(tweet_id, result.error or "Empty response")
 
-        num_requests = next(counter)
-
-        try:
-            with open(
-                INTERIM_DATA_DIR / "twttr" / f"blacklivesmatter_{i}:{i + 250}.json", "w"
-            ) as f:
-                json.dump(data, f, indent=4)
-        except Exception as e:
-            logger.error(f"{type(e).__name__} while saving data to JSON:", e)
-            continue
-
-        if max_requests is not None and num_requests > max_requests:
-            logger.warning(
-                f"Reached maximum requests limit: {max_requests}. Stopping further requests."
-            )
-            break
+    started = time.perf_counter()
+    with progress, frontier, writer:
+        ra.run_batches(batches, on_result, concurrency=concurrency)
+    elapsed = time.perf_counter() - started
 
     logger.success("Data saved")
-    logger.info(f"Requests made: {counter}")
-    logger.info(f"Total tweets scraped: {num_requests * step}")
+    logger.info(f"Requests made: {progress.n:,}, failed: {failed:,}")
+    logger.info(f"Requests per second: {progress.n / elapsed if elapsed else 0:.2f}")
+    if ra.cache:
+        ra.cache.log_stats()
+        ra.cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,24 @@
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .dedup import NearDuplicateIndex
+    from .graph import ThreadGraph
+    from .search_index import SearchIndex
+
+# Exports are imported on first access, so a command only loads what it uses.
+_EXPORTS = {
+    "NearDuplicateIndex": ".dedup",
+    "SearchIndex": ".search_index",
+    "ThreadGraph": ".graph",
+}
+
+__all__ = ["NearDuplicateIndex", "SearchIndex", "ThreadGraph"]
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
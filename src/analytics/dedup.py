@@ -0,0 +1,446 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+import numpy as np
+import polars as pl
+
+from src.config import logger
+from src.utils.metrics import METRICS
+
+if TYPE_CHECKING:
+    from src.db import DB
+
+# Multipliers of the rolling shingle hash and of the splitmix64 finalizer.
+SHINGLE_BASE = np.uint64(0x100000001B3)
+MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def normalize_text(texts: pl.Series) -> pl.Series:
+    """Lowercase ``texts`` and drop links, mentions and repeated whitespace.
+
+    Copies of the same text differ mostly in who they mention and in their
+    shortened links, so neither counts towards similarity.
+    """
+    return (
+        texts.fill_null("")
+        .str.to_lowercase()
+        .str.replace_all(r"https?://\S+|@\w+|\brt\b", " ")
+        .str.replace_all(r"\s+", " ")
+        .str.strip_chars()
+    )
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    values = values ^ (values >> np.uint64(30))
+    values = values * MIX_1
+    values = values ^ (values >> np.uint64(27))
+    values = values * MIX_2
+    return values ^ (values >> np.uint64(31))
+
+
+def shingle_hashes(texts: list[str], k: int = 5) -> tuple[np.ndarray, np.ndarray]:
+    """Hash every ``k``-byte shingle of every text at once.
+
+    Texts shorter than ``k`` are padded, so each text has at least one
+    shingle.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The ``uint64`` shingle hashes, text
+        after text, and the offset of each text's first shingle.
+    """
+    encoded = [text.encode().ljust(k) for text in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(texts))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    counts = lengths - k + 1
+    offsets = np.cumsum(counts) - counts
+    # Start of every shingle in the concatenated buffer.
+    positions = np.repeat(np.cumsum(lengths) - lengths - offsets, counts)
+    positions += np.arange(int(counts.sum()))
+
+    hashes = np.zeros(len(positions), dtype=np.uint64)
+    for j in range(k):
+        hashes = hashes * SHINGLE_BASE + buffer[positions + j]
+    return _mix(hashes), offsets
+
+
+def permutations(num_perm: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Coefficients of ``num_perm`` multiply-shift hash functions."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(
+    texts: list[str], k: int = 5, num_perm: int = 128, seed: int = 1
+) -> np.ndarray:
+    """MinHash signature of every text, as a ``(len(texts), num_perm)`` array.
+
+    Each column is the minimum of one hash function over a text's shingles,
+    so two texts agree on a column with probability equal to the Jaccard
+    similarity of their shingle sets. Runs in worker processes, so it only
+    takes picklable arguments.
+    """
+    hashes, offsets = shingle_hashes(texts, k)
+    a, b = permutations(num_perm, seed)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    if not len(texts):
+        return signatures
+    # One hash function at a time, in place, keeps the working set to one buffer.
+    hashed = np.empty_like(hashes)
+    for i in range(num_perm):
+        np.multiply(hashes, a[i], out=hashed)
+        hashed += b[i]
+        hashed >>= np.uint64(32)
+        signatures[:, i] = np.minimum.reduceat(hashed, offsets)
+    return signatures
+
+
+def band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """Hash each of the ``bands`` slices of every signature to one key.
+
+    Returns:
+        np.ndarray: ``(len(signatures), bands)`` ``uint64`` keys. Two texts
+        are candidates when they share a key in any band.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    sliced = signatures[:, : bands * rows].reshape(n, bands, rows).astype(np.uint64)
+    keys = np.zeros((n, bands), dtype=np.uint64)
+    for r in range(rows):
+        keys = _mix(keys * SHINGLE_BASE + sliced[:, :, r])
+    return keys
+
+
+def components(left: np.ndarray, right: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Connected components of the graph with edges ``left[i] -- right[i]``.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The sorted node IDs and, for each,
+        the smallest node ID of its component.
+    """
+    nodes, inverse = np.unique(np.concatenate([left, right]), return_inverse=True)
+    u, v = inverse[: len(left)], inverse[len(left) :]
+    labels = np.arange(len(nodes))
+    while True:
+        smallest = np.minimum(labels[u], labels[v])
+        merged = labels.copy()
+        np.minimum.at(merged, u, smallest)
+        np.minimum.at(merged, v, smallest)
+        merged = merged[merged]
+        if np.array_equal(merged, labels):
+            return nodes, nodes[labels]
+        labels = merged
+
+
+def _bucket_edges(keys: pl.DataFrame) -> pl.DataFrame:
+    """Link every tweet to the smallest tweet ID sharing one of its buckets."""
+    return (
+        keys.with_columns(first=pl.col("tweet_id").min().over("band", "key"))
+        .filter(pl.col("tweet_id") != pl.col("first"))
+        .select("tweet_id", "first")
+        .unique()
+    )
+
+
+class NearDuplicateIndex:
+    """Copypasta clusters of the DuckDB ``tweets`` table, by MinHash and LSH.
+
+    Tweet texts are normalized, cut into ``shingle``-byte shingles and turned
+    into ``num_perm`` MinHash values in worker processes. The signature is
+    cut into ``bands`` bands, each hashed to a bucket key. Tweets sharing a
+    bucket in any band are near duplicates, which with the defaults (16 bands
+    of 8 values) catches pairs above a Jaccard similarity of about 0.7.
+
+    Bucket keys are kept in the ``minhash_buckets`` table and each tweet's
+    cluster, the smallest tweet ID among its near duplicates, in the
+    ``dup_cluster`` column of ``tweets``. ``update`` only hashes tweets not
+    seen before and merges clusters that a new tweet links together, so it
+    can run after every ingest.
+
+    Args:
+        db (DB): Database holding the ``tweets`` table.
+        num_perm (int): MinHash values per tweet.
+        bands (int): LSH bands, dividing ``num_perm``.
+        shingle (int): Bytes per shingle.
+        seed (int): Seed of the hash functions.
+        workers (int | None): Processes computing signatures. Defaults to
+            the CPU count.
+        chunk_size (int): Tweets per worker task.
+    """
+
+    def __init__(
+        self,
+        db: "DB",
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle: int = 5,
+        seed: int = 1,
+        workers: int | None = None,
+        chunk_size: int = 5_000,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.db = db
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle = shingle
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool: ProcessPoolExecutor | None = None
+        self.init_tables()
+
+    def init_tables(self) -> None:
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS minhash_buckets (
+                band UTINYINT,
+                key UBIGINT,
+                tweet_id UBIGINT
+            )
+            """
+        )
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS minhash_params (
+                num_perm INTEGER, bands INTEGER, shingle INTEGER, seed BIGINT
+            )
+            """
+        )
+        self.db.execute(
+            "ALTER TABLE tweets ADD COLUMN IF NOT EXISTS dup_cluster VARCHAR"
+        )
+
+        if self._stored_params() is None:
+            self.db.execute(
+                "INSERT INTO minhash_params VALUES (?, ?, ?, ?)", self._params()
+            )
+
+    def _params(self) -> tuple[int, int, int, int]:
+        return self.num_perm, self.bands, self.shingle, self.seed
+
+    def _stored_params(self) -> tuple | None:
+        row = self.db.connection.execute("SELECT * FROM minhash_params").fetchone()
+        return tuple(row) if row else None
+
+    def _check_params(self) -> None:
+        stored = self._stored_params()
+        if stored != self._params():
+            raise ValueError(
+                f"Buckets were built with (num_perm, bands, shingle, seed) = "
+                f"{stored}, rebuild the index to change them"
+            )
+
+    def rebuild(self) -> None:
+        """Forget every bucket and cluster, so ``update`` rehashes all tweets."""
+        self.db.execute("DROP TABLE IF EXISTS minhash_buckets")
+        self.db.execute("DROP TABLE IF EXISTS minhash_params")
+        self.db.execute("UPDATE tweets SET dup_cluster = NULL")
+        self.init_tables()
+
+    def signatures(self, texts: list[str]) -> np.ndarray:
+        chunks = [
+            texts[i : i + self.chunk_size]
+            for i in range(0, len(texts), self.chunk_size)
+        ]
+        args = (self.shingle, self.num_perm, self.seed)
+        if self.workers == 1 or len(chunks) < 2:
+            parts = [minhash_signatures(chunk, *args) for chunk in chunks]
+        else:
+            if self._pool is None:
+                # Spawned, as forking a process running threads can deadlock.
+                self._pool = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            parts = list(
+                self._pool.map(
+                    minhash_signatures,
+                    chunks,
+                    *([arg] * len(chunks) for arg in args),
+                )
+            )
+        if not parts:
+            return np.empty((0, self.num_perm), dtype=np.uint32)
+        return np.concatenate(parts)
+
+    def keys(self, batch: pl.DataFrame) -> pl.DataFrame:
+        """Bucket keys of a frame of ``tweet_id`` and ``text``, one row per band."""
+        batch = batch.with_columns(
+            pl.col("tweet_id").cast(pl.Utf8).cast(pl.UInt64, strict=False)
+        ).drop_nulls("tweet_id")
+        texts = normalize_text(batch["text"]).to_list()
+        keys = band_keys(self.signatures(texts), self.bands)
+        return pl.DataFrame(
+            {
+                "band": np.tile(np.arange(self.bands, dtype=np.uint8), len(batch)),
+                "key": keys.ravel(),
+                "tweet_id": np.repeat(batch["tweet_id"].to_numpy(), self.bands),
+            }
+        )
+
+    def add(self, batch: pl.DataFrame) -> int:
+        """Bucket and cluster a frame of new tweets (``tweet_id``, ``text``).
+
+        Returns:
+            int: Number of the batch's tweets with at least one near duplicate.
+        """
+        self._check_params()
+        return self._add(batch)
+
+    def _add(self, batch: pl.DataFrame) -> int:
+        keys = self.keys(batch)
+        if keys.is_empty():
+            return 0
+        connection = self.db.connection.cursor()
+        connection.register("keys", keys)
+        try:
+            # Clusters of earlier tweets sharing a bucket with the batch.
+            matches = connection.execute(
+                """
+                SELECT DISTINCT k.tweet_id, CAST(t.dup_cluster AS UBIGINT) AS cluster
+                FROM keys k
+                JOIN minhash_buckets m USING (band, key)
+                JOIN tweets t ON t.id = CAST(m.tweet_id AS VARCHAR)
+                WHERE t.dup_cluster IS NOT NULL
+                """
+            ).pl()
+            within = _bucket_edges(keys)
+
+            new_ids = keys["tweet_id"].unique().to_numpy()
+            left = np.concatenate(
+                [new_ids, matches["tweet_id"].to_numpy(), within["tweet_id"].to_numpy()]
+            )
+            right = np.concatenate(
+                [new_ids, matches["cluster"].to_numpy(), within["first"].to_numpy()]
+            )
+            nodes, labels = components(left.astype(np.uint64), right.astype(np.uint64))
+            clusters = pl.DataFrame({"node": nodes, "cluster": labels}).with_columns(
+                pl.col("node", "cluster").cast(pl.Utf8)
+            )
+            # Earlier clusters the batch joined together take the smallest label.
+            old_labels = matches["cluster"].cast(pl.Utf8).unique().to_list()
+            relabeled = clusters.filter(
+                pl.col("node").is_in(old_labels) & (pl.col("node") != pl.col("cluster"))
+            )
+
+            connection.execute("INSERT INTO minhash_buckets SELECT * FROM keys")
+            connection.register("clusters", clusters)
+            connection.execute(
+                """
+                UPDATE tweets SET dup_cluster = clusters.cluster
+                FROM clusters WHERE tweets.id = clusters.node
+                """
+            )
+            if not relabeled.is_empty():
+                connection.register("relabeled", relabeled)
+                connection.execute(
+                    """
+                    UPDATE tweets SET dup_cluster = relabeled.cluster
+                    FROM relabeled WHERE tweets.dup_cluster = relabeled.node
+                    """
+                )
+        finally:
+            # Closing the cursor also drops the frames registered on it.
+            connection.close()
+        duplicated = clusters.filter(pl.col("cluster").is_duplicated())
+        METRICS.inc("dedup_tweets_total", len(new_ids))
+        new_nodes = pl.Series(new_ids).cast(pl.Utf8).to_list()
+        return int(duplicated["node"].is_in(new_nodes).sum())
+
+    def update(self, batch_size: int = 50_000) -> int:
+        """Hash and cluster every tweet not in the index yet.
+
+        Returns:
+            int: Number of tweets added.
+        """
+        self._check_params()
+        # Stream on a cursor of its own: any other query on the connection
+        # would silently end the stream after the first batch.
+        reader = self.db.connection.cursor().execute(
+            """
+            SELECT t.id AS tweet_id, t.text
+            FROM tweets t
+            ANTI JOIN (SELECT tweet_id FROM minhash_buckets WHERE band = 0) m
+                ON t.id = CAST(m.tweet_id AS VARCHAR)
+            """
+        ).fetch_record_batch(batch_size)
+        added = duplicated = 0
+        for record_batch in reader:
+            batch = pl.from_arrow(record_batch)
+            duplicated += self._add(batch)
+            added += len(batch)
+            logger.info(
+                f"Hashed {added:,} tweets, {duplicated:,} with a near duplicate"
+            )
+        return added
+
+    def clusters(self, min_size: int = 2, limit: int = 20) -> pl.DataFrame:
+        """Largest clusters with their size and one example text."""
+        return self.db.connection.execute(
+            """
+            SELECT dup_cluster, COUNT(*) AS size, arg_min(text, id) AS example
+            FROM tweets
+            WHERE dup_cluster IS NOT NULL
+            GROUP BY dup_cluster
+            HAVING COUNT(*) >= ?
+            ORDER BY size DESC
+            LIMIT ?
+            """,
+            (min_size, limit),
+        ).pl()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"NearDuplicateIndex(num_perm={self.num_perm}, bands={self.bands})"
+
+
+def near_duplicate_clusters(
+    frame: pl.DataFrame,
+    num_perm: int = 128,
+    bands: int = 16,
+    shingle: int = 5,
+    seed: int = 1,
+) -> pl.DataFrame:
+    """Cluster a frame of ``tweet_id`` and ``text`` without a database.
+
+    Useful on staged or lake tweets, e.g. ``normalize(records).tweets``.
+
+    Returns:
+        pl.DataFrame: ``tweet_id`` and ``dup_cluster``, the smallest tweet ID
+        among its near duplicates.
+    """
+    ids = frame["tweet_id"].cast(pl.Utf8).cast(pl.UInt64, strict=False)
+    frame = frame.with_columns(tweet_id=ids).drop_nulls("tweet_id")
+    signatures = minhash_signatures(
+        normalize_text(frame["text"]).to_list(), shingle, num_perm, seed
+    )
+    keys = pl.DataFrame(
+        {
+            "band": np.tile(np.arange(bands), len(frame)),
+            "key": band_keys(signatures, bands).ravel(),
+            "tweet_id": np.repeat(frame["tweet_id"].to_numpy(), bands),
+        }
+    )
+    edges = _bucket_edges(keys)
+    all_ids = frame["tweet_id"].to_numpy()
+    nodes, labels = components(
+        np.concatenate([all_ids, edges["tweet_id"].to_numpy()]),
+        np.concatenate([all_ids, edges["first"].to_numpy()]),
+    )
+    return pl.DataFrame({"tweet_id": nodes, "dup_cluster": labels}).with_columns(
+        pl.col("tweet_id", "dup_cluster").cast(pl.Utf8)
+    )
@@ -0,0 +1,297 @@
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+from src.config import INTERIM_DATA_DIR, logger
+
+GRAPH_DIR = INTERIM_DATA_DIR / "graph"
+
+# Edge kind -> normalized tweet column holding the parent tweet ID.
+EDGE_COLUMNS = {
+    "reply": "in_reply_to_status_id",
+    "quote": "quoted_status_id",
+    "retweet": "retweet_tweet_id",
+}
+ARRAYS = ("ids", "present", "parent", "indptr", "indices", "depth", "root", "size")
+
+
+def load_edges(source: str = "lake", kind: str = "reply") -> pl.DataFrame:
+    """Read ``tweet_id``/``parent_id`` pairs of one edge kind.
+
+    Args:
+        source (str): ``"lake"`` for the Parquet lake, which has every edge
+            kind, or ``"duckdb"`` for the tweets table, which only has replies.
+        kind (str): One of ``EDGE_COLUMNS``.
+    """
+    if kind not in EDGE_COLUMNS:
+        raise ValueError(f"kind must be one of {list(EDGE_COLUMNS)}")
+    if source == "lake":
+        from src.db.lake import Lake
+
+        return Lake().query(
+            f"SELECT tweet_id, {EDGE_COLUMNS[kind]} AS parent_id FROM tweets"
+        )
+    if source == "duckdb":
+        from src.db import DB
+
+        if kind != "reply":
+            raise ValueError("The DuckDB tweets table only records replies")
+        with DB() as db:
+            return db.connection.execute(
+                "SELECT id AS tweet_id, in_reply_to AS parent_id FROM tweets"
+            ).pl()
+    raise ValueError(f"Unknown source: {source}")
+
+
+class ThreadGraph:
+    """Reply forest of the corpus as compressed sparse row (CSR) arrays.
+
+    Tweet IDs are mapped to dense node numbers by their position in the
+    sorted ``ids`` array, so looking a tweet up is a binary search. Parents
+    that were never collected are still nodes, with ``present`` set to
+    false, so the replies under them stay in one thread. Node ``i``'s
+    children are ``indices[indptr[i]:indptr[i + 1]]``.
+
+    The depth, thread root and subtree size of every node are computed for
+    the whole corpus when the graph is built. Tweet IDs grow with time, so an
+    edge to a parent with a larger ID than its child is bad data and is
+    dropped, which also keeps the graph free of cycles.
+
+    Arrays are saved as ``.npy`` files and memory-mapped on ``load``.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        present: np.ndarray,
+        parent: np.ndarray,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        depth: np.ndarray,
+        root: np.ndarray,
+        size: np.ndarray,
+    ) -> None:
+        self.ids = ids
+        self.present = present
+        self.parent = parent
+        self.indptr = indptr
+        self.indices = indices
+        self.depth = depth
+        self.root = root
+        self.size = size
+
+    @classmethod
+    def build(
+        cls, edges: pl.DataFrame, child: str = "tweet_id", parent: str = "parent_id"
+    ) -> "ThreadGraph":
+        """Build the graph from a frame of child and parent tweet IDs.
+
+        IDs may be strings or integers; rows whose child is not a valid ID
+        are ignored, and a child listed twice keeps its last parent.
+        """
+        edges = (
+            edges.select(
+                pl.col(child)
+                .cast(pl.Utf8)
+                .cast(pl.UInt64, strict=False)
+                .alias("child"),
+                pl.col(parent)
+                .cast(pl.Utf8)
+                .cast(pl.UInt64, strict=False)
+                .fill_null(0)
+                .alias("parent"),
+            )
+            .drop_nulls("child")
+            .unique("child", keep="last")
+        )
+        children = edges["child"].to_numpy()
+        parents = edges["parent"].to_numpy()
+        linked = (parents > 0) & (parents < children)
+
+        ids = np.sort(np.concatenate([children, parents[linked]]))
+        ids = ids[np.diff(ids, prepend=ids[:1] + 1) != 0]
+        n = len(ids)
+        present = np.zeros(n, dtype=bool)
+        present[np.searchsorted(ids, children)] = True
+        parent_of = np.full(n, -1, dtype=np.int64)
+        parent_of[np.searchsorted(ids, children[linked])] = np.searchsorted(
+            ids, parents[linked]
+        )
+
+        nodes = np.flatnonzero(parent_of >= 0)
+        indices = nodes[np.argsort(parent_of[nodes], kind="stable")]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(parent_of[nodes], minlength=n), out=indptr[1:])
+
+        depth, root = cls._ancestry(parent_of)
+        size = cls._subtree_sizes(parent_of, depth)
+        logger.info(
+            f"Built a graph of {n:,} tweets, {len(nodes):,} edges and "
+            f"{int((parent_of < 0).sum()):,} threads"
+        )
+        return cls(ids, present, parent_of, indptr, indices, depth, root, size)
+
+    @staticmethod
+    def _ancestry(parent: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Depth and root of every node by pointer jumping.
+
+        Every round each node jumps to its ancestor's ancestor, so a thread
+        of depth ``d`` is resolved in ``log2(d)`` vectorized rounds.
+        """
+        has_parent = parent >= 0
+        ancestor = np.where(has_parent, parent, np.arange(len(parent)))
+        depth = has_parent.astype(np.int64)
+        while True:
+            next_ancestor = ancestor[ancestor]
+            if np.array_equal(next_ancestor, ancestor):
+                return depth, ancestor
+            depth += depth[ancestor]
+            ancestor = next_ancestor
+
+    @staticmethod
+    def _subtree_sizes(parent: np.ndarray, depth: np.ndarray) -> np.ndarray:
+        """Number of tweets in every node's subtree, the node included."""
+        size = np.ones(len(parent), dtype=np.int64)
+        order = np.argsort(depth, kind="stable")
+        bounds = np.searchsorted(depth[order], np.arange(depth.max(initial=0) + 2))
+        # Deepest level first, so a node's size is final before it is added up.
+        for level in range(len(bounds) - 2, 0, -1):
+            nodes = order[bounds[level] : bounds[level + 1]]
+            np.add.at(size, parent[nodes], size[nodes])
+        return size
+
+    def index(self, tweet_ids) -> np.ndarray:
+        """Node numbers of ``tweet_ids``, ``-1`` for tweets not in the graph."""
+        values = np.atleast_1d(np.asarray(tweet_ids, dtype=np.uint64))
+        positions = np.searchsorted(self.ids, values)
+        positions[positions == len(self.ids)] = 0
+        found = len(self.ids) > 0 and self.ids[positions] == values
+        return np.where(found, positions, -1)
+
+    def _node(self, tweet_id: int | str) -> int:
+        node = int(self.index(int(tweet_id))[0])
+        if node < 0:
+            raise KeyError(f"Tweet {tweet_id} is not in the graph")
+        return node
+
+    def _descendants(self, start: np.ndarray) -> np.ndarray:
+        levels = [start]
+        level = start
+        while len(level):
+            starts = self.indptr[level]
+            counts = self.indptr[level + 1] - starts
+            total = int(counts.sum())
+            if not total:
+                break
+            # Gather every child slice of the level at once.
+            offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+            level = self.indices[offsets + np.arange(total)]
+            levels.append(level)
+        return np.concatenate(levels)
+
+    def _frame(self, nodes: np.ndarray) -> pl.DataFrame:
+        parent = self.parent[nodes]
+        parent_ids = np.where(parent >= 0, self.ids[np.maximum(parent, 0)], 0)
+        return pl.DataFrame(
+            {
+                "tweet_id": self.ids[nodes],
+                "parent_id": parent_ids,
+                "root_id": self.ids[self.root[nodes]],
+                "depth": self.depth[nodes],
+                "subtree_size": self.size[nodes],
+                "present": self.present[nodes],
+            }
+        ).with_columns(
+            pl.col("tweet_id", "root_id").cast(pl.Utf8),
+            pl.when(pl.col("parent_id") > 0).then(pl.col("parent_id").cast(pl.Utf8)),
+        )
+
+    def children(self, tweet_id: int | str) -> list[str]:
+        node = self._node(tweet_id)
+        children = self.indices[self.indptr[node] : self.indptr[node + 1]]
+        return [str(i) for i in self.ids[children]]
+
+    def subtree(self, tweet_id: int | str) -> pl.DataFrame:
+        """The tweet and every reply below it, parents before their replies."""
+        return self._frame(self._descendants(np.array([self._node(tweet_id)])))
+
+    def thread(self, tweet_id: int | str) -> pl.DataFrame:
+        """The whole thread the tweet belongs to, from its root down."""
+        root = self.root[self._node(tweet_id)]
+        return self._frame(self._descendants(np.array([root])))
+
+    def nodes(self) -> pl.DataFrame:
+        """Depth, root and subtree size of every tweet in the graph."""
+        return self._frame(np.arange(len(self.ids)))
+
+    def cascades(self, min_size: int = 2) -> pl.DataFrame:
+        """Shape of every thread with at least ``min_size`` tweets.
+
+        Returns:
+            pl.DataFrame: One row per thread root with its ``size``, ``depth``
+            (longest reply chain), ``breadth`` (most tweets at one depth),
+            ``direct_replies`` and whether the root tweet was collected.
+        """
+        roots = np.flatnonzero((self.parent < 0) & (self.size >= min_size))
+        levels = (
+            pl.DataFrame({"root": self.root, "depth": self.depth})
+            .filter(pl.col("root").is_in(roots))
+            .group_by("root", "depth")
+            .len()
+            .group_by("root")
+            .agg(depth=pl.col("depth").max(), breadth=pl.col("len").max())
+        )
+        return (
+            pl.DataFrame(
+                {
+                    "root": roots,
+                    "root_id": self.ids[roots],
+                    "size": self.size[roots],
+                    "direct_replies": self.indptr[roots + 1] - self.indptr[roots],
+                    "present": self.present[roots],
+                }
+            )
+            .join(levels, on="root")
+            .select(
+                pl.col("root_id").cast(pl.Utf8),
+                "size",
+                "depth",
+                "breadth",
+                "direct_replies",
+                "present",
+            )
+            .sort("size", descending=True)
+        )
+
+    def save(self, directory: Path = GRAPH_DIR / "reply") -> Path:
+        """Write the arrays to ``directory``, replacing any graph there."""
+        directory = Path(directory)
+        tmp = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name in ARRAYS:
+            np.save(tmp / f"{name}.npy", getattr(self, name))
+        old = directory.with_name(directory.name + ".old")
+        if directory.exists():
+            os.replace(directory, old)
+        os.replace(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+        return directory
+
+    @classmethod
+    def load(cls, directory: Path = GRAPH_DIR / "reply") -> "ThreadGraph":
+        directory = Path(directory)
+        if not directory.exists():
+            raise FileNotFoundError(f"No graph built yet at {directory}")
+        return cls(
+            *(np.load(directory / f"{name}.npy", mmap_mode="r") for name in ARRAYS)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"ThreadGraph(tweets={len(self.ids)}, edges={len(self.indices)})"
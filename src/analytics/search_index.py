@@ -0,0 +1,374 @@
+import hashlib
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import polars as pl
+from pydantic import BaseModel
+
+from src.config import INTERIM_DATA_DIR, logger
+from src.utils.metrics import METRICS
+
+if TYPE_CHECKING:
+    from src.db import DB
+
+SEARCH_DIR = INTERIM_DATA_DIR / "search"
+
+# Words, #hashtags and @mentions; a hashtag is a different term from its word.
+TOKEN_PATTERN = r"[#@]?\w+"
+URL_PATTERN = r"https?://\S+"
+SEGMENT_ARRAYS = ("terms", "offsets", "counts", "docs")
+
+
+def tokenize(texts: pl.Series) -> pl.Series:
+    """Lowercase terms of every text, as a list column, links removed."""
+    return (
+        texts.fill_null("")
+        .str.to_lowercase()
+        .str.replace_all(URL_PATTERN, " ")
+        .str.extract_all(TOKEN_PATTERN)
+    )
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash of a term, the key of the term dictionary."""
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest())
+
+
+def varint_sizes(values: np.ndarray) -> np.ndarray:
+    """Bytes each unsigned integer takes once varint-encoded."""
+    sizes = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        sizes += values >= np.uint64(1 << shift)
+    return sizes
+
+
+def encode_varint(values: np.ndarray) -> np.ndarray:
+    """LEB128-encode unsigned integers, 7 bits per byte.
+
+    The high bit of a byte is set when more bytes of the same value follow.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = varint_sizes(values)
+    value_of = np.repeat(np.arange(len(values)), sizes)
+    # Number of each output byte within its value.
+    position = np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    shift = np.uint64(7) * position.astype(np.uint64)
+    out = (values[value_of] >> shift) & np.uint64(0x7F)
+    more = position < sizes[value_of] - 1
+    return (out | (more.astype(np.uint64) << np.uint64(7))).astype(np.uint8)
+
+
+def decode_varint(data: np.ndarray) -> np.ndarray:
+    """Inverse of ``encode_varint``."""
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.uint64)
+    last = (data & 0x80) == 0
+    ends = np.flatnonzero(last)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    shift = np.uint64(7) * position.astype(np.uint64)
+    parts = (data & 0x7F).astype(np.uint64) << shift
+    return np.bitwise_or.reduceat(parts, starts)
+
+
+class Segment:
+    """One immutable batch of the index, covering ordinals ``[start, end)``.
+
+    ``terms`` holds the sorted term hashes, and the postings of
+    ``terms[i]`` are the varint-encoded bytes
+    ``postings[offsets[i]:offsets[i + 1]]``: the first ordinal, then the
+    gaps between consecutive ordinals. ``docs[o - start]`` is the tweet ID
+    of ordinal ``o``. Every array is memory-mapped.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        start, end = path.name.removeprefix("seg-").split("-")
+        self.start, self.end = int(start), int(end)
+        for name in SEGMENT_ARRAYS:
+            setattr(self, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+        self.postings = np.memmap(path / "postings.bin", dtype=np.uint8, mode="r")
+
+    def find(self, key: int) -> int:
+        position = int(np.searchsorted(self.terms, np.uint64(key)))
+        if position < len(self.terms) and self.terms[position] == key:
+            return position
+        return -1
+
+    def ordinals(self, key: int) -> np.ndarray:
+        position = self.find(key)
+        if position < 0:
+            return np.empty(0, dtype=np.uint64)
+        encoded = self.postings[self.offsets[position] : self.offsets[position + 1]]
+        return np.cumsum(decode_varint(encoded), dtype=np.uint64)
+
+    def count(self, key: int) -> int:
+        position = self.find(key)
+        return int(self.counts[position]) if position >= 0 else 0
+
+    def pairs(self) -> tuple[np.ndarray, np.ndarray]:
+        """Every ``(term hash, ordinal)`` of the segment, for merging."""
+        gaps = decode_varint(self.postings)
+        lengths = self.counts.astype(np.int64)
+        firsts = np.cumsum(lengths) - lengths
+        # The first gap of every term is an ordinal, so restart the sum there.
+        total = np.cumsum(gaps, dtype=np.uint64)
+        restart = np.repeat(total[firsts] - gaps[firsts], lengths)
+        return np.repeat(np.asarray(self.terms), lengths), total - restart
+
+    @staticmethod
+    def write(
+        directory: Path, start: int, keys: np.ndarray, ordinals: np.ndarray, docs
+    ) -> Path:
+        """Write a segment of ``(keys[i], ordinals[i])`` postings.
+
+        The pairs must be sorted by key, then ordinal, without duplicates.
+        """
+        terms, firsts, counts = np.unique(keys, return_index=True, return_counts=True)
+        gaps = np.diff(ordinals, prepend=np.uint64(0)).astype(np.uint64)
+        gaps[firsts] = ordinals[firsts]
+        encoded = encode_varint(gaps)
+        sizes = varint_sizes(gaps)
+        # Byte offset of each term's first posting, then the end of the last.
+        offsets = np.append((np.cumsum(sizes) - sizes)[firsts], len(encoded))
+
+        path = directory / f"seg-{start:012d}-{start + len(docs):012d}"
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "terms.npy", terms.astype(np.uint64))
+        np.save(tmp / "offsets.npy", offsets.astype(np.int64))
+        np.save(tmp / "counts.npy", counts.astype(np.uint32))
+        np.save(tmp / "docs.npy", np.asarray(docs, dtype=np.uint64))
+        encoded.tofile(tmp / "postings.bin")
+        os.replace(tmp, path)
+        return path
+
+
+class SearchResult(BaseModel):
+    query: str
+    count: int
+    tweet_ids: list[str]
+    seconds: float
+
+
+class SearchIndex:
+    """Inverted index of tweet terms, hashtags and mentions, on disk.
+
+    Every tweet gets the next ordinal when it is added, and each ``add``
+    writes one immutable ``Segment`` holding its postings, so earlier
+    segments are never rewritten and readers see whole segments only. Once
+    there are more than ``max_segments``, they are merged into one. Terms
+    are looked up by a binary search over memory-mapped term hashes, and a
+    query only decodes the postings of its own terms.
+
+    Queries are whitespace-separated terms that must all match. ``a|b``
+    matches either term and ``-term`` excludes tweets with it, e.g.
+    ``#blacklivesmatter protest|march -@cnn``.
+
+    Only one process should add to an index at a time.
+
+    Args:
+        root (Path): Directory holding the segments.
+        max_segments (int): Segments kept before they are merged.
+    """
+
+    def __init__(self, root: Path = SEARCH_DIR, max_segments: int = 8) -> None:
+        self.root = Path(root)
+        self.max_segments = max_segments
+        self.segments = self._open()
+
+    def _open(self) -> list[Segment]:
+        if not self.root.exists():
+            return []
+        paths = sorted(
+            (p for p in self.root.glob("seg-*") if not p.name.endswith(".tmp")),
+            key=lambda p: (p.name.split("-")[1], -int(p.name.split("-")[2])),
+        )
+        segments: list[Segment] = []
+        for path in paths:
+            segment = Segment(path)
+            if segments and segment.end <= segments[-1].end:
+                # Left behind by a merge that stopped before cleaning up.
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            segments.append(segment)
+        return segments
+
+    @property
+    def size(self) -> int:
+        """Ordinals handed out so far, the number of tweets indexed."""
+        return self.segments[-1].end if self.segments else 0
+
+    def indexed(self) -> np.ndarray:
+        """Sorted IDs of every indexed tweet."""
+        if not self.segments:
+            return np.empty(0, dtype=np.uint64)
+        return np.sort(np.concatenate([segment.docs for segment in self.segments]))
+
+    def add(self, batch: pl.DataFrame) -> int:
+        """Index a frame of ``tweet_id`` and ``text`` not in the index yet.
+
+        Returns:
+            int: Number of tweets indexed.
+        """
+        batch = (
+            batch.with_columns(
+                pl.col("tweet_id").cast(pl.Utf8).cast(pl.UInt64, strict=False)
+            )
+            .drop_nulls("tweet_id")
+            .unique("tweet_id", keep="last", maintain_order=True)
+        )
+        if batch.is_empty():
+            return 0
+
+        start = self.size
+        postings = (
+            batch.select(
+                ordinal=pl.int_range(start, start + len(batch), dtype=pl.UInt64),
+                term=tokenize(batch["text"]).list.unique(),
+            )
+            .explode("term")
+            .drop_nulls("term")
+        )
+        vocabulary = postings["term"].unique()
+        keys = pl.DataFrame(
+            {
+                "term": vocabulary,
+                "key": pl.Series(
+                    [term_hash(term) for term in vocabulary], dtype=pl.UInt64
+                ),
+            }
+        )
+        postings = postings.join(keys, on="term").sort("key", "ordinal")
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = Segment.write(
+            self.root,
+            start,
+            postings["key"].to_numpy(),
+            postings["ordinal"].to_numpy(),
+            batch["tweet_id"].to_numpy(),
+        )
+        self.segments.append(Segment(path))
+        METRICS.inc("search_indexed_total", len(batch))
+        if len(self.segments) > self.max_segments:
+            self.merge()
+        return len(batch)
+
+    def update(self, db: "DB", batch_size: int = 100_000) -> int:
+        """Index the DuckDB tweets that are not in the index yet.
+
+        Returns:
+            int: Number of tweets indexed.
+        """
+        indexed = pl.Series("id", self.indexed()).cast(pl.Utf8).to_frame()
+        connection = db.connection.cursor()
+        connection.register("indexed", indexed)
+        try:
+            reader = connection.execute(
+                """
+                SELECT t.id AS tweet_id, t.text
+                FROM tweets t
+                ANTI JOIN indexed i ON t.id = i.id
+                """
+            ).fetch_record_batch(batch_size)
+            added = 0
+            for record_batch in reader:
+                added += self.add(pl.from_arrow(record_batch))
+                logger.info(f"Indexed {added:,} new tweets")
+        finally:
+            connection.close()
+        return added
+
+    def merge(self) -> None:
+        """Merge every segment into one."""
+        if len(self.segments) < 2:
+            return
+        keys, ordinals = zip(*(segment.pairs() for segment in self.segments))
+        keys, ordinals = np.concatenate(keys), np.concatenate(ordinals)
+        order = np.lexsort((ordinals, keys))
+        docs = np.concatenate([segment.docs for segment in self.segments])
+        path = Segment.write(self.root, 0, keys[order], ordinals[order], docs)
+        # The merged segment covers the old ones, so a crash here only leaves
+        # files that the next open deletes.
+        for segment in self.segments:
+            shutil.rmtree(segment.path, ignore_errors=True)
+        self.segments = [Segment(path)]
+        logger.info(f"Merged the search index into one segment of {len(docs):,}")
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.segments = []
+
+    def _ordinals(self, term: str) -> np.ndarray:
+        terms = tokenize(pl.Series([term]))[0].to_list()
+        if not terms:
+            return np.empty(0, dtype=np.uint64)
+        # A term the tokenizer splits, e.g. "black-lives", needs all its parts.
+        result = None
+        for part in terms:
+            key = term_hash(part)
+            found = np.concatenate(
+                [np.empty(0, dtype=np.uint64)]
+                + [segment.ordinals(key) for segment in self.segments]
+            )
+            result = found if result is None else np.intersect1d(result, found)
+        return result
+
+    def count(self, term: str) -> int:
+        """Number of tweets containing a single term, without decoding."""
+        key = term_hash(term.lower())
+        return sum(segment.count(key) for segment in self.segments)
+
+    def search(self, query: str, limit: int = 20) -> SearchResult:
+        """Tweets matching ``query``, the most recently indexed first.
+
+        Returns:
+            SearchResult: The number of matches and up to ``limit`` tweet IDs.
+        """
+        start = time.perf_counter()
+        required, excluded = [], []
+        for token in query.split():
+            target = required
+            if token.startswith("-") and len(token) > 1:
+                target, token = excluded, token[1:]
+            alternatives = [self._ordinals(term) for term in token.split("|")]
+            target.append(np.unique(np.concatenate(alternatives)))
+
+        if not required:
+            raise ValueError("A query needs at least one term that is not excluded")
+        # Intersect the shortest lists first, so later steps stay small.
+        required.sort(key=len)
+        matches = required[0]
+        for ordinals in required[1:]:
+            if not len(matches):
+                break
+            matches = np.intersect1d(matches, ordinals, assume_unique=True)
+        for ordinals in excluded:
+            matches = np.setdiff1d(matches, ordinals, assume_unique=True)
+
+        newest = matches[::-1][:limit]
+        tweet_ids = [str(self._tweet_id(int(ordinal))) for ordinal in newest]
+        seconds = time.perf_counter() - start
+        METRICS.observe("search_seconds", seconds)
+        return SearchResult(
+            query=query, count=len(matches), tweet_ids=tweet_ids, seconds=seconds
+        )
+
+    def _tweet_id(self, ordinal: int) -> int:
+        for segment in self.segments:
+            if segment.start <= ordinal < segment.end:
+                return int(segment.docs[ordinal - segment.start])
+        raise KeyError(ordinal)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __repr__(self):
+        return f"SearchIndex(root={self.root}, segments={len(self.segments)})"
@@ -1,56 +1,88 @@
 import os
 import pathlib
-from enum import Enum
+from functools import cache
 from pathlib import Path
 
-import pyotp
 from dotenv import load_dotenv
 from loguru import logger
 
-from src.utils import check_env_variable
+from src.utils.check_env_variable import check_env_variable
 
 PROJECT_ROOT: Path = pathlib.Path(__file__).resolve().parent.parent
 ENV_FILE: Path = PROJECT_ROOT / ".env"
 DATA_DIR: Path = PROJECT_ROOT / "data"
 EXTERNAL_DATA_DIR: Path = DATA_DIR / "external"
 INTERIM_DATA_DIR: Path = DATA_DIR / "interim"
-
-if not ENV_FILE.exists():
-    logger.warning(
-        f".env file not found at {ENV_FILE}. Please create one with the required environment variables."
-    )
-else:
-    load_dotenv(dotenv_path=ENV_FILE)
-    logger.info(f"Loaded environment variables from {ENV_FILE}")
+BLM_IDS_FILE: Path = EXTERNAL_DATA_DIR / "TAPS dataset" / "blacklivesmatter.txt"
 
 required_env_vars: list[str] = []
 non_essential_env_vars: list[str] = []
 
-for var in required_env_vars:
-    value: str | None = os.getenv(var)
-    check_env_variable(value, var, important=True)
 
-for var in non_essential_env_vars:
-    value = os.getenv(var)
-    check_env_variable(value, var)
+@cache
+def load_env() -> None:
+    """Load ``.env`` and check the environment, once, on the first setting read."""
+    # Log key paths
+    logger.info(f"PROJECT_ROOT: {PROJECT_ROOT}")
+    logger.info(f"DATA_DIR: {DATA_DIR}")
 
+    if not ENV_FILE.exists():
+        logger.warning(
+            f".env file not found at {ENV_FILE}. Please create one with the required environment variables."
+        )
+    else:
+        load_dotenv(dotenv_path=ENV_FILE)
+        logger.info(f"Loaded environment variables from {ENV_FILE}")
 
-class Settings(Enum):
-    """Settings class to hold environment variables."""
+    for var in required_env_vars:
+        value: str | None = os.getenv(var)
+        check_env_variable(value, var, important=True)
+
+    for var in non_essential_env_vars:
+        value = os.getenv(var)
+        check_env_variable(value, var)
+
+
+class Setting:
+    """Environment variable read when its ``value`` is accessed, not at import."""
+
+    def __init__(self, name: str, default: str = "") -> None:
+        self.name = name
+        self.default = default
+
+    @property
+    def value(self) -> str:
+        load_env()
+        return os.getenv(self.name, self.default)
+
+    def __repr__(self):
+        return f"Setting(name={self.name})"
 
-    PYOTP = pyotp.TOTP(os.getenv("X_TOTP", ""))
+
+class TOTPSetting(Setting):
+    """Current one-time code of the TOTP secret in ``name``.
+
+    A code expires after 30 seconds, so a new one is generated on every access.
+    """
+
+    @property
+    def value(self) -> str:
+        import pyotp
+
+        return pyotp.TOTP(super().value).now()
+
+
+class Settings:
+    """Settings class to hold environment variables."""
 
     # Add more environment variables as needed
-    # EXAMPLE = os.getenv("example")
-    X_USERNAME = os.getenv("X_USERNAME", "")
-    X_PASSWORD = os.getenv("X_PASSWORD", "")
-    X_TOTP = PYOTP.now()
-    X_RAPIDAPI_KEY = os.getenv("X_RAPIDAPI_KEY", "")
-    POCKETBASE_EMAIL= os.getenv("POCKETBASE_EMAIL", "")
-    POCKETBASE_PASSWORD= os.getenv("POCKETBASE_PASSWORD", "")
-    POCKETBASE_URL= os.getenv("POCKETBASE_URL", "")
-
-
-# Log key paths
-logger.info(f"PROJECT_ROOT: {PROJECT_ROOT}")
-logger.info(f"DATA_DIR: {DATA_DIR}")
+    # EXAMPLE = Setting("example")
+    X_USERNAME = Setting("X_USERNAME")
+    X_PASSWORD = Setting("X_PASSWORD")
+    X_TOTP = TOTPSetting("X_TOTP")
+    X_RAPIDAPI_KEY = Setting("X_RAPIDAPI_KEY")
+    # Comma-separated Tweety session names, one logged-in account each
+    X_SESSIONS = Setting("X_SESSIONS", "session")
+    POCKETBASE_EMAIL = Setting("POCKETBASE_EMAIL")
+    POCKETBASE_PASSWORD = Setting("POCKETBASE_PASSWORD")
+    POCKETBASE_URL = Setting("POCKETBASE_URL")
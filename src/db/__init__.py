@@ -1,4 +1,25 @@
-from .database import DB
-from .pb_warehouse import PBWarehouse
+from importlib import import_module
+from typing import TYPE_CHECKING
 
-__all__ = ["DB", "PBWarehouse"]
+if TYPE_CHECKING:
+    from .database import BufferedSink, DB
+    from .frontier import Frontier
+    from .pb_warehouse import PBWarehouse
+
+# Exports are imported on first access, so a command only loads what it uses.
+_EXPORTS = {
+    "BufferedSink": ".database",
+    "DB": ".database",
+    "Frontier": ".frontier",
+    "PBWarehouse": ".pb_warehouse",
+}
+
+__all__ = ["BufferedSink", "DB", "Frontier", "PBWarehouse"]
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,8 +1,41 @@
+import atexit
+import signal
+import threading
+import time
 from pprint import pprint
+from typing import Iterator
 
 from pathlib import Path
-from src.config import INTERIM_DATA_DIR
+from src.config import INTERIM_DATA_DIR, logger
+from src.utils.metrics import METRICS
 import duckdb
+import polars as pl
+
+TWEET_COLUMNS = [
+    "id",
+    "text",
+    "retweet_count",
+    "reply_count",
+    "like_count",
+    "quote_count",
+    "community_note",
+    "comments",
+    "in_reply_to",
+    "sensitive_flag",
+    "lang",
+    "time_of_day",
+    "is_reply",
+    "source",
+    "url",
+    "author_id",
+    "author_name",
+    "verified_author",
+    "bookmark_count",
+    "views",
+    "has_moderated_replies",
+    "community",
+]
+ERROR_COLUMNS = ["id", "error_message", "error_type"]
 
 
 class DB:
@@ -59,21 +92,165 @@ class DB:
     def fetchall(self, query: str, params: tuple = ()) -> list:
         return self.connection.execute(query, params).fetchall()
 
-    def view_data(self) -> None:
+    def sink(self, table: str, columns: list[str], **kwargs) -> "BufferedSink":
+        """Return a ``BufferedSink`` writing ``columns`` of ``table``."""
+        return BufferedSink(self, table, columns, **kwargs)
 
+    def columns(self, table: str) -> list[str]:
+        """Return the column names of ``table``, raising if it does not exist."""
+        rows = self.fetchall(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = ? ORDER BY ordinal_position",
+            (table,),
+        )
+        if not rows:
+            raise ValueError(f"Unknown table: {table}")
+        return [row[0] for row in rows]
 
-        pprint(self.connection.execute(
-            """
-            SELECT * FROM errors
-            """
-        ).fetch_df())
+    def _select(
+        self,
+        table: str,
+        columns: list[str] | None = None,
+        where: str | None = None,
+    ) -> tuple[str, list[str]]:
+        known = self.columns(table)
+        columns = columns or known
+        unknown = set(columns) - set(known)
+        if unknown:
+            raise ValueError(
+                f"Unknown columns in {table}: {', '.join(sorted(unknown))}"
+            )
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        query = f'SELECT {quoted} FROM "{table}"'
+        if where:
+            query += f" WHERE {where}"
+        return query, columns
+
+    def iter_batches(
+        self,
+        table: str,
+        columns: list[str] | None = None,
+        where: str | None = None,
+        order_by: str | None = None,
+        limit: int | None = None,
+        params: tuple = (),
+        batch_size: int = 10_000,
+    ) -> Iterator[pl.DataFrame]:
+        """Stream rows of ``table`` as polars frames of ``batch_size`` rows.
+
+        Rows come out of DuckDB as Arrow record batches, so only one batch is
+        in memory at a time however large the table is.
+
+        Args:
+            table (str): Table to read, e.g. ``"tweets"`` or ``"errors"``.
+            columns (list[str] | None): Columns to return, ``None`` for all.
+            where (str | None): SQL filter, e.g. ``"retweet_count > ?"``.
+            order_by (str | None): SQL ordering, e.g. ``"retweet_count DESC"``.
+            limit (int | None): Maximum number of rows.
+            params (tuple): Values for the ``?`` placeholders of ``where``.
+            batch_size (int): Rows per yielded frame.
+        """
+        query, _ = self._select(table, columns, where)
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+
+        reader = self.connection.execute(query, params).fetch_record_batch(batch_size)
+        for batch in reader:
+            yield pl.from_arrow(batch)
+
+    def summarize(
+        self,
+        table: str,
+        columns: list[str] | None = None,
+        where: str | None = None,
+        params: tuple = (),
+    ) -> pl.DataFrame:
+        """Return the row count, null rate and min/max of every column.
+
+        All statistics come from one aggregate query, so no rows are
+        materialized outside DuckDB.
+        """
+        query, columns = self._select(table, columns, where)
+        aggregates = ["COUNT(*)"]
+        for column in columns:
+            quoted = f'"{column}"'
+            aggregates += [
+                f"COUNT({quoted})",
+                f"approx_count_distinct({quoted})",
+                f"MIN({quoted})::VARCHAR",
+                f"MAX({quoted})::VARCHAR",
+            ]
+        row = self.connection.execute(
+            f"SELECT {', '.join(aggregates)} FROM ({query})", params
+        ).fetchone()
 
-        pprint(self.connection.execute(
+        rows, values = row[0], row[1:]
+        return pl.DataFrame(
+            [
+                {
+                    "column": column,
+                    "rows": rows,
+                    "nulls": rows - values[4 * i],
+                    "null_rate": (rows - values[4 * i]) / rows if rows else 0.0,
+                    "distinct": values[4 * i + 1],
+                    "min": values[4 * i + 2],
+                    "max": values[4 * i + 3],
+                }
+                for i, column in enumerate(columns)
+            ],
+            schema={
+                "column": pl.Utf8,
+                "rows": pl.Int64,
+                "nulls": pl.Int64,
+                "null_rate": pl.Float64,
+                "distinct": pl.Int64,
+                "min": pl.Utf8,
+                "max": pl.Utf8,
+            },
+        )
+
+    def error_histogram(self) -> pl.DataFrame:
+        """Count the rows of the ``errors`` table per error type."""
+        return self.connection.execute(
             """
-            SELECT * FROM tweets
+            SELECT error_type, COUNT(*) AS count
+            FROM errors
+            GROUP BY error_type
+            ORDER BY count DESC
             """
-        ).fetch_df())
+        ).pl()
+
+    def view_data(
+        self,
+        table: str = "tweets",
+        columns: list[str] | None = None,
+        where: str | None = None,
+        order_by: str | None = None,
+        limit: int | None = 20,
+        page_size: int = 20,
+        summary: bool = False,
+    ) -> None:
+        """Print ``table`` page by page, or its summary statistics.
+
+        Args:
+            summary (bool): Print per-column statistics and, for ``errors``,
+                the error type histogram instead of rows.
+
+        See ``iter_batches`` for the other arguments.
+        """
+        with pl.Config(tbl_rows=-1, tbl_width_chars=160, fmt_str_lengths=50):
+            if summary:
+                print(self.summarize(table, columns, where))
+                if table == "errors":
+                    print(self.error_histogram())
+                return
 
+            for page in self.iter_batches(
+                table, columns, where, order_by, limit, batch_size=page_size
+            ):
+                print(page)
 
     def view_schema(self) -> None:
         schema = self.connection.execute("DESCRIBE tweets").fetch_df()
@@ -96,3 +273,170 @@ class DB:
 
     def __str__(self):
         return f"Database connection to {self.db_path}"
+
+
+class BufferedSink:
+    """Buffered bulk inserter for one DuckDB table.
+
+    Records are collected in memory and written with a single
+    ``INSERT ... SELECT`` from a polars (Arrow) frame once ``batch_size``
+    records are buffered or ``flush_interval`` seconds have passed, whichever
+    comes first. A background thread handles the time trigger, and the sink
+    flushes on ``close`` and at interpreter exit. If a batch is rejected, its
+    rows are retried one by one so a single bad row only loses itself.
+
+    SIGINT and SIGTERM only set ``interrupted`` before the previous handler
+    runs, as flushing inside the handler could re-enter a write in progress.
+    A SIGTERM that would have killed the process raises ``SystemExit``
+    instead, so the buffer is flushed by ``close`` on the way out. The
+    previous handlers are restored on ``close``.
+
+    Args:
+        db (DB): Database to write to.
+        table (str): Target table, e.g. ``"tweets"`` or ``"errors"``.
+        columns (list[str]): Columns every record provides.
+        batch_size (int): Buffered records that trigger a flush.
+        flush_interval (float | None): Seconds between time-triggered flushes.
+        ignore_conflicts (bool): Skip rows whose primary key already exists.
+    """
+
+    def __init__(
+        self,
+        db: DB,
+        table: str,
+        columns: list[str],
+        batch_size: int = 1_000,
+        flush_interval: float | None = 30.0,
+        ignore_conflicts: bool = True,
+    ) -> None:
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.ignore_conflicts = ignore_conflicts
+        self.written = 0
+        self.failed = 0
+        self.interrupted: int | None = None
+
+        self._cursor = db.connection.cursor()
+        self._buffer: list[dict] = []
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._last_flush = time.monotonic()
+        self._previous_handlers: dict[int, object] = {}
+
+        if flush_interval:
+            threading.Thread(target=self._flush_periodically, daemon=True).start()
+        atexit.register(self.close)
+        self._install_signal_handlers()
+
+    def add(self, record: dict) -> None:
+        with self._lock:
+            self._buffer.append({column: record.get(column) for column in self.columns})
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+
+    def add_frame(self, frame: pl.DataFrame) -> None:
+        """Write a frame holding ``columns`` straight away, after the buffer."""
+        with self._lock:
+            self.flush()
+            if len(frame):
+                self._write(frame.select(self.columns))
+
+    def flush(self) -> None:
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._buffer:
+                return
+            records, self._buffer = self._buffer, []
+            try:
+                self._write(
+                    pl.DataFrame(records, strict=False, infer_schema_length=None)
+                )
+            except BaseException:
+                # Interrupted mid-write, keep the records for ``close``.
+                self._buffer = records + self._buffer
+                raise
+
+    def _write(self, batch: pl.DataFrame) -> None:
+        try:
+            self._insert(batch)
+        except (duckdb.Error, pl.exceptions.PolarsError) as e:
+            logger.warning(
+                f"Bulk insert of {len(batch)} rows into {self.table} failed "
+                f"({type(e).__name__}), retrying row by row"
+            )
+            for row in batch.iter_slices(1):
+                try:
+                    self._insert(row)
+                except (duckdb.Error, pl.exceptions.PolarsError) as e:
+                    self.failed += 1
+                    METRICS.record_error(f"duckdb:{self.table}", e)
+                    logger.error(
+                        f"Error inserting {row.row(0, named=True).get('id')} "
+                        f"into {self.table}: {e}"
+                    )
+
+    def _insert(self, batch: pl.DataFrame) -> None:
+        start = time.perf_counter()
+        verb = "INSERT OR IGNORE" if self.ignore_conflicts else "INSERT"
+        columns = ", ".join(self.columns)
+        self._cursor.register("batch", batch)
+        try:
+            # The changed-row count leaves out rows INSERT OR IGNORE skipped.
+            (inserted,) = self._cursor.execute(
+                f"{verb} INTO {self.table} ({columns}) SELECT {columns} FROM batch"
+            ).fetchone()
+            self._cursor.commit()
+        finally:
+            self._cursor.unregister("batch")
+        self.written += inserted
+        METRICS.inc("rows_written_total", inserted, sink="duckdb", table=self.table)
+        METRICS.observe(
+            "flush_seconds", time.perf_counter() - start, sink="duckdb", table=self.table
+        )
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def _install_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self._previous_handlers[signum] = signal.getsignal(signum)
+            signal.signal(signum, self._on_signal)
+
+    def _on_signal(self, signum: int, frame) -> None:
+        self.interrupted = signum
+        previous = self._previous_handlers.get(signum)
+        if callable(previous):
+            previous(signum, frame)
+        elif previous == signal.SIG_DFL:
+            raise SystemExit(128 + signum)
+
+    def _restore_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum, previous in self._previous_handlers.items():
+            # Keep the handler of a sink opened later, it chains to this one.
+            if signal.getsignal(signum) == self._on_signal:
+                signal.signal(signum, previous)
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self.flush()
+        self._restore_signal_handlers()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"BufferedSink(table={self.table}, batch_size={self.batch_size})"
@@ -0,0 +1,314 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import duckdb
+import numpy as np
+import polars as pl
+
+from src.config import INTERIM_DATA_DIR, logger
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class Frontier:
+    """Persistent crawl frontier for one fetch job.
+
+    Each work item (a tweet ID, an ID range, a search query...) is a row in
+    the shared ``frontier`` table together with the cursor of the next page
+    to fetch, its status, the number of attempts and the last error.
+    Progress is buffered and written back every ``batch_size`` updates, on
+    ``flush`` and on ``close``, so a restarted command resumes from the last
+    checkpoint instead of refetching from the start.
+
+    Set ``before_flush`` to flush whatever holds the fetched data (e.g. a
+    staging writer) so a cursor is never persisted ahead of its data.
+
+    Args:
+        job (str): Name of the fetch job, e.g. ``"replies"``.
+        db_path (Path | str): DuckDB file holding the frontier table.
+        batch_size (int): Buffered updates written per checkpoint.
+    """
+
+    def __init__(
+        self,
+        job: str,
+        db_path: Path | str = INTERIM_DATA_DIR / "frontier.duckdb",
+        batch_size: int = 100,
+    ) -> None:
+        self.job = job
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.connection = duckdb.connect(str(db_path))
+        self._updates: dict[str, dict] = {}
+        self._unflushed = 0
+        self.before_flush: Callable[[], None] | None = None
+
+        self.init_table()
+
+    def init_table(self) -> None:
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS frontier (
+    job VARCHAR,
+    item_id VARCHAR,
+    position BIGINT,
+    cursor TEXT,
+    status VARCHAR DEFAULT 'pending',
+    attempts INTEGER DEFAULT 0,
+    last_error TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (job, item_id)
+);
+        """
+        )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS watermarks (
+    job VARCHAR PRIMARY KEY,
+    value VARCHAR,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+        """
+        )
+
+    def seed(
+        self, item_ids: list[str] | pl.Series | np.ndarray, cursor: str | None = None
+    ) -> int:
+        """Add new work items, leaving items already in the frontier untouched.
+
+        ``item_ids`` may also be a Series or array, e.g. packed ``uint64``
+        tweet IDs, which are cast to strings inside polars.
+
+        Returns:
+            int: Number of items that were not in the frontier yet.
+        """
+        offset = self.connection.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM frontier WHERE job = ?",
+            (self.job,),
+        ).fetchone()[0]
+        items = (
+            pl.Series("item_id", item_ids)
+            .cast(pl.Utf8)
+            .to_frame()
+            .with_row_index("position", offset=offset)
+        )
+
+        before = self.count()
+        self.connection.register("items", items)
+        try:
+            self.connection.execute(
+                """
+                INSERT OR IGNORE INTO frontier (job, item_id, position, cursor)
+                SELECT ?, item_id, position, ? FROM items
+                """,
+                (self.job, cursor),
+            )
+        finally:
+            self.connection.unregister("items")
+        added = self.count() - before
+        logger.info(f"Frontier '{self.job}': {added:,} new of {len(item_ids):,} items")
+        return added
+
+    def pending(
+        self,
+        limit: int | None = None,
+        retry_failed: bool = False,
+        max_attempts: int = 3,
+    ) -> list[tuple[str, str | None]]:
+        """Return ``(item_id, cursor)`` for items that still need fetching."""
+        self.flush()
+        statuses = [PENDING, FAILED] if retry_failed else [PENDING]
+        query = """
+            SELECT item_id, cursor FROM frontier
+            WHERE job = ? AND list_contains(?, status) AND attempts < ?
+            ORDER BY position
+            """
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return self.connection.execute(
+            query, (self.job, statuses, max_attempts)
+        ).fetchall()
+
+    def pending_ids(
+        self, retry_failed: bool = False, max_attempts: int = 3
+    ) -> np.ndarray:
+        """Return the pending items of a tweet ID job as a packed ``uint64`` array."""
+        self.flush()
+        statuses = [PENDING, FAILED] if retry_failed else [PENDING]
+        return (
+            self.connection.execute(
+                """
+                SELECT item_id::UBIGINT AS id FROM frontier
+                WHERE job = ? AND list_contains(?, status) AND attempts < ?
+                ORDER BY position
+                """,
+                (self.job, statuses, max_attempts),
+            )
+            .pl()
+            .to_series()
+            .to_numpy()
+        )
+
+    def pending_page(
+        self,
+        after: int = -1,
+        limit: int = 1000,
+        retry_failed: bool = False,
+        max_attempts: int = 3,
+    ) -> list[tuple[int, str, str | None]]:
+        """Return ``(position, item_id, cursor)`` of pending items past ``after``.
+
+        Pass the last position of a page as ``after`` to get the next one, so
+        a long frontier is walked in pages rather than loaded at once.
+        """
+        self.flush()
+        statuses = [PENDING, FAILED] if retry_failed else [PENDING]
+        return self.connection.execute(
+            """
+            SELECT position, item_id, cursor FROM frontier
+            WHERE job = ? AND position > ? AND list_contains(?, status)
+                AND attempts < ?
+            ORDER BY position
+            LIMIT ?
+            """,
+            (self.job, after, statuses, max_attempts, limit),
+        ).fetchall()
+
+    def watermark(self) -> str | None:
+        """Return how far the job's source has been read, if recorded."""
+        row = self.connection.execute(
+            "SELECT value FROM watermarks WHERE job = ?", (self.job,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, value: str) -> None:
+        """Record that the job's source has been read up to ``value``.
+
+        Buffered progress is flushed first, so the watermark never runs
+        ahead of the items seeded from before it.
+        """
+        self.flush()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)",
+            (self.job, value, datetime.now()),
+        )
+
+    def get_cursor(self, item_id: str) -> str | None:
+        if item_id in self._updates:
+            return self._updates[item_id]["cursor"]
+        row = self.connection.execute(
+            "SELECT cursor FROM frontier WHERE job = ? AND item_id = ?",
+            (self.job, item_id),
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_status(self, item_id: str) -> str | None:
+        """Return the status of ``item_id``, ``None`` if it was never seeded."""
+        if item_id in self._updates:
+            return self._updates[item_id]["status"]
+        row = self.connection.execute(
+            "SELECT status FROM frontier WHERE job = ? AND item_id = ?",
+            (self.job, item_id),
+        ).fetchone()
+        return row[0] if row else None
+
+    def checkpoint(self, item_id: str, cursor: str | None) -> None:
+        """Record that ``item_id`` should continue from ``cursor``."""
+        self._update(item_id, cursor=cursor, status=PENDING)
+
+    def complete(self, item_id: str, cursor: str | None = None) -> None:
+        self._update(item_id, cursor=cursor, status=DONE)
+
+    def fail(self, item_id: str, error: str) -> None:
+        self._update(item_id, status=FAILED, error=error, attempt=True)
+
+    def _update(
+        self,
+        item_id: str,
+        status: str,
+        cursor: str | None = None,
+        error: str | None = None,
+        attempt: bool = False,
+    ) -> None:
+        previous = self._updates.get(item_id, {})
+        self._updates[item_id] = {
+            "item_id": item_id,
+            "cursor": cursor if cursor is not None else previous.get("cursor"),
+            "status": status,
+            "attempts": previous.get("attempts", 0) + int(attempt),
+            "last_error": error,
+            "updated_at": datetime.now(),
+        }
+        self._unflushed += 1
+        if self._unflushed >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered progress to the frontier table in one statement."""
+        self._unflushed = 0
+        if not self._updates:
+            return
+        if self.before_flush is not None:
+            self.before_flush()
+
+        updates = pl.DataFrame(
+            list(self._updates.values()),
+            schema={
+                "item_id": pl.Utf8,
+                "cursor": pl.Utf8,
+                "status": pl.Utf8,
+                "attempts": pl.Int32,
+                "last_error": pl.Utf8,
+                "updated_at": pl.Datetime,
+            },
+        )
+        self.connection.register("updates", updates)
+        try:
+            self.connection.execute(
+                """
+                UPDATE frontier SET
+                    cursor = COALESCE(updates.cursor, frontier.cursor),
+                    status = updates.status,
+                    attempts = frontier.attempts + updates.attempts,
+                    last_error = COALESCE(updates.last_error, frontier.last_error),
+                    updated_at = updates.updated_at
+                FROM updates
+                WHERE frontier.job = ? AND frontier.item_id = updates.item_id
+                """,
+                (self.job,),
+            )
+        finally:
+            self.connection.unregister("updates")
+        self._updates.clear()
+
+    def count(self, status: str | None = None) -> int:
+        if status is None:
+            query, params = "SELECT COUNT(*) FROM frontier WHERE job = ?", (self.job,)
+        else:
+            query = "SELECT COUNT(*) FROM frontier WHERE job = ? AND status = ?"
+            params = (self.job, status)
+        return self.connection.execute(query, params).fetchone()[0]
+
+    def summary(self) -> dict[str, int]:
+        self.flush()
+        rows = self.connection.execute(
+            "SELECT status, COUNT(*) FROM frontier WHERE job = ? GROUP BY status",
+            (self.job,),
+        ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"Frontier(job={self.job}, db_path={self.db_path})"
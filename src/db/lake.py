@@ -0,0 +1,216 @@
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+import polars as pl
+
+from src.config import INTERIM_DATA_DIR, logger
+from src.db.mirror import DUCKDB_TYPES
+from src.pipeline.normalize import (
+    TWEET_SCHEMA,
+    USER_SCHEMA,
+    NormalizedBatch,
+    twitter_time,
+)
+from src.utils.metrics import METRICS
+
+LAKE_DIR = INTERIM_DATA_DIR / "lake"
+
+# Table -> (partition column, its DuckDB type, natural key).
+PARTITIONS = {
+    "tweets": ("day", "DATE", "tweet_id"),
+    "users": ("year", "INTEGER", "user_id"),
+}
+# Table -> columns of its files, the partition column excluded.
+SCHEMAS = {
+    "tweets": TWEET_SCHEMA | {"ingested_at": pl.Datetime},
+    "users": USER_SCHEMA | {"ingested_at": pl.Datetime},
+}
+DUCKDB_COLUMN_TYPES = DUCKDB_TYPES | {pl.Datetime: "TIMESTAMP"}
+# DuckDB reads this hive partition value as NULL.
+NULL_PARTITION = "NULL"
+
+
+class Lake:
+    """Hive-partitioned Parquet copy of the normalized tweets and users.
+
+    Tweets are partitioned by the day they were posted
+    (``tweets/day=2020-06-01/part-*.parquet``) and users by the year their
+    account was created, so a time-window query on ``day`` only opens the
+    partitions inside the window. Every ``write`` adds one file per touched
+    partition; ``compact`` merges a partition's files into one and drops rows
+    written twice, keeping the latest. Since the partition of a tweet or user
+    never changes, duplicates can only ever sit in the same partition.
+
+    Files are written under a temporary name and renamed into place, so
+    readers only ever see complete files. Writes and compactions of this
+    ``Lake`` take turns on a lock; if a compaction dies between writing the
+    merged file and removing the files it replaces, their rows show up
+    twice until the partition is compacted again.
+
+    Args:
+        root (Path): Directory holding one subdirectory per table.
+    """
+
+    def __init__(self, root: Path = LAKE_DIR) -> None:
+        self.root = Path(root)
+        self._compact_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._compactor: threading.Thread | None = None
+
+    def write(self, batch: NormalizedBatch) -> int:
+        """Append a normalized batch, returning the number of files written."""
+        ingested_at = datetime.now()
+        tweets = batch.tweets.with_columns(
+            day=twitter_time().dt.date(), ingested_at=pl.lit(ingested_at)
+        )
+        users = batch.users.with_columns(
+            year=twitter_time().dt.year(), ingested_at=pl.lit(ingested_at)
+        )
+        return self._write("tweets", tweets) + self._write("users", users)
+
+    def _write(self, table: str, frame: pl.DataFrame) -> int:
+        column = PARTITIONS[table][0]
+        written = 0
+        for (value,), part in frame.partition_by(column, as_dict=True).items():
+            directory = self._partition(table, value)
+            directory.mkdir(parents=True, exist_ok=True)
+            with self._compact_lock:
+                self._write_file(part.drop(column), directory)
+            written += 1
+        METRICS.inc("rows_written_total", len(frame), sink="lake", table=table)
+        return written
+
+    def _partition(self, table: str, value) -> Path:
+        column = PARTITIONS[table][0]
+        value = NULL_PARTITION if value is None else value
+        return self.root / table / f"{column}={value}"
+
+    @staticmethod
+    def _write_file(frame: pl.DataFrame, directory: Path) -> Path:
+        path = directory / f"part-{uuid.uuid4().hex}.parquet"
+        tmp = path.with_suffix(".tmp")
+        frame.write_parquet(tmp, compression="zstd")
+        os.replace(tmp, path)
+        return path
+
+    def partitions(self, table: str) -> list[Path]:
+        directory = self.root / table
+        if not directory.exists():
+            return []
+        return sorted(p for p in directory.iterdir() if p.is_dir())
+
+    def compact(self, table: str | None = None, min_files: int = 2) -> int:
+        """Merge partitions holding at least ``min_files`` files into one file.
+
+        Returns:
+            int: Number of partitions compacted.
+        """
+        compacted = 0
+        for name in [table] if table else list(PARTITIONS):
+            key = PARTITIONS[name][2]
+            for directory in self.partitions(name):
+                # Per partition, so writes are only held up by one merge.
+                with self._compact_lock:
+                    files = sorted(directory.glob("*.parquet"))
+                    if len(files) < min_files:
+                        continue
+                    merged = (
+                        pl.scan_parquet(files)
+                        .sort("ingested_at")
+                        .unique(key, keep="last")
+                        .collect()
+                    )
+                    self._write_file(merged, directory)
+                    for path in files:
+                        path.unlink()
+                compacted += 1
+        if compacted:
+            logger.info(f"Compacted {compacted:,} lake partitions")
+        return compacted
+
+    def start_compactor(self, interval: float = 300.0) -> "Lake":
+        """Compact every ``interval`` seconds in a background thread."""
+
+        def loop() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.warning(f"Lake compaction failed: {type(e).__name__} - {e}")
+
+        self._stop.clear()
+        self._compactor = threading.Thread(target=loop, daemon=True)
+        self._compactor.start()
+        return self
+
+    def stop_compactor(self) -> None:
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def connect(
+        self, connection: duckdb.DuckDBPyConnection | None = None
+    ) -> duckdb.DuckDBPyConnection:
+        """Return a DuckDB connection with a ``tweets`` and a ``users`` view.
+
+        Filters on the partition columns (``day`` for tweets, ``year`` for
+        users) are pushed down to the file listing, e.g.
+        ``WHERE day BETWEEN '2020-03-26' AND '2020-07-24'`` only reads those
+        days. Rows written twice show up twice until their partition is
+        compacted. A table with no files yet is an empty view of the same
+        columns, so queries on a new lake return no rows instead of failing.
+        """
+        connection = connection or duckdb.connect()
+        for table, (column, dtype, _) in PARTITIONS.items():
+            if not any(self.root.glob(f"{table}/*/*.parquet")):
+                columns = [
+                    f"CAST(NULL AS {DUCKDB_COLUMN_TYPES[type_]}) AS {name}"
+                    for name, type_ in SCHEMAS[table].items()
+                ]
+                connection.execute(
+                    f"""
+                    CREATE OR REPLACE VIEW {table} AS
+                    SELECT {", ".join(columns)}, CAST(NULL AS {dtype}) AS {column}
+                    WHERE false
+                    """
+                )
+                continue
+            connection.execute(
+                f"""
+                CREATE OR REPLACE VIEW {table} AS
+                SELECT * FROM read_parquet(
+                    '{self.root / table}/*/*.parquet',
+                    hive_partitioning = true,
+                    hive_types = {{'{column}': {dtype}}}
+                )
+                """
+            )
+        return connection
+
+    def query(self, sql: str, params: tuple = ()) -> pl.DataFrame:
+        connection = self.connect()
+        try:
+            return connection.execute(sql, params).pl()
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        self.stop_compactor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"Lake(root={self.root})"
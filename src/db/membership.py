@@ -0,0 +1,164 @@
+import os
+import threading
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import polars as pl
+
+from src.config import INTERIM_DATA_DIR, logger
+
+MEMBERSHIP_DIR = INTERIM_DATA_DIR / "membership"
+
+# Tweets fetched by any scraper, whether staged or already in DuckDB.
+SEEN_TWEETS = "tweets"
+# PocketBase collection -> index of the natural keys written to it.
+COLLECTION_INDEXES = {"tweets": "pb_tweets", "tweet_users": "pb_users"}
+
+
+def to_uint64(ids: Iterable | np.ndarray | pl.Series) -> np.ndarray:
+    """Convert IDs (ints, numeric strings, a Series...) to a ``uint64`` array.
+
+    Values that are not valid unsigned 64-bit integers are dropped.
+    """
+    if isinstance(ids, np.ndarray) and ids.dtype == np.uint64:
+        return ids
+    if not isinstance(ids, (np.ndarray, pl.Series)):
+        ids = list(ids)
+    return (
+        pl.Series(ids, strict=False)
+        .cast(pl.Utf8)
+        .cast(pl.UInt64, strict=False)
+        .drop_nulls()
+        .to_numpy()
+    )
+
+
+class MembershipIndex:
+    """Persistent set of tweet or user IDs.
+
+    The IDs live in a sorted ``uint64`` file (``<name>.u64``) that is
+    memory-mapped, so opening it costs nothing and lookups are a binary
+    search. New IDs go into an in-memory delta, merged into the file once
+    it holds ``merge_threshold`` IDs and on ``flush``/``close``. The file is
+    replaced atomically, so readers never see a half-written index.
+
+    Only one process should add to an index at a time.
+
+    Args:
+        name (str): Index name, e.g. ``"tweets"`` or ``"users"``.
+        directory (Path): Directory holding the index files.
+        merge_threshold (int): Delta size that triggers a merge to disk.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: Path = MEMBERSHIP_DIR,
+        merge_threshold: int = 100_000,
+    ) -> None:
+        self.name = name
+        self.path = Path(directory) / f"{name}.u64"
+        self.merge_threshold = merge_threshold
+        self._base = self._load()
+        self._delta = np.empty(0, dtype=np.uint64)
+        self._pending: list[np.ndarray] = []
+        self._pending_count = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> np.ndarray:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return np.empty(0, dtype=np.uint64)
+        return np.memmap(self.path, dtype=np.uint64, mode="r")
+
+    def add(self, ids: Iterable | np.ndarray | pl.Series) -> None:
+        with self._lock:
+            ids = to_uint64(ids)
+            self._pending.append(ids)
+            self._pending_count += len(ids)
+            if len(self._delta) + self._pending_count >= self.merge_threshold:
+                self._merge()
+
+    def contains(self, ids: Iterable | np.ndarray | pl.Series) -> np.ndarray:
+        """Return a boolean mask of which ``ids`` are in the index.
+
+        IDs that are not valid ``uint64`` values are never members.
+        """
+        if not isinstance(ids, np.ndarray) or ids.dtype != np.uint64:
+            if not isinstance(ids, pl.Series):
+                ids = pl.Series(list(ids), strict=False)
+            parsed = ids.cast(pl.Utf8).cast(pl.UInt64, strict=False)
+            mask = self.contains(parsed.fill_null(0).to_numpy())
+            return mask & parsed.is_not_null().to_numpy()
+
+        with self._lock:
+            self._consolidate()
+            return self._search(self._base, ids) | self._search(self._delta, ids)
+
+    def __contains__(self, tweet_id: int | str) -> bool:
+        try:
+            value = np.array([int(tweet_id)], dtype=np.uint64)
+        except (TypeError, ValueError, OverflowError):
+            return False
+        return bool(self.contains(value)[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._consolidate()
+            return len(self._base) + len(np.setdiff1d(self._delta, self._base))
+
+    def flush(self) -> None:
+        with self._lock:
+            self._merge()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _consolidate(self) -> None:
+        if self._pending:
+            self._delta = np.union1d(self._delta, np.concatenate(self._pending))
+            self._pending.clear()
+            self._pending_count = 0
+
+    def _merge(self) -> None:
+        self._consolidate()
+        if not len(self._delta):
+            return
+
+        merged = np.union1d(self._base, self._delta)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            merged.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+        self._base = self._load()
+        self._delta = np.empty(0, dtype=np.uint64)
+        logger.debug(f"Membership index '{self.name}': {len(merged):,} IDs")
+
+    @staticmethod
+    def _search(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        if not len(sorted_ids):
+            return np.zeros(len(ids), dtype=bool)
+        positions = np.searchsorted(sorted_ids, ids)
+        positions[positions == len(sorted_ids)] = 0
+        return sorted_ids[positions] == ids
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"MembershipIndex(name={self.name}, path={self.path})"
+
+
+def collection_indexes() -> dict[str, MembershipIndex]:
+    """Open the membership index of every PocketBase collection with a key."""
+    return {
+        collection: MembershipIndex(name)
+        for collection, name in COLLECTION_INDEXES.items()
+    }
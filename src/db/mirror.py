@@ -0,0 +1,282 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import duckdb
+import polars as pl
+from pydantic import BaseModel
+
+from src.config import INTERIM_DATA_DIR, logger
+from src.pipeline.normalize import TWEET_SCHEMA, USER_SCHEMA
+from src.utils.metrics import METRICS
+
+if TYPE_CHECKING:
+    from src.db.pb_warehouse import PBWarehouse
+
+MIRROR_DB = INTERIM_DATA_DIR / "warehouse.duckdb"
+MIRROR_PARQUET_DIR = INTERIM_DATA_DIR / "warehouse"
+
+# PocketBase stores its timestamps in UTC as "2024-01-31 12:00:00.123Z".
+PB_TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%fZ"
+
+DUCKDB_TYPES = {
+    pl.Utf8: "VARCHAR",
+    pl.Int64: "BIGINT",
+    pl.Boolean: "BOOLEAN",
+    pl.Float64: "DOUBLE",
+}
+SYSTEM_FIELDS = {"id": pl.Utf8, "created": pl.Utf8, "updated": pl.Utf8}
+
+# Collection -> columns mirrored from it.
+MIRRORED: dict[str, dict[str, pl.DataType]] = {
+    "tweets": TWEET_SCHEMA,
+    "tweet_users": USER_SCHEMA,
+}
+
+
+def parse_pb_time(value: str) -> datetime:
+    return datetime.strptime(value, PB_TIME_FORMAT)
+
+
+def format_pb_time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+class SyncStats(BaseModel):
+    collection: str
+    records: int = 0
+    pages: int = 0
+    windows: int = 0
+    watermark: str | None = None
+    elapsed: float = 0.0
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+
+class WarehouseMirror:
+    """Incremental columnar copy of the PocketBase collections in DuckDB.
+
+    Each sync reads only the records whose ``updated`` time falls after the
+    collection's watermark and up to the start of the sync. That range is cut
+    into ``windows`` equal time windows read in parallel with keyset
+    pagination (see ``PBWarehouse.iter_records``), so a record updated
+    mid-sync never shifts a page; it lands past the new watermark and is
+    picked up by the next sync. Pages are upserted by record ``id`` and the
+    watermark only moves once every window is in.
+
+    The new watermark trails the sync by ``lag`` seconds and never passes
+    the newest ``updated`` actually received, so records committed late or
+    stamped by a server clock behind this one are read again by the next
+    sync rather than skipped; upserts make the overlap harmless.
+
+    Deletes are not mirrored: a record deleted from PocketBase has no
+    ``updated`` to find it by and stays in the mirror.
+
+    Args:
+        pb (PBWarehouse): Authenticated warehouse to read from.
+        db_path (Path): DuckDB file holding the mirrored tables.
+        concurrency (int): Windows fetched at once.
+        windows (int): Time windows the range is cut into.
+        per_page (int): Records per PocketBase request.
+        lag (float): Seconds the watermark is kept behind the sync start.
+    """
+
+    def __init__(
+        self,
+        pb: "PBWarehouse",
+        db_path: Path = MIRROR_DB,
+        concurrency: int = 4,
+        windows: int = 16,
+        per_page: int = 500,
+        lag: float = 60.0,
+    ) -> None:
+        self.pb = pb
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.concurrency = concurrency
+        self.windows = windows
+        self.per_page = per_page
+        self.lag = timedelta(seconds=lag)
+        self.connection = duckdb.connect(str(self.db_path))
+        self.init_tables()
+
+    def init_tables(self) -> None:
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_state (
+                collection VARCHAR PRIMARY KEY,
+                watermark VARCHAR,
+                synced_at TIMESTAMP
+            )
+            """
+        )
+        for collection, schema in MIRRORED.items():
+            columns = ",\n".join(
+                f"{name} {DUCKDB_TYPES[dtype]}" for name, dtype in schema.items()
+            )
+            self.connection.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {collection} (
+                    id VARCHAR PRIMARY KEY,
+                    created TIMESTAMP,
+                    updated TIMESTAMP,
+                    {columns}
+                )
+                """
+            )
+
+    def watermark(self, collection: str) -> str | None:
+        row = self.connection.execute(
+            "SELECT watermark FROM sync_state WHERE collection = ?", (collection,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def sync(self, collection: str, full: bool = False) -> SyncStats:
+        """Bring the mirror of ``collection`` up to date.
+
+        Args:
+            collection (str): One of ``MIRRORED``.
+            full (bool): Ignore the watermark and re-read every record.
+        """
+        stats = SyncStats(collection=collection)
+        start = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        upper = format_pb_time(now)
+        lower = None if full else self.watermark(collection)
+        if lower is None:
+            lower = self._oldest(collection)
+        if lower is None:
+            logger.info(f"Nothing to mirror in {collection}")
+            return stats
+
+        windows = self._windows(lower, upper)
+        stats.windows = len(windows)
+        logger.info(
+            f"Mirroring {collection} updated in ({lower}, {upper}] "
+            f"over {len(windows)} windows"
+        )
+
+        pages: queue.Queue[list[dict] | None] = queue.Queue(
+            maxsize=self.concurrency * 2
+        )
+        errors: list[BaseException] = []
+
+        def fetch(window: tuple[str, str]) -> None:
+            try:
+                for page in self.pb.iter_records(
+                    collection,
+                    filter=f'updated > "{window[0]}" && updated <= "{window[1]}"',
+                    fields=["created", *MIRRORED[collection]],
+                    per_page=self.per_page,
+                ):
+                    pages.put(page)
+            except BaseException as e:
+                errors.append(e)
+
+        def produce() -> None:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                executor.map(fetch, windows)
+            pages.put(None)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        received = lower
+        while (page := pages.get()) is not None:
+            self._upsert(collection, page)
+            stats.pages += 1
+            stats.records += len(page)
+            # Pages are sorted by ``updated``, and the format sorts as text.
+            received = max(received, page[-1]["updated"])
+        producer.join()
+        if errors:
+            raise errors[0]
+
+        # Never past the newest record received, nor closer than ``lag`` to now.
+        watermark = format_pb_time(now - self.lag)
+        if stats.records:
+            watermark = min(watermark, received)
+        watermark = max(lower, watermark)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)",
+            (collection, watermark, datetime.now()),
+        )
+        stats.watermark = watermark
+        stats.elapsed = time.perf_counter() - start
+        logger.info(
+            f"Mirrored {stats.records:,} {collection} records in {stats.pages:,} pages "
+            f"({stats.records_per_sec:,.0f} records/sec)"
+        )
+        return stats
+
+    def export_parquet(
+        self, collection: str, directory: Path = MIRROR_PARQUET_DIR
+    ) -> Path:
+        """Write the mirrored ``collection`` to ``<directory>/<collection>.parquet``."""
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{collection}.parquet"
+        self.connection.execute(
+            f"COPY {collection} TO '{path}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+        )
+        return path
+
+    def _oldest(self, collection: str) -> str | None:
+        items = self.pb.client.send(
+            f"/api/collections/{collection}/records",
+            {
+                "method": "GET",
+                "params": {
+                    "perPage": 1,
+                    "sort": "updated",
+                    "fields": "updated",
+                    "skipTotal": 1,
+                },
+            },
+        )["items"]
+        if not items:
+            return None
+        # Windows exclude their lower bound, so start just before the oldest record.
+        oldest = parse_pb_time(items[0]["updated"])
+        return format_pb_time(oldest - timedelta(milliseconds=1))
+
+    def _windows(self, lower: str, upper: str) -> list[tuple[str, str]]:
+        start, end = parse_pb_time(lower), parse_pb_time(upper)
+        count = max(1, min(self.windows, (end - start) // timedelta(milliseconds=1)))
+        step = (end - start) / count
+        inner = [format_pb_time(start + step * i) for i in range(1, count)]
+        bounds = [lower, *dict.fromkeys(inner), upper]
+        return list(zip(bounds, bounds[1:]))
+
+    def _upsert(self, collection: str, records: list[dict]) -> None:
+        schema = SYSTEM_FIELDS | MIRRORED[collection]
+        page = pl.DataFrame(records, schema=schema, strict=False).with_columns(
+            pl.col("created", "updated").str.to_datetime(
+                "%Y-%m-%d %H:%M:%S%.fZ", strict=False
+            )
+        )
+        self.connection.register("page", page)
+        try:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {collection} "
+                f"SELECT {', '.join(schema)} FROM page"
+            )
+        finally:
+            self.connection.unregister("page")
+        METRICS.inc("rows_written_total", len(records), sink="mirror", table=collection)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"WarehouseMirror(db_path={self.db_path})"
@@ -1,7 +1,313 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+import httpx
 from pocketbase import PocketBase
+from pydantic import BaseModel
 
 from src.config import Settings as s
+from src.config import logger
+from src.db.membership import MembershipIndex
 from src.models import Tweet, User
+from src.pipeline.validate import prepare_tweet
+from src.utils.lru import LRUCache
+from src.utils.metrics import METRICS
+
+# Natural key of each collection, used to find existing records on upsert.
+RECORD_KEYS = {"tweets": "tweet_id", "tweet_users": "user_id"}
+
+
+class WriteStats(BaseModel):
+    written: int = 0
+    updated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    requests: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+
+class PBWriter:
+    """Queued, concurrent writer for PocketBase collections.
+
+    Records added with ``add`` are buffered per collection and sent in chunks
+    of ``batch_size`` by a pool of ``concurrency`` threads sharing one pooled
+    keep-alive HTTP session. Chunks go through the ``/api/batch`` endpoint
+    when the server has it enabled, otherwise every record is created with
+    its own request. A failed batch is retried record by record so one bad
+    row does not drop the rest of the chunk.
+
+    In ``upsert`` mode each chunk first looks up which keys (see
+    ``RECORD_KEYS``) already exist with one filtered query, then only creates
+    new records and patches records whose fields changed. Keys written this
+    session are remembered in a bounded LRU so repeated users and tweets are
+    dropped before they reach the network.
+
+    With ``indexes``, the keys of created records are added to a persistent
+    ``MembershipIndex`` per collection, and in plain (non-upsert) mode
+    records whose key is already indexed are skipped, across runs.
+
+    Args:
+        base_url (str): PocketBase URL, e.g. a local stand-in for benchmarks.
+        token (str): Auth token sent as the ``Authorization`` header.
+        concurrency (int): Chunks in flight at once.
+        batch_size (int): Records per chunk.
+        use_batch (bool): Try the ``/api/batch`` endpoint first.
+        upsert (bool): Skip unchanged records and update changed ones.
+        seen_size (int): Keys remembered per collection in upsert mode.
+        indexes (dict[str, MembershipIndex] | None): Index per collection of
+            the keys already written, see ``collection_indexes``.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str = "",
+        concurrency: int = 8,
+        batch_size: int = 50,
+        use_batch: bool = True,
+        upsert: bool = False,
+        seen_size: int = 100_000,
+        indexes: dict[str, MembershipIndex] | None = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.use_batch = use_batch
+        self.upsert = upsert
+        self.stats = WriteStats()
+        self._seen: dict[str, LRUCache[str, str]] = {
+            collection: LRUCache(seen_size) for collection in RECORD_KEYS
+        }
+        self.indexes = indexes or {}
+
+        self._session = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": token} if token else {},
+            limits=httpx.Limits(
+                max_connections=concurrency, max_keepalive_connections=concurrency
+            ),
+            timeout=httpx.Timeout(60.0),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        # Bounds queued chunks so producers block instead of buffering everything.
+        self._slots = threading.BoundedSemaphore(concurrency * 2)
+        self._buffers: dict[str, list[dict]] = {}
+        self._futures: list[Future] = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def add(self, collection: str, record: dict) -> None:
+        if self.upsert and collection in RECORD_KEYS:
+            key = str(record[RECORD_KEYS[collection]])
+            digest = self._digest(record)
+            if self._seen[collection].get(key) == digest:
+                self._record(skipped=1)
+                return
+            self._seen[collection].put(key, digest)
+        elif collection in self.indexes:
+            if record[RECORD_KEYS[collection]] in self.indexes[collection]:
+                self._record(skipped=1)
+                return
+
+        buffer = self._buffers.setdefault(collection, [])
+        buffer.append(record)
+        if len(buffer) >= self.batch_size:
+            self._submit(collection, buffer)
+            self._buffers[collection] = []
+
+    def flush(self) -> None:
+        """Send every buffered record and wait for all chunks to finish."""
+        for collection, buffer in self._buffers.items():
+            if buffer:
+                self._submit(collection, buffer)
+        self._buffers.clear()
+
+        for future in self._futures:
+            future.result()
+        self._futures.clear()
+        self.stats.elapsed = time.perf_counter() - self._start
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown()
+        self._session.close()
+        for index in self.indexes.values():
+            index.close()
+
+    def _submit(self, collection: str, records: list[dict]) -> None:
+        self._slots.acquire()
+        future = self._executor.submit(self._write_chunk, collection, records)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures = [f for f in self._futures if not f.done() or f.exception()]
+        self._futures.append(future)
+
+    def _write_chunk(self, collection: str, records: list[dict]) -> None:
+        url = f"/api/collections/{collection}/records"
+        if self.upsert and collection in RECORD_KEYS:
+            ops = self._plan_upsert(collection, records)
+        else:
+            ops = [("POST", url, record) for record in records]
+
+        if self.use_batch and len(ops) > 1:
+            try:
+                self._send_batch(ops)
+                self._record_ops(collection, ops, requests=1)
+                return
+            except httpx.HTTPStatusError as e:
+                self._record(requests=1)
+                if e.response.status_code in (403, 404):
+                    logger.warning(
+                        "PocketBase batch API unavailable "
+                        f"({e.response.status_code}), writing records one by one"
+                    )
+                    self.use_batch = False
+            except httpx.HTTPError as e:
+                self._record(requests=1)
+                logger.warning(f"Batch write to {collection} failed: {e}")
+
+        for op in ops:
+            method, op_url, record = op
+            try:
+                response = self._request(method, op_url, json=record)
+                response.raise_for_status()
+                self._record_ops(collection, [op], requests=1)
+            except httpx.HTTPError as e:
+                self._record(failed=1, requests=1)
+                METRICS.record_error(f"pocketbase:{collection}", e)
+                if self.upsert and collection in RECORD_KEYS:
+                    self._seen[collection].pop(str(record[RECORD_KEYS[collection]]))
+                logger.error(f"Error writing to {collection}: {type(e).__name__} - {e}")
+
+    def _plan_upsert(
+        self, collection: str, records: list[dict]
+    ) -> list[tuple[str, str, dict]]:
+        """Turn ``records`` into create/update operations for changed rows only."""
+        key = RECORD_KEYS[collection]
+        url = f"/api/collections/{collection}/records"
+        latest = {str(record[key]): record for record in records}
+
+        try:
+            fields = ["id", *records[0]]
+            existing = self._fetch_existing(collection, key, list(latest), fields)
+        except httpx.HTTPError as e:
+            logger.warning(f"Existence check on {collection} failed, creating: {e}")
+            existing = {}
+
+        ops = []
+        for value, record in latest.items():
+            current = existing.get(value)
+            if current is None:
+                ops.append(("POST", url, record))
+            elif self._changed(current, record):
+                ops.append(("PATCH", f"{url}/{current['id']}", record))
+            else:
+                self._record(skipped=1)
+        self._record(skipped=len(records) - len(latest))
+        return ops
+
+    def _fetch_existing(
+        self, collection: str, key: str, values: list[str], fields: list[str]
+    ) -> dict[str, dict]:
+        """Return existing records of ``collection`` keyed by ``key``."""
+        quoted = (json.dumps(value) for value in values)
+        response = self._request(
+            "GET",
+            f"/api/collections/{collection}/records",
+            params={
+                "filter": " || ".join(f"{key}={value}" for value in quoted),
+                "fields": ",".join(fields),
+                "perPage": len(values),
+                "skipTotal": 1,
+            },
+        )
+        self._record(requests=1)
+        response.raise_for_status()
+        return {str(item[key]): item for item in response.json()["items"]}
+
+    def _send_batch(self, ops: list[tuple[str, str, dict]]) -> None:
+        response = self._request(
+            "POST",
+            "/api/batch",
+            json={
+                "requests": [
+                    {"method": method, "url": url, "body": record}
+                    for method, url, record in ops
+                ]
+            },
+        )
+        response.raise_for_status()
+
+    def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        # Label per collection, not per record ID.
+        endpoint = f"{method} {url.split('/records')[0]}"
+        start = time.perf_counter()
+        response = self._session.request(method, url, **kwargs)
+        METRICS.record_response(
+            endpoint, response.status_code, time.perf_counter() - start
+        )
+        return response
+
+    def _record_ops(
+        self, collection: str, ops: list[tuple[str, str, dict]], requests: int
+    ) -> None:
+        created = [record for method, _, record in ops if method == "POST"]
+        self._record(
+            written=len(created), updated=len(ops) - len(created), requests=requests
+        )
+        if created and collection in self.indexes:
+            key = RECORD_KEYS[collection]
+            self.indexes[collection].add(record[key] for record in created)
+
+    def _record(
+        self,
+        written: int = 0,
+        updated: int = 0,
+        skipped: int = 0,
+        failed: int = 0,
+        requests: int = 0,
+    ) -> None:
+        for result, count in (
+            ("created", written),
+            ("updated", updated),
+            ("skipped", skipped),
+            ("failed", failed),
+        ):
+            if count:
+                METRICS.inc("rows_written_total", count, sink="pocketbase", result=result)
+        with self._lock:
+            self.stats.written += written
+            self.stats.updated += updated
+            self.stats.skipped += skipped
+            self.stats.failed += failed
+            self.stats.requests += requests
+
+    @staticmethod
+    def _changed(current: dict, record: dict) -> bool:
+        for field, value in record.items():
+            stored = current.get(field)
+            # PocketBase stores missing values as the field type's zero value.
+            if value is None and stored in (None, "", 0, False):
+                continue
+            if stored != value:
+                return True
+        return False
+
+    @staticmethod
+    def _digest(record: dict) -> str:
+        payload = json.dumps(record, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 class PBWarehouse:
@@ -22,23 +328,87 @@ class PBWarehouse:
             "record_user": record_user,
         }
 
-    @staticmethod
-    def _process_tweet(tweet: dict):
-        assert isinstance(tweet, dict), "Input must be a dictionary"
+    def iter_records(
+        self,
+        collection: str,
+        filter: str | None = None,
+        fields: list[str] | None = None,
+        after: str | None = None,
+        per_page: int = 500,
+    ) -> Iterator[list[dict]]:
+        """Stream the records of ``collection`` as pages of plain dicts.
+
+        Pages are read in ``(updated, id)`` order with keyset pagination, so
+        every request costs the same however deep into the collection it is,
+        and memory only ever holds one page. Only ``fields`` (plus ``id`` and
+        ``updated``) are requested.
 
-        text = tweet.get("text", "")
-        user_id = tweet.get("user", {}).get("user_id", "")
+        Args:
+            collection (str): Collection to read.
+            filter (str | None): PocketBase filter expression.
+            fields (list[str] | None): Fields to return, ``None`` for all.
+            after (str | None): Only records updated at or after this
+                ``updated`` timestamp, e.g. a watermark of a previous run.
+            per_page (int): Records per request.
+        """
+        params = {"page": 1, "perPage": per_page, "sort": "updated,id", "skipTotal": 1}
+        if fields is not None:
+            params["fields"] = ",".join(dict.fromkeys(["id", "updated", *fields]))
 
-        search_terms = [
-            "#blacklivesmatter",
-            "#blm",
-            "#blacklivesmatters",
-        ]
+        last: dict | None = None
+        while True:
+            clauses = [f"({filter})"] if filter else []
+            if last is not None:
+                updated, record_id = json.dumps(last["updated"]), json.dumps(last["id"])
+                clauses.append(
+                    f"(updated > {updated} || (updated = {updated} && id > {record_id}))"
+                )
+            elif after is not None:
+                clauses.append(f"updated >= {json.dumps(after)}")
+            if clauses:
+                params["filter"] = " && ".join(clauses)
 
-        tweet["has_blm_hashtag"] = any(term in text.lower() for term in search_terms)
-        tweet["user_id"] = user_id
+            items = self.client.send(
+                f"/api/collections/{collection}/records",
+                {"method": "GET", "params": params},
+            )["items"]
+            if items:
+                yield items
+            if len(items) < per_page:
+                return
+            last = items[-1]
 
-        parsed_tweet = Tweet(**tweet)
+    def writer(
+        self,
+        concurrency: int = 8,
+        batch_size: int = 50,
+        use_batch: bool = True,
+        upsert: bool = False,
+        indexes: dict[str, MembershipIndex] | None = None,
+    ) -> PBWriter:
+        """Return a ``PBWriter`` authenticated as this warehouse's admin."""
+        return PBWriter(
+            self.client.base_url,
+            token=self.client.auth_store.token,
+            concurrency=concurrency,
+            batch_size=batch_size,
+            use_batch=use_batch,
+            upsert=upsert,
+            indexes=indexes,
+        )
+
+    def queue_tweet(self, writer: PBWriter, tweet: dict) -> None:
+        """Validate ``tweet`` and its user and queue both on ``writer``."""
+        assert isinstance(tweet, dict), "Input must be a dictionary"
+        processed_tweet = self._process_tweet(tweet)
+        processed_user = self._process_user(tweet)
+        writer.add("tweets", processed_tweet)
+        writer.add("tweet_users", processed_user)
+
+    @staticmethod
+    def _process_tweet(tweet: dict):
+        assert isinstance(tweet, dict), "Input must be a dictionary"
+        parsed_tweet = Tweet(**prepare_tweet(tweet))
         return parsed_tweet.model_dump()
 
     @staticmethod
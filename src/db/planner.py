@@ -0,0 +1,160 @@
+import re
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import polars as pl
+
+from src.config import BLM_IDS_FILE, INTERIM_DATA_DIR, logger
+from src.db.membership import SEEN_TWEETS, MembershipIndex
+from src.db.staging import SegmentReader
+from src.utils.id_source import IdSource
+
+# Tweet IDs inside staged Oldbird tweets, twttr responses and twttr request batches.
+# Legacy files were written with ``json.dump(indent=4)``, so allow whitespace.
+STAGED_ID = re.compile(rb'"(?:tweet_id|rest_id)":\s*"?(\d+)')
+STAGED_ID_LIST = re.compile(rb'"tweet_ids":\s*\[([^\]]*)\]')
+DIGITS = re.compile(rb"\d+")
+
+ORDERS = {
+    "file": "ids.position",
+    "id": "ids.id",
+    "random": "random()",
+}
+
+
+def staged_ids(directory: Path) -> pl.Series:
+    """Collect every tweet ID found in a staging directory.
+
+    Segments and legacy JSON files are scanned as raw bytes with a regex
+    rather than parsed, which is enough to know which IDs were already
+    requested.
+    """
+    chunks = [np.empty(0, dtype=np.uint64)]
+
+    def scan(raw: bytes) -> None:
+        found = STAGED_ID.findall(raw)
+        for id_list in STAGED_ID_LIST.findall(raw):
+            found.extend(DIGITS.findall(id_list))
+        if found:
+            # Parse the digit strings in NumPy and keep only the unique IDs
+            # of each frame or file, instead of a Python int per match.
+            chunks.append(np.unique(np.array(found).astype(np.uint64)))
+
+    for frame in SegmentReader(directory).iter_frames():
+        scan(frame)
+    for path in Path(directory).glob("*.json"):
+        scan(path.read_bytes())
+
+    return pl.Series("id", np.concatenate(chunks), dtype=pl.UInt64).unique()
+
+
+def plan_remaining(
+    source: IdSource | None = None,
+    db_path: Path = INTERIM_DATA_DIR / "tweets.duckdb",
+    staged_dirs: list[Path] | None = None,
+    skip_errors: bool = True,
+    order: str = "file",
+    shards: int = 1,
+    shard: int = 0,
+) -> IdSource:
+    """Return the tweet IDs of ``source`` that still need fetching.
+
+    IDs in the seen-tweets ``MembershipIndex`` are dropped first, then the
+    rest are registered in an in-memory DuckDB and anti-joined against the
+    ``tweets`` table, the ``errors`` table (unless ``skip_errors`` is False)
+    and every ID already staged under ``staged_dirs``.
+
+    Args:
+        source (IdSource | None): Deduplicated IDs, defaults to the BLM TAPS file.
+        db_path (Path): DuckDB file holding the ``tweets`` and ``errors`` tables.
+        staged_dirs (list[Path] | None): Staging directories to exclude.
+            Defaults to ``data/interim/twttr`` and ``data/interim/oldbird``.
+        skip_errors (bool): Treat IDs in the ``errors`` table as done.
+        order (str): ``"file"`` (ID list order), ``"id"`` or ``"random"``.
+        shards (int): Split the work into this many disjoint shards...
+        shard (int): ...and return only this one.
+
+    Returns:
+        IdSource: The remaining IDs.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"order must be one of {list(ORDERS)}")
+    if not 0 <= shard < shards:
+        raise ValueError("shard must be in [0, shards)")
+    if staged_dirs is None:
+        staged_dirs = [INTERIM_DATA_DIR / "twttr", INTERIM_DATA_DIR / "oldbird"]
+
+    if source is None:
+        source = IdSource.from_file(BLM_IDS_FILE)
+    total = len(source)
+    # Cheap pre-filter; the anti-join below still covers unindexed data.
+    source = IdSource(source.ids[~MembershipIndex(SEEN_TWEETS).contains(source.ids)])
+    ids = source.to_series("id").to_frame().with_row_index("position")
+
+    connection = duckdb.connect()
+    try:
+        connection.register("ids", ids)
+
+        excluded = []
+        if Path(db_path).exists():
+            connection.execute(f"ATTACH '{db_path}' AS store (READ_ONLY)")
+            excluded.append("SELECT TRY_CAST(id AS UBIGINT) AS id FROM store.tweets")
+            if skip_errors:
+                excluded.append(
+                    "SELECT TRY_CAST(id AS UBIGINT) AS id FROM store.errors"
+                )
+
+        staged = pl.concat(
+            [staged_ids(d) for d in staged_dirs if Path(d).exists()]
+            or [pl.Series("id", [], dtype=pl.UInt64)]
+        ).to_frame()
+        connection.register("staged", staged)
+        excluded.append("SELECT id FROM staged")
+
+        remaining = connection.execute(
+            f"""
+            SELECT ids.id FROM ids
+            ANTI JOIN ({" UNION ALL ".join(excluded)}) AS done ON ids.id = done.id
+            WHERE hash(ids.id) % ? = ?
+            ORDER BY {ORDERS[order]}
+            """,
+            (shards, shard),
+        ).pl()
+    finally:
+        connection.close()
+
+    remaining = IdSource(remaining.to_series().to_numpy())
+    logger.info(
+        f"Planned {len(remaining):,} of {total:,} tweet IDs "
+        f"(shard {shard + 1}/{shards}, order: {order})"
+    )
+    return remaining
+
+
+def build_seen_index(
+    db_path: Path = INTERIM_DATA_DIR / "tweets.duckdb",
+    staged_dirs: list[Path] | None = None,
+) -> MembershipIndex:
+    """Add every tweet ID in DuckDB and the staging areas to the seen index."""
+    if staged_dirs is None:
+        staged_dirs = [INTERIM_DATA_DIR / "twttr", INTERIM_DATA_DIR / "oldbird"]
+
+    index = MembershipIndex(SEEN_TWEETS)
+    if Path(db_path).exists():
+        connection = duckdb.connect(str(db_path), read_only=True)
+        try:
+            reader = connection.execute(
+                "SELECT TRY_CAST(id AS UBIGINT) AS id FROM tweets"
+            ).fetch_record_batch(1_000_000)
+            for batch in reader:
+                index.add(pl.from_arrow(batch).to_series().drop_nulls().to_numpy())
+        finally:
+            connection.close()
+
+    for directory in staged_dirs:
+        if Path(directory).exists():
+            index.add(staged_ids(directory).to_numpy())
+
+    index.flush()
+    return index
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import zstandard
+from pydantic import BaseModel
+
+from src.config import INTERIM_DATA_DIR, logger
+from src.utils.metrics import METRICS
+
+
+class CacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evicted: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """On-disk cache of JSON API responses, shared by all fetch commands.
+
+    Responses are keyed by a hash of the endpoint and the sorted query
+    parameters and stored zstd-compressed in a SQLite file. Entries older
+    than ``ttl`` seconds are treated as misses, and once the stored bytes
+    exceed ``max_bytes`` the least recently used entries are evicted.
+
+    Only successful responses should be stored; the cache never decides
+    what a valid response looks like.
+
+    Args:
+        path (Path): SQLite file holding the cache.
+        ttl (float | None): Seconds an entry stays valid, ``None`` for ever.
+        max_bytes (int): Compressed size the cache is trimmed to.
+        level (int): zstd compression level.
+    """
+
+    def __init__(
+        self,
+        path: Path = INTERIM_DATA_DIR / "http_cache.sqlite",
+        ttl: float | None = 7 * 24 * 3600,
+        max_bytes: int = 1024**3,
+        level: int = 3,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                body BLOB,
+                size INTEGER,
+                created_at REAL,
+                used_at REAL
+            )
+            """
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)"
+        )
+        self._size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @staticmethod
+    def key(endpoint: str, params: dict | None = None) -> str:
+        """Hash ``endpoint`` and its parameters, ignoring their order."""
+        normalized = {str(k): str(v) for k, v in (params or {}).items() if v is not None}
+        payload = json.dumps([endpoint, normalized], sort_keys=True).encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, endpoint: str, params: dict | None = None) -> dict | list | None:
+        key = self.key(endpoint, params)
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT body, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                self.stats.misses += 1
+                METRICS.inc("response_cache_total", result="miss")
+                return None
+            self.connection.execute(
+                "UPDATE responses SET used_at = ? WHERE key = ?", (now, key)
+            )
+            self.stats.hits += 1
+            METRICS.inc("response_cache_total", result="hit")
+        return json.loads(self._decompressor.decompress(row[0]))
+
+    def put(self, endpoint: str, params: dict | None, data: dict | list) -> None:
+        key = self.key(endpoint, params)
+        body = self._compressor.compress(
+            json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        )
+        now = time.time()
+        with self._lock:
+            previous = self.connection.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, len(body), now, now),
+            )
+            self._size += len(body) - (previous[0] if previous else 0)
+            self.stats.stores += 1
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Trim to 90% so eviction does not run again on the next put.
+        target = int(self.max_bytes * 0.9)
+        rows = self.connection.execute(
+            "SELECT key, size FROM responses ORDER BY used_at"
+        )
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self.stats.evicted += len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.connection.execute("DELETE FROM responses")
+            self._size = 0
+
+    def log_stats(self) -> None:
+        stats = self.stats
+        logger.info(
+            f"Response cache: {stats.hits:,} hits, {stats.misses:,} misses "
+            f"({stats.hit_rate:.1%} hit rate), {stats.stores:,} stored, "
+            f"{stats.evicted:,} evicted, {self._size / 1024**2:.1f} MiB on disk"
+        )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"ResponseCache(path={self.path})"
@@ -0,0 +1,233 @@
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+import polars as pl
+import zstandard
+
+from src.config import logger
+
+if TYPE_CHECKING:
+    from src.db.membership import MembershipIndex
+
+MANIFEST = "manifest.ndjson"
+
+
+class SegmentWriter:
+    """Append-only staging writer of zstd-compressed NDJSON segments.
+
+    Records are buffered and written as one zstd frame per ``flush``. Every
+    frame gets a line in ``manifest.ndjson`` with its segment, byte offset,
+    length, record count and ID range, written only after the frame is on
+    disk, so the manifest never points at partial data. A new segment is
+    started once the current one grows past ``max_bytes``.
+
+    Only one writer per ``prefix`` and directory may run at a time.
+
+    Args:
+        directory (Path): Staging directory, e.g. ``INTERIM_DATA_DIR / "oldbird"``.
+        prefix (str): Segment file name prefix, e.g. ``"replies"``.
+        id_field (str | None): Record field used for the manifest ID range.
+        flush_records (int): Buffered records that trigger a flush.
+        max_bytes (int): Compressed size at which a segment is rotated.
+        level (int): zstd compression level.
+        index (MembershipIndex | None): Index the IDs of flushed records are
+            added to, once they are on disk.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        prefix: str = "segment",
+        id_field: str | None = "tweet_id",
+        flush_records: int = 1_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        level: int = 3,
+        index: "MembershipIndex | None" = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.id_field = id_field
+        self.flush_records = flush_records
+        self.max_bytes = max_bytes
+        self.index = index
+        self.written = 0
+
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._buffer: list[bytes] = []
+        self._ids: list[int] = []
+        self._segment = self._next_segment()
+        self._offset = 0
+
+    def _next_segment(self) -> Path:
+        numbers = [
+            int(path.name[len(self.prefix) + 1 :].split(".")[0])
+            for path in self.directory.glob(f"{self.prefix}-*.ndjson.zst")
+        ]
+        number = max(numbers, default=0) + 1
+        return self.directory / f"{self.prefix}-{number:06d}.ndjson.zst"
+
+    def write(self, record: dict, ids: list[str] | None = None) -> None:
+        """Buffer ``record``, flushing once ``flush_records`` are buffered.
+
+        ``ids`` lists the tweet IDs a record covers when they are not in
+        ``id_field``, e.g. the IDs requested for a whole API response.
+        """
+        self._buffer.append(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode()
+        )
+        if self.id_field and record.get(self.id_field):
+            self._ids.append(int(record[self.id_field]))
+        if ids:
+            self._ids.extend(int(tweet_id) for tweet_id in ids)
+        if len(self._buffer) >= self.flush_records:
+            self.flush()
+
+    def write_many(self, records: list[dict]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        """Compress buffered records into one frame and record it in the manifest."""
+        if not self._buffer:
+            return
+
+        frame = self._compressor.compress(b"\n".join(self._buffer) + b"\n")
+        with open(self._segment, "ab") as f:
+            f.write(frame)
+            f.flush()
+            os.fsync(f.fileno())
+
+        entry = {
+            "segment": self._segment.name,
+            "offset": self._offset,
+            "length": len(frame),
+            "count": len(self._buffer),
+            "min_id": str(min(self._ids)) if self._ids else None,
+            "max_id": str(max(self._ids)) if self._ids else None,
+        }
+        with open(self.directory / MANIFEST, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        if self.index is not None and self._ids:
+            self.index.add(self._ids)
+
+        self.written += len(self._buffer)
+        self._offset += len(frame)
+        self._buffer.clear()
+        self._ids.clear()
+
+        if self._offset >= self.max_bytes:
+            self._segment = self._next_segment()
+            self._offset = 0
+
+    def close(self) -> None:
+        self.flush()
+        if self.index is not None:
+            self.index.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"SegmentWriter(directory={self.directory}, prefix={self.prefix})"
+
+
+class SegmentReader:
+    """Streaming reader over the segments listed in a staging manifest.
+
+    Args:
+        directory (Path): Staging directory holding ``manifest.ndjson``.
+        prefix (str | None): Only read segments with this prefix.
+    """
+
+    def __init__(self, directory: Path, prefix: str | None = None) -> None:
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def entries(self, min_id: int | None = None, max_id: int | None = None) -> list[dict]:
+        """Return manifest entries, skipping frames outside the ID range."""
+        manifest = self.directory / MANIFEST
+        if not manifest.exists():
+            return []
+
+        entries = []
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line of an interrupted writer.
+                    continue
+                if self.prefix and not entry["segment"].startswith(f"{self.prefix}-"):
+                    continue
+                if min_id is not None and entry["max_id"] and int(entry["max_id"]) < min_id:
+                    continue
+                if max_id is not None and entry["min_id"] and int(entry["min_id"]) > max_id:
+                    continue
+                entries.append(entry)
+        return entries
+
+    def count(self) -> int:
+        return sum(entry["count"] for entry in self.entries())
+
+    def iter_frames(self, **kwargs) -> Iterator[bytes]:
+        """Yield the decompressed NDJSON bytes of every frame in manifest order."""
+        handles: dict[str, object] = {}
+        try:
+            for entry in self.entries(**kwargs):
+                f = handles.get(entry["segment"])
+                if f is None:
+                    f = handles[entry["segment"]] = open(
+                        self.directory / entry["segment"], "rb"
+                    )
+                f.seek(entry["offset"])
+                yield self._decompressor.decompress(f.read(entry["length"]))
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def iter_batches(self, batch_size: int = 10_000, **kwargs) -> Iterator[list[dict]]:
+        """Yield lists of at most ``batch_size`` decoded records."""
+        batch: list[dict] = []
+        for frame in self.iter_frames(**kwargs):
+            for line in frame.splitlines():
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def iter_dataframes(self, **kwargs) -> Iterator[pl.DataFrame]:
+        """Yield one polars DataFrame per frame, for analytics."""
+        for frame in self.iter_frames(**kwargs):
+            yield pl.read_ndjson(frame)
+
+    def __iter__(self) -> Iterator[dict]:
+        for batch in self.iter_batches():
+            yield from batch
+
+
+def iter_staged_records(directory: Path, batch_size: int = 10_000) -> Iterator[list[dict]]:
+    """Yield record batches from segments, then from legacy one-file-per-tweet JSON."""
+    yield from SegmentReader(directory).iter_batches(batch_size)
+
+    batch: list[dict] = []
+    for path in Path(directory).glob("*.json"):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                batch.append(json.load(f))
+        except json.JSONDecodeError as e:
+            logger.error(f"Error reading {path.name}: {type(e).__name__} - {e}")
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
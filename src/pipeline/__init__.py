@@ -0,0 +1,24 @@
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .hashtags import HashtagTagger
+    from .ingest import IngestPipeline
+    from .validate import validate_batch
+
+# Exports are imported on first access, so a command only loads what it uses.
+_EXPORTS = {
+    "HashtagTagger": ".hashtags",
+    "IngestPipeline": ".ingest",
+    "validate_batch": ".validate",
+}
+
+__all__ = ["HashtagTagger", "IngestPipeline", "validate_batch"]
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,162 @@
+import json
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import polars as pl
+
+from src.config import logger
+
+if TYPE_CHECKING:
+    from src.db import DB, PBWarehouse
+
+# Hashtag families tagged by default, without the leading "#".
+DEFAULT_FAMILIES: dict[str, list[str]] = {
+    "blm": ["blacklivesmatter", "blacklivesmatters", "blm"],
+}
+
+
+class HashtagTagger:
+    """Batch hashtag tagger for tweet text.
+
+    Every family compiles to one case-insensitive token-boundary regex, e.g.
+    ``#(?:blacklivesmatters|blacklivesmatter|blm)\\b``, so ``#BLM`` and
+    ``#blm!`` match but ``#blmfoo`` and ``#blm_2020`` do not. The same
+    pattern runs over whole polars text columns (``tag``) and over single
+    strings (``matches``), so both paths agree.
+
+    Args:
+        families (dict[str, list[str]]): Family name to hashtags without ``#``.
+            Family ``x`` produces the column ``has_x_hashtag``.
+    """
+
+    def __init__(self, families: dict[str, list[str]] | None = None) -> None:
+        self.families = families or DEFAULT_FAMILIES
+        self.patterns: dict[str, str] = {}
+        for family, tags in self.families.items():
+            # Longest first so the alternation never stops at a prefix.
+            alternatives = "|".join(
+                re.escape(tag.lower().lstrip("#"))
+                for tag in sorted(tags, key=len, reverse=True)
+            )
+            self.patterns[family] = rf"(?i)#(?:{alternatives})\b"
+        self._compiled = {
+            family: re.compile(pattern) for family, pattern in self.patterns.items()
+        }
+
+    @classmethod
+    def from_json(cls, path: Path) -> "HashtagTagger":
+        """Load families from a JSON file mapping family names to hashtag lists."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def column(family: str) -> str:
+        return f"has_{family}_hashtag"
+
+    @property
+    def columns(self) -> list[str]:
+        return [self.column(family) for family in self.families]
+
+    def expressions(self, text_col: str = "text") -> list[pl.Expr]:
+        text = pl.col(text_col).fill_null("")
+        return [
+            text.str.contains(pattern).alias(self.column(family))
+            for family, pattern in self.patterns.items()
+        ]
+
+    def tag(
+        self, df: pl.DataFrame, text_col: str = "text", with_tags: bool = False
+    ) -> pl.DataFrame:
+        """Add one boolean column per family, and optionally the matched tags.
+
+        With ``with_tags`` each family also gets a ``<family>_hashtags`` list
+        column of the lowercased hashtags found in the text.
+        """
+        expressions = self.expressions(text_col)
+        if with_tags:
+            text = pl.col(text_col).fill_null("")
+            expressions += [
+                text.str.extract_all(pattern)
+                .list.eval(pl.element().str.to_lowercase())
+                .alias(f"{family}_hashtags")
+                for family, pattern in self.patterns.items()
+            ]
+        return df.with_columns(expressions)
+
+    def tag_texts(self, texts: list[str | None]) -> pl.DataFrame:
+        return self.tag(pl.DataFrame({"text": texts}, schema={"text": pl.Utf8}))
+
+    def matches(self, text: str | None) -> dict[str, bool]:
+        """Tag a single text, for callers that handle one record at a time."""
+        return {
+            self.column(family): bool(pattern.search(text or ""))
+            for family, pattern in self._compiled.items()
+        }
+
+
+def backfill_duckdb(db: "DB", tagger: HashtagTagger, batch_size: int = 100_000) -> int:
+    """Add and fill the tagger's columns on the DuckDB ``tweets`` table.
+
+    Returns:
+        int: Number of rows tagged.
+    """
+    for column in tagger.columns:
+        db.execute(f"ALTER TABLE tweets ADD COLUMN IF NOT EXISTS {column} BOOLEAN")
+
+    reader = db.connection.execute("SELECT id, text FROM tweets").fetch_record_batch(
+        batch_size
+    )
+    tagged_rows = 0
+    cursor = db.connection.cursor()
+    for record_batch in reader:
+        tagged = tagger.tag(pl.from_arrow(record_batch)).drop("text")
+        assignments = ", ".join(f"{c} = tagged.{c}" for c in tagger.columns)
+        cursor.execute(
+            f"UPDATE tweets SET {assignments} FROM tagged WHERE tweets.id = tagged.id"
+        )
+        tagged_rows += tagged.height
+        logger.info(f"Tagged {tagged_rows:,} DuckDB tweets")
+    return tagged_rows
+
+
+def backfill_pocketbase(
+    pb: "PBWarehouse", tagger: HashtagTagger, per_page: int = 500, concurrency: int = 8
+) -> int:
+    """Recompute the tagger's columns on the PocketBase ``tweets`` collection.
+
+    Only records whose flags changed are patched, through an upsert
+    ``PBWriter``.
+
+    Returns:
+        int: Number of records scanned.
+    """
+    fields = ",".join(["tweet_id", "text", *tagger.columns])
+    scanned, page = 0, 1
+    with pb.writer(concurrency=concurrency, upsert=True) as writer:
+        while True:
+            result = pb.client.collection("tweets").get_list(
+                page, per_page, {"fields": fields, "sort": "id", "skipTotal": 1}
+            )
+            if not result.items:
+                break
+
+            records = pl.DataFrame(
+                {
+                    "tweet_id": [r.tweet_id for r in result.items],
+                    "text": [r.text for r in result.items],
+                },
+                schema={"tweet_id": pl.Utf8, "text": pl.Utf8},
+            )
+            for row in tagger.tag(records).drop("text").iter_rows(named=True):
+                writer.add("tweets", row)
+
+            scanned += len(result.items)
+            page += 1
+            logger.info(f"Tagged {scanned:,} PocketBase tweets")
+
+    logger.info(
+        f"Updated {writer.stats.updated:,} PocketBase tweets, "
+        f"{writer.stats.skipped:,} unchanged"
+    )
+    return scanned
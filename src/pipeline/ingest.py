@@ -0,0 +1,168 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+import zstandard
+from pydantic import BaseModel
+
+from src.config import logger
+from src.db.staging import SegmentReader
+from src.pipeline.validate import ValidatedBatch, validate_batch
+from src.utils.metrics import METRICS
+
+if TYPE_CHECKING:
+    from src.db.pb_warehouse import PBWriter
+
+
+class IngestStats(BaseModel):
+    units: int = 0
+    validated: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.validated / self.elapsed if self.elapsed else 0.0
+
+
+class WorkUnit(BaseModel):
+    """A slice of staged data small enough to ship to a worker process."""
+
+    segment: Path | None = None
+    offset: int = 0
+    length: int = 0
+    files: list[Path] = []
+
+
+def iter_work_units(staging: Path, files_per_unit: int = 500) -> Iterator[WorkUnit]:
+    """Yield one unit per segment frame, then chunks of legacy JSON files."""
+    for entry in SegmentReader(staging).entries():
+        yield WorkUnit(
+            segment=staging / entry["segment"],
+            offset=entry["offset"],
+            length=entry["length"],
+        )
+
+    files: list[Path] = []
+    for path in staging.glob("*.json"):
+        files.append(path)
+        if len(files) >= files_per_unit:
+            yield WorkUnit(files=files)
+            files = []
+    if files:
+        yield WorkUnit(files=files)
+
+
+def load_unit(unit: WorkUnit) -> tuple[list[dict], list[dict]]:
+    """Read the records of ``unit``.
+
+    A legacy file that cannot be read or does not hold a JSON object becomes
+    an error row and the rest of the unit is still loaded.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The records and one error row per bad file.
+    """
+    if unit.segment is not None:
+        with open(unit.segment, "rb") as f:
+            f.seek(unit.offset)
+            frame = zstandard.ZstdDecompressor().decompress(f.read(unit.length))
+        return [json.loads(line) for line in frame.splitlines()], []
+
+    records, errors = [], []
+    for path in unit.files:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            if not isinstance(record, dict):
+                raise ValueError(f"Expected a JSON object, got {type(record).__name__}")
+        except (OSError, ValueError) as e:
+            errors.append(
+                {"tweet_id": None, "error": f"{path.name}: {type(e).__name__} - {e}"}
+            )
+            continue
+        records.append(record)
+    return records, errors
+
+
+def process_unit(unit: WorkUnit) -> ValidatedBatch:
+    """Read, parse and validate one unit. Runs in a worker process."""
+    try:
+        records, errors = load_unit(unit)
+        batch = validate_batch(records)
+    except (OSError, ValueError, zstandard.ZstdError) as e:
+        source = unit.segment or f"{len(unit.files)} files"
+        return ValidatedBatch(
+            errors=[{"tweet_id": None, "error": f"{source}: {type(e).__name__} - {e}"}]
+        )
+    batch.errors = errors + batch.errors
+    return batch
+
+
+class IngestPipeline:
+    """Parallel read -> validate -> write pipeline for staged tweets.
+
+    Worker processes load and validate whole work units (a segment frame or
+    a chunk of legacy files) while the main process hands valid rows to the
+    ``PBWriter``, whose threads do the network writes. At most
+    ``max_pending`` units are in flight and the writer bounds its own queue,
+    so a slow stage blocks the one before it instead of buffering.
+
+    Args:
+        writer (PBWriter): Writer stage the validated rows are queued on.
+        workers (int | None): Worker processes. Defaults to the CPU count.
+        max_pending (int | None): Units in flight. Defaults to ``2 * workers``.
+    """
+
+    def __init__(
+        self,
+        writer: "PBWriter",
+        workers: int | None = None,
+        max_pending: int | None = None,
+    ) -> None:
+        self.writer = writer
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self.stats = IngestStats()
+
+    def run(self, staging: Path) -> IngestStats:
+        start = time.perf_counter()
+        pending: set[Future] = set()
+
+        # Forking copies the locks of the threads this process already runs
+        # (writer workers, the metrics exporter), which can deadlock a child.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+            for unit in iter_work_units(staging):
+                if len(pending) >= self.max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._sink(future.result())
+                pending.add(pool.submit(process_unit, unit))
+
+            for future in pending:
+                self._sink(future.result())
+
+        self.writer.flush()
+        self.stats.elapsed = time.perf_counter() - start
+        return self.stats
+
+    def _sink(self, batch: ValidatedBatch) -> None:
+        self.stats.units += 1
+        self.stats.validated += len(batch.tweets)
+        self.stats.invalid += len(batch.errors)
+        METRICS.inc("rows_validated_total", len(batch.tweets), stage="ingest")
+        if batch.errors:
+            METRICS.inc("rows_invalid_total", len(batch.errors), stage="ingest")
+
+        for error in batch.errors:
+            logger.error(f"Invalid tweet {error['tweet_id']}: {error['error']}")
+            METRICS.record_error("validate", "ValidationError")
+
+        for tweet in batch.tweets:
+            self.writer.add("tweets", tweet)
+        for user in batch.users:
+            self.writer.add("tweet_users", user)
@@ -0,0 +1,400 @@
+import types
+from typing import TYPE_CHECKING, Union, get_args, get_origin
+
+import polars as pl
+from pydantic import BaseModel, ConfigDict
+
+from src.models import Tweet, User
+from src.pipeline.hashtags import HashtagTagger
+
+if TYPE_CHECKING:
+    from tweety.types import Tweet as TweetyTweet
+
+POLARS_TYPES = {str: pl.Utf8, int: pl.Int64, bool: pl.Boolean, float: pl.Float64}
+TAGGER = HashtagTagger()
+
+# Twitter's timestamp format, shared by Oldbird and the GraphQL "legacy" objects,
+# e.g. "Mon Jun 01 12:00:00 +0000 2020", without the weekday.
+TWITTER_TIME_FORMAT = "%b %d %H:%M:%S %z %Y"
+
+
+def twitter_time(column: str = "creation_date") -> pl.Expr:
+    """Parse a Twitter timestamp column to a naive UTC datetime, null if invalid."""
+    # The weekday is dropped, it adds nothing and fails on inconsistent data.
+    return (
+        pl.col(column)
+        .str.slice(4)
+        .str.to_datetime(TWITTER_TIME_FORMAT, strict=False)
+        .dt.convert_time_zone("UTC")
+        .dt.replace_time_zone(None)
+    )
+
+
+def model_schema(model: type[BaseModel]) -> dict[str, pl.DataType]:
+    """Map the fields of a pydantic model to polars types, unwrapping ``Optional``."""
+    schema = {}
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if get_origin(annotation) in (Union, types.UnionType):
+            annotation = next(a for a in get_args(annotation) if a is not type(None))
+        schema[name] = POLARS_TYPES.get(annotation, pl.Utf8)
+    return schema
+
+
+# Output schemas of every source: the models plus one flag per hashtag family.
+TWEET_SCHEMA = model_schema(Tweet) | dict.fromkeys(TAGGER.columns, pl.Boolean)
+USER_SCHEMA = model_schema(User)
+
+# Oldbird results already use the model field names, with the user nested.
+OLDBIRD_DTYPE = pl.Struct(
+    {
+        **{
+            name: dtype
+            for name, dtype in model_schema(Tweet).items()
+            if name != "user_id" and name not in TAGGER.columns
+        },
+        "user": pl.Struct(USER_SCHEMA),
+    }
+)
+
+# The parts of a GraphQL tweet result (twttr and Tweety) that are read.
+GRAPHQL_USER = pl.Struct(
+    {
+        "rest_id": pl.Utf8,
+        "is_blue_verified": pl.Boolean,
+        "legacy": pl.Struct(
+            {
+                "created_at": pl.Utf8,
+                "screen_name": pl.Utf8,
+                "name": pl.Utf8,
+                "followers_count": pl.Int64,
+                "friends_count": pl.Int64,
+                "favourites_count": pl.Int64,
+                "protected": pl.Boolean,
+                "verified": pl.Boolean,
+                "location": pl.Utf8,
+                "description": pl.Utf8,
+                "statuses_count": pl.Int64,
+                "listed_count": pl.Int64,
+            }
+        ),
+    }
+)
+GRAPHQL_COMMUNITY = pl.Struct({"result": pl.Struct({"name": pl.Utf8})})
+GRAPHQL_TWEET = pl.Struct(
+    {
+        "rest_id": pl.Utf8,
+        "source": pl.Utf8,
+        "views": pl.Struct({"count": pl.Utf8}),
+        "core": pl.Struct({"user_results": pl.Struct({"result": GRAPHQL_USER})}),
+        "note_tweet": pl.Struct(
+            {"note_tweet_results": pl.Struct({"result": pl.Struct({"text": pl.Utf8})})}
+        ),
+        "birdwatch_pivot": pl.Struct({"subtitle": pl.Struct({"text": pl.Utf8})}),
+        "hasModeratedReplies": pl.Boolean,
+        "community_results": GRAPHQL_COMMUNITY,
+        "author_community_relationship": pl.Struct(
+            {"community_results": GRAPHQL_COMMUNITY}
+        ),
+        "legacy": pl.Struct(
+            {
+                "full_text": pl.Utf8,
+                "created_at": pl.Utf8,
+                "user_id_str": pl.Utf8,
+                "lang": pl.Utf8,
+                "possibly_sensitive": pl.Boolean,
+                "bookmark_count": pl.Int64,
+                "favorite_count": pl.Int64,
+                "retweet_count": pl.Int64,
+                "reply_count": pl.Int64,
+                "quote_count": pl.Int64,
+                "conversation_id_str": pl.Utf8,
+                "in_reply_to_status_id_str": pl.Utf8,
+                "quoted_status_id_str": pl.Utf8,
+                "retweeted_status_result": pl.Struct(
+                    {"result": pl.Struct({"rest_id": pl.Utf8})}
+                ),
+            }
+        ),
+    }
+)
+# Withheld or limited tweets wrap the result in a "tweet" field.
+GRAPHQL_DTYPE = pl.Struct({**GRAPHQL_TWEET.to_schema(), "tweet": GRAPHQL_TWEET})
+TWTTR_RESULT = pl.Struct(
+    {"tweetResult": pl.List(pl.Struct({"result": GRAPHQL_DTYPE}))}
+)
+# Staged responses wrap the API result in "response", legacy files do not.
+TWTTR_DTYPE = pl.Struct(
+    {"response": pl.Struct({"result": TWTTR_RESULT}), "result": TWTTR_RESULT}
+)
+
+# Columns of the DuckDB ``tweets`` table that only GraphQL payloads carry.
+DETAIL_SCHEMA = {
+    "tweet_id": pl.Utf8,
+    "comments": pl.Utf8,
+    "sensitive_flag": pl.Boolean,
+    "has_moderated_replies": pl.Boolean,
+    "community": pl.Utf8,
+}
+
+SOURCES = ("oldbird", "graphql", "twttr")
+
+
+class NormalizedBatch(BaseModel):
+    """Tweets and their users in ``TWEET_SCHEMA`` and ``USER_SCHEMA``."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    tweets: pl.DataFrame
+    users: pl.DataFrame
+    # ``DETAIL_SCHEMA`` of the tweets, all null for Oldbird.
+    details: pl.DataFrame
+    # Records dropped for having no tweet ID.
+    dropped: int = 0
+
+
+def detect_source(record: dict) -> str:
+    """Guess which of ``SOURCES`` produced a raw ``record``."""
+    if "response" in record or "tweetResult" in record.get("result", {}):
+        return "twttr"
+    if "rest_id" in record or "legacy" in record or "tweet" in record:
+        return "graphql"
+    return "oldbird"
+
+
+def normalize(
+    records: list[dict], source: str | None = None, tagger: HashtagTagger = TAGGER
+) -> NormalizedBatch:
+    """Convert a batch of raw records from any of ``SOURCES`` to one schema.
+
+    Every source is decoded in one pass by casting the batch to a polars
+    struct type holding only the fields that are read, then mapped with
+    column expressions; fields missing from a record become nulls. Users are
+    deduplicated per batch.
+
+    Args:
+        records (list[dict]): Oldbird results, GraphQL tweet results or
+            twttr responses, staged (``{"tweet_ids": ..., "response": ...}``)
+            or legacy (``{"result": {"tweetResult": ...}}``).
+        source (str | None): One of ``SOURCES``, detected from the first
+            record when ``None``.
+        tagger (HashtagTagger): Computes the hashtag family flags.
+    """
+    if not records:
+        return NormalizedBatch(
+            tweets=pl.DataFrame(schema=TWEET_SCHEMA),
+            users=pl.DataFrame(schema=USER_SCHEMA),
+            details=pl.DataFrame(schema=DETAIL_SCHEMA),
+        )
+    source = source or detect_source(records[0])
+    if source == "oldbird":
+        frame = _from_oldbird(records)
+    elif source == "graphql":
+        results = pl.Series("result", records, dtype=GRAPHQL_DTYPE, strict=False)
+        frame = _from_graphql(results)
+    elif source == "twttr":
+        responses = pl.Series("record", records, dtype=TWTTR_DTYPE, strict=False)
+        tweet_results = pl.coalesce(
+            pl.col("record").struct.field("response").struct.field("result"),
+            pl.col("record").struct.field("result"),
+        ).struct.field("tweetResult")
+        # Records without results explode to a null row, counted as dropped.
+        # Empty lists are nulled first since polars 2 explodes them to nothing.
+        results = (
+            responses.to_frame()
+            .select(
+                pl.when(tweet_results.list.len() > 0)
+                .then(tweet_results)
+                .explode()
+                .struct.field("result")
+            )
+            .to_series()
+        )
+        frame = _from_graphql(results)
+    else:
+        raise ValueError(f"Unknown source {source!r}, expected one of {SOURCES}")
+
+    rows = len(frame)
+    frame = frame.filter(pl.col("tweet_id").is_not_null())
+    tweets = frame.with_columns(tagger.expressions()).select(
+        pl.col(name).cast(dtype) for name, dtype in TWEET_SCHEMA.items()
+    )
+    users = (
+        frame.select(pl.col("user").struct.unnest())
+        .filter(pl.col("user_id").is_not_null())
+        .unique("user_id", keep="last", maintain_order=True)
+        .select(pl.col(name).cast(dtype) for name, dtype in USER_SCHEMA.items())
+    )
+    details = frame.select(
+        pl.col(name).cast(dtype)
+        if name in frame.columns
+        else pl.lit(None, dtype).alias(name)
+        for name, dtype in DETAIL_SCHEMA.items()
+    )
+    return NormalizedBatch(
+        tweets=tweets, users=users, details=details, dropped=rows - len(frame)
+    )
+
+
+def normalize_tweety(tweets: list["TweetyTweet"]) -> NormalizedBatch:
+    """Normalize Tweety ``Tweet`` objects from the GraphQL payload they wrap."""
+    payloads = []
+    for tweet in tweets:
+        # Tweety keeps the unwrapped GraphQL result it parsed in ``_tweet``.
+        payload = getattr(tweet, "_tweet", None)
+        if not isinstance(payload, dict):
+            raise TypeError(
+                "Tweety tweets no longer expose their GraphQL payload as "
+                "``_tweet``, check the installed tweety-ns version"
+            )
+        payloads.append(payload)
+    batch = normalize(payloads, source="graphql")
+
+    # The replies Tweety attached are not in the payload, keep their IDs.
+    comments = pl.DataFrame(
+        {
+            "tweet_id": [str(tweet.id) for tweet in tweets],
+            "comments": [_comment_ids(tweet) for tweet in tweets],
+        },
+        schema={"tweet_id": pl.Utf8, "comments": pl.Utf8},
+    ).unique("tweet_id", keep="last")
+    batch.details = (
+        batch.details.drop("comments")
+        .join(comments, on="tweet_id", how="left")
+        .select(list(DETAIL_SCHEMA))
+    )
+    return batch
+
+
+def _comment_ids(tweet: "TweetyTweet") -> str:
+    """IDs of the replies in a Tweety tweet's comment threads, as ``[1, 2]``."""
+    threads = getattr(tweet, "comments", None) or []
+    return f"[{', '.join(str(reply.id) for thread in threads for reply in thread)}]"
+
+
+def expand_tweets(records: list[dict]) -> list[dict]:
+    """Return staged tweets followed by their retweeted and quoted statuses."""
+    tweets = []
+    for record in records:
+        for nested in ("retweet_status", "quoted_status"):
+            if record.get(nested):
+                tweets.append(record[nested])
+        tweets.append(record)
+    return tweets
+
+
+def _from_oldbird(records: list[dict]) -> pl.DataFrame:
+    results = pl.Series(
+        "result", expand_tweets(records), dtype=OLDBIRD_DTYPE, strict=False
+    )
+    return results.struct.unnest().with_columns(
+        user_id=pl.col("user").struct.field("user_id")
+    )
+
+
+def _from_graphql(results: pl.Series) -> pl.DataFrame:
+    frame = results.struct.unnest()
+    tweet = pl.struct(
+        pl.coalesce(pl.col("tweet").struct.field(name), pl.col(name)).alias(name)
+        for name in GRAPHQL_TWEET.to_schema()
+    )
+    frame = frame.select(tweet.alias("tweet")).unnest("tweet")
+
+    legacy = pl.col("legacy").struct.field
+    user = pl.col("core").struct.field("user_results").struct.field("result")
+    user_legacy = user.struct.field("legacy").struct.field
+    long_text = (
+        pl.col("note_tweet")
+        .struct.field("note_tweet_results")
+        .struct.field("result")
+        .struct.field("text")
+    )
+    return frame.select(
+        tweet_id=pl.col("rest_id"),
+        text=pl.coalesce(long_text, legacy("full_text")),
+        user_id=pl.coalesce(legacy("user_id_str"), user.struct.field("rest_id")),
+        bookmark_count=legacy("bookmark_count"),
+        views=pl.col("views").struct.field("count").cast(pl.Int64, strict=False),
+        retweet_count=legacy("retweet_count"),
+        favorite_count=legacy("favorite_count"),
+        reply_count=legacy("reply_count"),
+        quote_count=legacy("quote_count"),
+        in_reply_to_status_id=legacy("in_reply_to_status_id_str"),
+        conversation_id=legacy("conversation_id_str"),
+        retweet_tweet_id=legacy("retweeted_status_result")
+        .struct.field("result")
+        .struct.field("rest_id"),
+        quoted_status_id=legacy("quoted_status_id_str"),
+        community_note=pl.col("birdwatch_pivot")
+        .struct.field("subtitle")
+        .struct.field("text"),
+        # Absent flags are false, as Tweety reads them.
+        sensitive_flag=legacy("possibly_sensitive").fill_null(False),
+        has_moderated_replies=pl.col("hasModeratedReplies").fill_null(False),
+        community=pl.coalesce(
+            pl.col("author_community_relationship").struct.field("community_results"),
+            pl.col("community_results"),
+        )
+        .struct.field("result")
+        .struct.field("name"),
+        language=legacy("lang"),
+        # The source is an HTML link, keep only its label.
+        source=pl.coalesce(pl.col("source").str.extract(r">([^<]*)<"), "source"),
+        creation_date=legacy("created_at"),
+        user=pl.struct(
+            creation_date=user_legacy("created_at"),
+            user_id=user.struct.field("rest_id"),
+            username=user_legacy("screen_name"),
+            name=user_legacy("name"),
+            follower_count=user_legacy("followers_count"),
+            following_count=user_legacy("friends_count"),
+            favourites_count=user_legacy("favourites_count"),
+            is_private=user_legacy("protected"),
+            is_verified=user_legacy("verified"),
+            is_blue_verified=user.struct.field("is_blue_verified"),
+            location=user_legacy("location"),
+            description=user_legacy("description"),
+            number_of_tweets=user_legacy("statuses_count"),
+            # GraphQL does not flag automated accounts the way Oldbird does.
+            bot=pl.lit(False),
+            listed_count=user_legacy("listed_count"),
+        ),
+    )
+
+
+def to_duckdb_tweets(batch: NormalizedBatch) -> pl.DataFrame:
+    """Map a normalized batch to the columns of the DuckDB ``tweets`` table."""
+    users = batch.users.select("user_id", "username", "is_verified")
+    details = batch.details.unique("tweet_id", keep="last")
+    return (
+        batch.tweets.join(users, on="user_id", how="left")
+        .join(details, on="tweet_id", how="left")
+        .select(
+            id=pl.col("tweet_id"),
+            text=pl.col("text"),
+            retweet_count=pl.col("retweet_count"),
+            reply_count=pl.col("reply_count"),
+            like_count=pl.col("favorite_count"),
+            quote_count=pl.col("quote_count"),
+            community_note=pl.col("community_note"),
+            comments=pl.col("comments"),
+            in_reply_to=pl.col("in_reply_to_status_id"),
+            sensitive_flag=pl.col("sensitive_flag"),
+            lang=pl.col("language"),
+            time_of_day=twitter_time(),
+            is_reply=pl.col("in_reply_to_status_id").is_not_null(),
+            source=pl.col("source"),
+            url=pl.format(
+                "https://x.com/{}/status/{}",
+                pl.col("username").fill_null("i"),
+                pl.col("tweet_id"),
+            ),
+            author_id=pl.col("user_id"),
+            author_name=pl.col("username"),
+            verified_author=pl.col("is_verified"),
+            bookmark_count=pl.col("bookmark_count"),
+            views=pl.col("views").cast(pl.Utf8),
+            has_moderated_replies=pl.col("has_moderated_replies"),
+            community=pl.col("community"),
+        )
+    )
@@ -0,0 +1,81 @@
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from src.models import Tweet, User
+from src.pipeline.hashtags import HashtagTagger
+from src.pipeline.normalize import normalize
+
+TWEETS = TypeAdapter(list[Tweet])
+USERS = TypeAdapter(list[User])
+TAGGER = HashtagTagger()
+
+
+class ValidatedBatch(BaseModel):
+    tweets: list[dict] = []
+    users: list[dict] = []
+    errors: list[dict] = []
+
+
+def prepare_tweet(tweet: dict, tagger: HashtagTagger = TAGGER) -> dict:
+    """Add the derived hashtag flags and ``user_id`` fields to ``tweet``."""
+    assert isinstance(tweet, dict), "Input must be a dictionary"
+
+    tweet.update(tagger.matches(tweet.get("text", "")))
+    tweet["user_id"] = tweet.get("user", {}).get("user_id", "")
+    return tweet
+
+
+def _validate(adapter: TypeAdapter, rows: list[dict]) -> tuple[list[dict], dict[int, str]]:
+    """Validate ``rows`` in one call, returning valid rows and errors by index."""
+    try:
+        return [m.model_dump() for m in adapter.validate_python(rows)], {}
+    except ValidationError as e:
+        errors: dict[int, str] = {}
+        for error in e.errors(include_url=False):
+            index = error["loc"][0]
+            field = ".".join(str(part) for part in error["loc"][1:])
+            errors.setdefault(index, f"{field}: {error['msg']}")
+
+    valid = [row for i, row in enumerate(rows) if i not in errors]
+    return [m.model_dump() for m in adapter.validate_python(valid)], errors
+
+
+def validate_batch(records: list[dict], tagger: HashtagTagger = TAGGER) -> ValidatedBatch:
+    """Validate a batch of staged tweets against the ``Tweet`` and ``User`` schemas.
+
+    Records of any source are first normalized to one schema (see
+    ``normalize``). Rows that fail are collected in ``errors`` instead of
+    aborting the batch; a tweet is only kept if both the tweet and its user
+    are valid. Users are deduplicated per batch.
+    """
+    normalized = normalize(records, tagger=tagger)
+    errors = [
+        {"tweet_id": None, "error": "Missing 'tweet_id'"}
+        for _ in range(normalized.dropped)
+    ]
+
+    tweets = normalized.tweets.to_dicts()
+    users = normalized.users.to_dicts()
+    valid_tweets, tweet_errors = _validate(TWEETS, tweets)
+    valid_users, user_errors = _validate(USERS, users)
+
+    user_problems = {users[i]["user_id"]: user_errors[i] for i in user_errors}
+    user_ids = {user["user_id"] for user in valid_users}
+    batch = ValidatedBatch(errors=errors)
+    # Valid rows come back in input order, so walk them alongside the inputs.
+    tweet_rows = iter(valid_tweets)
+    for index, tweet in enumerate(tweets):
+        row = next(tweet_rows) if index not in tweet_errors else None
+        if row is None:
+            message = tweet_errors[index]
+        elif tweet["user_id"] in user_problems:
+            message = f"user.{user_problems[tweet['user_id']]}"
+        elif tweet["user_id"] not in user_ids:
+            message = "user: Missing user"
+        else:
+            batch.tweets.append(row)
+            continue
+        batch.errors.append({"tweet_id": tweet["tweet_id"], "error": message})
+
+    kept = {tweet["user_id"] for tweet in batch.tweets}
+    batch.users = [user for user in valid_users if user["user_id"] in kept]
+    return batch
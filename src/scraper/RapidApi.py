@@ -1,10 +1,26 @@
-import json
-from http.client import HTTPResponse, HTTPSConnection
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Iterable
 
+import httpx
 from polars import DataFrame
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 
 from src.config import logger
+from src.db.response_cache import ResponseCache
+from src.utils.metrics import METRICS
+from src.utils.rate_limiter import TokenBucket
+
+TWITTER241_URL = "https://twitter241.p.rapidapi.com"
+TWEETS_ENDPOINT = "/tweet-by-ids"
+MAX_IDS_PER_REQUEST = 250
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Requests per second shared by every batch in flight; stay under the plan.
+TWITTER241_RATE = 5.0
+TWITTER241_BURST = 5
 
 
 class InputData(BaseModel):
@@ -16,39 +32,244 @@ class InputData(BaseModel):
 
     @model_validator(mode="after")
     def check_range(self) -> "InputData":
-        if self.end - self.start > 250:
+        if self.end - self.start > MAX_IDS_PER_REQUEST:
             raise ValueError("The range must not exceed 250 tweet IDs.")
         return self
 
 
+class BatchResult(BaseModel):
+    """Outcome of one ``/tweet-by-ids`` request.
+
+    ``data`` is set on success; otherwise ``error`` (and ``status`` when the
+    API answered) say why, so the caller can retry exactly these IDs.
+    """
+
+    tweet_ids: list[str]
+    data: dict | None = None
+    status: int | None = None
+    error: str | None = None
+    attempts: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+
 class RapidApi(BaseModel):
+    """Client of the twitter241 ``/tweet-by-ids`` endpoint.
+
+    ``fetch_batches`` keeps up to ``concurrency`` requests in flight, paced
+    by one token bucket of ``rate`` requests per second; a 429 pauses the
+    bucket for the ``Retry-After`` the API sent. Response cache reads and
+    writes, and the ``on_result`` callback of ``run_batches``, run on one
+    I/O thread so they never stall the event loop.
+    """
+
     api_key: str = Field(min_length=50, max_length=50)
     api_host: str = Field(default="twitter241.p.rapidapi.com")
+    base_url: str = Field(default=TWITTER241_URL)
+    timeout: float = 30.0
+    max_retries: int = 3
+    rate: float = Field(default=TWITTER241_RATE, gt=0)
+    cache: ResponseCache | None = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    _client: httpx.Client | None = PrivateAttr(default=None)
+    _bucket: TokenBucket | None = PrivateAttr(default=None)
+    _io: ThreadPoolExecutor | None = PrivateAttr(default=None)
 
     def get_headers(self):
         return {
             "x-rapidapi-key": self.api_key,
             "x-rapidapi-host": self.api_host,
+            "accept-encoding": "gzip",
         }
 
-    def get_data(self, data: DataFrame, start: int, end: int) -> dict:
+    def _params(self, tweet_ids: list[str]) -> dict:
+        return {"tweetIds": ",".join(tweet_ids)}
 
-        input = InputData(data=data, start=start, end=end)
+    @property
+    def _endpoint(self) -> str:
+        return f"{self.base_url}{TWEETS_ENDPOINT}"
 
-        try:
-            conn = HTTPSConnection("twitter241.p.rapidapi.com")
+    def get_data(self, data: DataFrame, start: int, end: int) -> dict:
+        """Fetch one batch over a kept-alive connection, ``{}`` on failure."""
+        input = InputData(data=data, start=start, end=end)
 
-            tweet_ids: str = r"%2C".join(
-                list(input.data["tweetIds"][input.start : input.end])
-            )
-            conn.request(
-                "GET", "/tweet-by-ids?tweetIds=" + tweet_ids, headers=self.get_headers()
+        if self._client is None:
+            self._client = httpx.Client(
+                base_url=self.base_url,
+                headers=self.get_headers(),
+                timeout=self.timeout,
             )
-            res: HTTPResponse = conn.getresponse()
-            json_data: bytes = res.read()
-
-            return json.loads(json_data.decode("utf-8"))
 
-        except Exception:
+        tweet_ids = list(input.data["tweetIds"][input.start : input.end])
+        params = self._params(tweet_ids)
+        if self.cache is not None:
+            cached = self.cache.get(self._endpoint, params)
+            if cached is not None:
+                return cached
+        try:
+            start = time.perf_counter()
+            response = self._client.get(TWEETS_ENDPOINT, params=params)
+            METRICS.record_response(
+                TWEETS_ENDPOINT,
+                response.status_code,
+                time.perf_counter() - start,
+                len(response.content),
+            )
+            response.raise_for_status()
+            data = response.json()
+            if self.cache is not None:
+                self.cache.put(self._endpoint, params, data)
+            return data
+        except Exception as e:
+            METRICS.record_error("fetch", e)
             logger.exception("Error while getting data")
             return {}
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def fetch_batch(
+        self, client: httpx.AsyncClient, tweet_ids: list[str]
+    ) -> BatchResult:
+        """Fetch one batch, retrying 429, 5xx and network errors with backoff.
+
+        Requests are paced by the rate limiter of ``fetch_batches``.
+        """
+        if len(tweet_ids) > MAX_IDS_PER_REQUEST:
+            raise ValueError("The range must not exceed 250 tweet IDs.")
+
+        result = BatchResult(tweet_ids=tweet_ids)
+        params = self._params(tweet_ids)
+        if self.cache is not None:
+            result.data = await self._blocking(self.cache.get, self._endpoint, params)
+            if result.data is not None:
+                result.status = 200
+                return result
+
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            sent = time.perf_counter()
+            try:
+                response = await client.get(TWEETS_ENDPOINT, params=params)
+            except httpx.TransportError as e:
+                METRICS.record_error("fetch", e)
+                result.status, result.error = None, f"{type(e).__name__} - {e}"
+            else:
+                METRICS.record_response(
+                    TWEETS_ENDPOINT,
+                    response.status_code,
+                    time.perf_counter() - sent,
+                    len(response.content),
+                )
+                result.status = response.status_code
+                if response.status_code == 200:
+                    try:
+                        result.data, result.error = response.json(), None
+                    except ValueError as e:
+                        result.error = f"Invalid JSON - {e}"
+                    else:
+                        if self.cache is not None:
+                            await self._blocking(
+                                self.cache.put, self._endpoint, params, result.data
+                            )
+                    break
+                result.error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                if response.status_code == 429 and self._bucket is not None:
+                    self._bucket.pause(self._retry_after(response, attempt))
+
+            if attempt < self.max_retries:
+                METRICS.inc("http_retries_total", endpoint=TWEETS_ENDPOINT)
+                await asyncio.sleep(self._backoff(attempt))
+
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def fetch_batches(
+        self, batches: Iterable[list[str]], concurrency: int = 4
+    ) -> AsyncIterator[BatchResult]:
+        """Yield a ``BatchResult`` per batch as requests complete.
+
+        ``batches`` is consumed lazily and at most ``concurrency`` requests
+        are in flight at once, all sharing one pooled, kept-alive
+        ``httpx.AsyncClient`` and one ``rate`` limit.
+        """
+        limits = httpx.Limits(
+            max_connections=concurrency, max_keepalive_connections=concurrency
+        )
+        self._bucket = TokenBucket(
+            self.rate, capacity=min(TWITTER241_BURST, concurrency)
+        )
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rapidapi-io")
+        try:
+            async with httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.get_headers(),
+                limits=limits,
+                timeout=httpx.Timeout(self.timeout),
+            ) as client:
+                batches = iter(batches)
+                in_flight: set[asyncio.Task[BatchResult]] = set()
+                try:
+                    while True:
+                        for batch in islice(batches, concurrency - len(in_flight)):
+                            in_flight.add(
+                                asyncio.create_task(self.fetch_batch(client, batch))
+                            )
+                        if not in_flight:
+                            break
+                        done, in_flight = await asyncio.wait(
+                            in_flight, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        for task in done:
+                            yield task.result()
+                finally:
+                    for task in in_flight:
+                        task.cancel()
+        finally:
+            self._io.shutdown()
+            self._io = None
+            self._bucket = None
+
+    def run_batches(
+        self,
+        batches: Iterable[list[str]],
+        on_result: Callable[[BatchResult], None],
+        concurrency: int = 4,
+    ) -> None:
+        """Blocking wrapper around ``fetch_batches`` for synchronous callers.
+
+        ``on_result`` runs on the I/O thread, so it may write to disk.
+        """
+
+        async def consume() -> None:
+            async for result in self.fetch_batches(batches, concurrency):
+                await self._blocking(on_result, result)
+
+        asyncio.run(consume())
+
+    async def _blocking(self, function: Callable[..., Any], *args) -> Any:
+        """Run ``function(*args)`` on the I/O thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io, function, *args)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(60.0, 2**attempt) * (0.5 + random.random() / 2)
+
+    def _retry_after(self, response: httpx.Response, attempt: int) -> float:
+        try:
+            return float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            return self._backoff(attempt)
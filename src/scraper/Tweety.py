@@ -1,22 +1,26 @@
-from pprint import pprint
-from time import sleep
-
 import polars as pl
 from tqdm import tqdm
 from tweety import TwitterAsync
 from tweety.types import Search, Tweet
 
-from src.config import EXTERNAL_DATA_DIR, logger
+from src.config import BLM_IDS_FILE, logger
 from src.config import Settings as s
-from src.db import DB
+from src.db import DB, Frontier
+from src.db.database import ERROR_COLUMNS, TWEET_COLUMNS
+from src.db.membership import SEEN_TWEETS, MembershipIndex
+from src.db.planner import plan_remaining
+from src.pipeline.normalize import normalize_tweety, to_duckdb_tweets
+from src.scraper.scheduler import SessionScheduler
+from src.utils.id_source import IdSource
 
 
 class TweetyScraper:
-    def __init__(self, previous_session: bool = True):
+    def __init__(self, previous_session: bool = True, session_name: str = "session"):
         self.previous_session = previous_session
+        self.session_name = session_name
 
     async def login(self) -> TwitterAsync:
-        app: TwitterAsync = TwitterAsync("session")
+        app: TwitterAsync = TwitterAsync(self.session_name)
         if self.previous_session:
             await app.connect()
         else:
@@ -26,93 +30,81 @@ class TweetyScraper:
 
         return app
 
-    async def get_data(self, delay: int = 10) -> None:
-        app: TwitterAsync = await self.login()
-        data: list[str] = self.load_blm_data().to_numpy().reshape(-1).tolist()
+    async def get_data(
+        self,
+        delay: int = 10,
+        retry_failed: bool = False,
+        sessions: list[str] | None = None,
+        batch_size: int = 100,
+    ) -> None:
+        session_names = sessions or s.X_SESSIONS.value.split(",")
+        scheduler = SessionScheduler(session_names, rate=1 / delay)
+        await scheduler.connect()
+
+        # Plan before opening the DB, the planner attaches it read-only.
+        remaining = plan_remaining(skip_errors=not retry_failed)
         db = DB()
 
-        columns = [
-            "id",
-            "text",
-            "retweet_count",
-            "reply_count",
-            "like_count",
-            "quote_count",
-            "community_note",
-            "comments",
-            "in_reply_to",
-            "sensitive_flag",
-            "lang",
-            "time_of_day",
-            "is_reply",
-            "source",
-            "url",
-            "author_id",
-            "author_name",
-            "verified_author",
-            "bookmark_count",
-            "views",
-            "has_moderated_replies",
-            "community",
-        ]
-
-        for tweet_id in tqdm(data, desc="Fetching tweets", unit="tweet"):
-            sleep(delay)
-            try:
-                tweet: Tweet = await app.tweet_detail(tweet_id)
-                author = tweet.author
-
-                record = {
-                    "id": tweet.id,
-                    "text": tweet.text,
-                    "retweet_count": tweet.retweet_counts,
-                    "reply_count": tweet.reply_counts,
-                    "like_count": tweet.likes,
-                    "quote_count": tweet.quote_counts,
-                    "community_note": tweet.community_note,
-                    "comments": tweet.comments,
-                    "in_reply_to": tweet.replied_to,
-                    "sensitive_flag": tweet.is_sensitive,
-                    "lang": tweet.language,
-                    "time_of_day": tweet.created_on,
-                    "is_reply": tweet.is_reply,
-                    "source": tweet.source,
-                    "url": tweet.url,
-                    "author_id": author.id if author else None,
-                    "author_name": author.username if author else None,
-                    "verified_author": author.verified if author else None,
-                    "bookmark_count": tweet.bookmark_count,
-                    "views": tweet.views,
-                    "has_moderated_replies": tweet.has_moderated_replies,
-                    "community": tweet.community,
+        frontier = Frontier("tweety")
+        frontier.seed(remaining.to_series())
+        data = IdSource(frontier.pending_ids(retry_failed=retry_failed))
+        logger.info(f"Tweets remaining: {len(data):,}")
+
+        tweets_sink = db.sink("tweets", TWEET_COLUMNS)
+        errors_sink = db.sink("errors", ERROR_COLUMNS, ignore_conflicts=False)
+
+        seen = MembershipIndex(SEEN_TWEETS)
+
+        fetched: list[Tweet] = []
+
+        def flush_tweets() -> None:
+            if fetched:
+                batch = normalize_tweety(fetched)
+                tweets_sink.add_frame(to_duckdb_tweets(batch))
+                fetched.clear()
+
+        def flush_sinks() -> None:
+            flush_tweets()
+            errors_sink.flush()
+
+        frontier.before_flush = flush_sinks
+        progress = tqdm(total=len(data), desc="Fetching tweets", unit="tweet")
+
+        def on_result(tweet_id: str, tweet: Tweet) -> None:
+            fetched.append(tweet)
+            if len(fetched) >= batch_size:
+                flush_tweets()
+            seen.add([tweet_id])
+            frontier.complete(tweet_id)
+            progress.update(1)
+
+        def on_error(tweet_id: str, e: Exception) -> None:
+            errors_sink.add(
+                {
+                    "id": tweet_id,
+                    "error_message": str(e),
+                    "error_type": type(e).__name__,
                 }
+            )
+            frontier.fail(tweet_id, f"{type(e).__name__} - {e}")
+            logger.error(f"Error processing tweet {tweet_id}: {e}")
+            progress.update(1)
 
-                insert_data = tuple(record[col] for col in columns)
-                # pprint(insert_data)
-
-                db.execute(
-                    f"""
-                    INSERT INTO tweets (
-                        {', '.join(columns)}
-                    ) VALUES (
-                        {', '.join(['?'] * len(columns))}
-                    )
-                    """,
-                    insert_data,
-                )
-                db.connection.commit()
-
-            except Exception as e:
-                db.execute(
-                    "INSERT INTO errors (id, error_message, error_type) VALUES (?, ?, ?)",
-                    (tweet_id, str(e), type(e).__name__),
+        # Exits in reverse, so the index is only saved after the sinks.
+        with seen, progress, tweets_sink, errors_sink, frontier:
+            try:
+                await scheduler.run(
+                    data.iter_strings(),
+                    lambda app, tweet_id: app.tweet_detail(tweet_id),
+                    on_result,
+                    on_error,
                 )
-                db.connection.commit()
-                logger.error(f"Error processing tweet {tweet_id}: {e}")
+            finally:
+                flush_tweets()
 
     def load_blm_data(self) -> pl.DataFrame:
         BLM_DATA: pl.DataFrame = pl.read_csv(
-            EXTERNAL_DATA_DIR / "TAPS dataset" / "blacklivesmatter.txt",
+            BLM_IDS_FILE,
             schema={"tweetIds": pl.Utf8},
         )
 
@@ -1,5 +1,24 @@
-from .RapidApi import RapidApi
-from .Tweety import TweetyScraper
-from .Twikit import TwikitScraper
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .RapidApi import RapidApi
+    from .Tweety import TweetyScraper
+    from .Twikit import TwikitScraper
+
+# Exports are imported on first access, so a command only loads what it uses.
+_EXPORTS = {
+    "RapidApi": ".RapidApi",
+    "TweetyScraper": ".Tweety",
+    "TwikitScraper": ".Twikit",
+}
 
 __all__ = ["RapidApi", "TweetyScraper", "TwikitScraper"]
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
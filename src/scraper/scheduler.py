@@ -0,0 +1,179 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+from tweety import TwitterAsync
+from tweety.exceptions import RateLimitReached
+
+from src.config import logger
+from src.utils.metrics import METRICS
+from src.utils.rate_limiter import TokenBucket
+
+T = TypeVar("T")
+
+
+class Session:
+    """One logged-in Tweety session with its own adaptive rate limiter.
+
+    Pacing follows additive increase / multiplicative decrease: every
+    success raises the rate by ``step`` up to ``max_rate``, every rate-limit
+    response halves it down to ``min_rate`` and pauses the session for the
+    ``retry_after`` Twitter reports.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        app: TwitterAsync,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        step: float,
+    ) -> None:
+        self.name = name
+        self.app = app
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.done = 0
+        self.rate_limited = 0
+
+    def on_success(self) -> None:
+        self.done += 1
+        self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.step))
+
+    def on_rate_limit(self, retry_after: float | None) -> None:
+        self.rate_limited += 1
+        self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+        self.bucket.pause(retry_after or 1 / self.bucket.rate)
+        logger.warning(
+            f"Session {self.name} rate limited, pausing {retry_after or 0:.1f}s "
+            f"and slowing to {self.bucket.rate * 60:.1f} requests/min"
+        )
+
+
+class SessionScheduler:
+    """Run tweet lookups concurrently over several logged-in Tweety sessions.
+
+    Every session pulls IDs from one shared queue, so faster or less limited
+    accounts take more of the work. An ID that hits a rate limit goes back
+    on the queue for any session to retry.
+
+    Args:
+        session_names (list[str]): Tweety session files to connect, one per account.
+        rate (float): Starting requests per second for each session.
+        min_rate (float): Lowest rate pacing may back off to.
+        max_rate (float): Highest rate pacing may speed up to.
+        step (float): Rate added after each successful request.
+    """
+
+    def __init__(
+        self,
+        session_names: list[str],
+        rate: float = 0.1,
+        min_rate: float = 0.01,
+        max_rate: float = 1.0,
+        step: float = 0.005,
+    ) -> None:
+        self.session_names = session_names
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.sessions: list[Session] = []
+
+    async def connect(self) -> list[Session]:
+        for name in self.session_names:
+            app = TwitterAsync(name)
+            try:
+                await app.connect()
+            except Exception as e:
+                logger.error(f"Could not connect session {name}: {type(e).__name__} - {e}")
+                continue
+            self.sessions.append(
+                Session(name, app, self.rate, self.min_rate, self.max_rate, self.step)
+            )
+
+        if not self.sessions:
+            raise RuntimeError("No Tweety session could be connected")
+        logger.info(f"Connected {len(self.sessions)} Tweety sessions")
+        return self.sessions
+
+    async def run(
+        self,
+        tweet_ids: Iterable[str],
+        fetch: Callable[[TwitterAsync, str], Awaitable[T]],
+        on_result: Callable[[str, T], None],
+        on_error: Callable[[str, Exception], None],
+        backlog: int = 1000,
+    ) -> None:
+        """Fetch every ID with ``fetch(app, tweet_id)`` and report each outcome.
+
+        ``tweet_ids`` is consumed lazily, keeping at most ``backlog`` IDs
+        queued or in flight.
+        """
+        if not self.sessions:
+            await self.connect()
+
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        # One slot per queued or in-flight ID; a requeued ID keeps its slot.
+        slots = asyncio.Semaphore(backlog)
+
+        async def produce() -> None:
+            for tweet_id in tweet_ids:
+                await slots.acquire()
+                queue.put_nowait(tweet_id)
+
+        def report(callback: Callable, tweet_id: str, value) -> None:
+            # A failing callback must not kill the worker holding the slot.
+            try:
+                callback(tweet_id, value)
+            except Exception as e:
+                logger.error(
+                    f"{callback.__name__} failed for tweet {tweet_id}: "
+                    f"{type(e).__name__} - {e}"
+                )
+
+        async def worker(session: Session) -> None:
+            while True:
+                tweet_id = await queue.get()
+                requeued = False
+                try:
+                    await session.bucket.acquire()
+                    start = time.perf_counter()
+                    result = await fetch(session.app, tweet_id)
+                except RateLimitReached as e:
+                    METRICS.record_response(
+                        "tweety", 429, time.perf_counter() - start
+                    )
+                    session.on_rate_limit(e.retry_after)
+                    queue.put_nowait(tweet_id)
+                    requeued = True
+                except Exception as e:
+                    METRICS.record_error("tweety", e)
+                    report(on_error, tweet_id, e)
+                else:
+                    METRICS.record_response("tweety", 200, time.perf_counter() - start)
+                    session.on_success()
+                    report(on_result, tweet_id, result)
+                finally:
+                    if not requeued:
+                        slots.release()
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker(session)) for session in self.sessions]
+        try:
+            await produce()
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        for session in self.sessions:
+            logger.info(
+                f"Session {session.name}: {session.done:,} tweets, "
+                f"{session.rate_limited:,} rate limits, "
+                f"{session.bucket.rate * 60:.1f} requests/min"
+            )
@@ -1,6 +1,31 @@
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 from .check_env_variable import check_env_variable
 from .greetings import greetings
-from .get_tweets_replies import get_tweet_replies
+from .lru import LRUCache
+from .rate_limiter import TokenBucket
+
+if TYPE_CHECKING:
+    from .get_tweets_replies import get_tweet_replies
+
+# Heavy exports are imported on first access, so a command only loads what it uses.
+_EXPORTS = {
+    "get_tweet_replies": ".get_tweets_replies",
+}
+
+__all__ = [
+    "check_env_variable",
+    "greetings",
+    "get_tweet_replies",
+    "LRUCache",
+    "TokenBucket",
+]
 
 
-__all__ = ["check_env_variable", "greetings", "get_tweet_replies"]
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
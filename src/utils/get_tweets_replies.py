@@ -1,51 +1,392 @@
-import json
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
 
-import requests
+import httpx
+from pydantic import BaseModel
 from tqdm import tqdm
 
 from src.config import logger
+from src.utils.metrics import METRICS
+from src.utils.rate_limiter import TokenBucket
+
+if TYPE_CHECKING:
+    from src.db.frontier import Frontier
+    from src.db.membership import MembershipIndex
+    from src.db.response_cache import ResponseCache
+    from src.db.staging import SegmentWriter
+
+TWITTER154_URL = "https://twitter154.p.rapidapi.com"
+REPLIES_ENDPOINT = "/tweet/replies/continuation"
+HEADERS = {
+    "x-rapidapi-key": "3ba6bea96amsha13f50dd29c930fp1f1cf9jsnc15627770e18",
+    "x-rapidapi-host": "twitter154.p.rapidapi.com",
+}
+INITIAL_CONTINUATION_TOKEN = "ZAAAAPBVHBmm-Iawof7U97U19Me0obLCjbc19oe2-Z3e8rU1xIXYkai08rU1wIa7vd2j_7Y1kILTkeeGo7Y1-IXYqdGO0uM0qIfY6YSE7rU16oLY-aqw9LU1sMe8id6277U1JQISFQQAAA"
+
+# twitter154 allows roughly 10 requests/second on the paid tiers; stay under it.
+TWITTER154_RATE = 8.0
+TWITTER154_BURST = 8
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchStats(BaseModel):
+    tweets: int = 0
+    failed: int = 0
+    pages: int = 0
+    replies: int = 0
+    duplicates: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def tweets_per_sec(self) -> float:
+        return self.tweets / self.elapsed if self.elapsed else 0.0
+
+
+class RepliesFetcher:
+    """Concurrent, rate-limited fetcher for the twitter154 replies endpoint.
 
+    Args:
+        writer (SegmentWriter): Staging writer the replies are appended to.
+        base_url (str): API root, override to point at a local mock server.
+        concurrency (int): Maximum number of tweets fetched at once.
+        rate (float): Requests per second shared by all workers.
+        max_retries (int): Retries per page on 429, 5xx or network errors.
+        max_pages (int | None): Continuation pages to follow per tweet.
+        frontier (Frontier | None): Checkpoints the cursor of every tweet so
+            an interrupted run resumes from the last fetched page.
+        cache (ResponseCache | None): Serves pages fetched before from disk.
 
-def get_tweet_replies(tweet_ids: list[str], staging: Path) -> None:
-    assert isinstance(tweet_ids, list), "tweet_ids must be a list of strings"
-    assert all(
-        isinstance(tweet_id, str) for tweet_id in tweet_ids
-    ), "All tweet_ids must be strings"
-    url = "https://twitter154.p.rapidapi.com/tweet/replies/continuation"
-    headers = {
-        "x-rapidapi-key": "3ba6bea96amsha13f50dd29c930fp1f1cf9jsnc15627770e18",
-        "x-rapidapi-host": "twitter154.p.rapidapi.com",
-    }
+    Blocking work (reading ``items``, the staging writer, the frontier and
+    the response cache) runs on one I/O thread, so it never stalls the event
+    loop and those objects are only ever used from that thread.
+    """
 
-    for tweet_id in tqdm(tweet_ids, desc="Fetching tweets", unit="tweet"):
+    def __init__(
+        self,
+        writer: SegmentWriter,
+        base_url: str = TWITTER154_URL,
+        concurrency: int = 8,
+        rate: float = TWITTER154_RATE,
+        max_retries: int = 5,
+        max_pages: int | None = None,
+        frontier: Frontier | None = None,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        self.writer = writer
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, capacity=min(TWITTER154_BURST, concurrency))
+        self.max_retries = max_retries
+        self.max_pages = max_pages
+        self.frontier = frontier
+        self.cache = cache
+        self.stats = FetchStats()
+        self._io: ThreadPoolExecutor | None = None
 
-        querystring = {
-            "tweet_id": tweet_id,
-            "continuation_token": "ZAAAAPBVHBmm-Iawof7U97U19Me0obLCjbc19oe2-Z3e8rU1xIXYkai08rU1wIa7vd2j_7Y1kILTkeeGo7Y1-IXYqdGO0uM0qIfY6YSE7rU16oLY-aqw9LU1sMe8id6277U1JQISFQQAAA",
-        }
+    async def run(
+        self,
+        tweet_ids: Iterable[str],
+        cursors: dict[str, str | None] | None = None,
+        total: int | None = None,
+    ) -> FetchStats:
+        cursors = cursors or {}
+        items = ((tweet_id, cursors.get(tweet_id)) for tweet_id in tweet_ids)
+        if total is None and isinstance(tweet_ids, list):
+            total = len(tweet_ids)
+        return await self.run_items(items, total=total)
 
-        response = requests.get(url, headers=headers, params=querystring)
-        data = response.json()
+    async def run_items(
+        self, items: Iterable[tuple[str, str | None]], total: int | None = None
+    ) -> FetchStats:
+        """Fetch the replies of ``(tweet_id, cursor)`` items, read lazily.
 
-  
+        At most a few items per worker are buffered, so ``items`` can be a
+        generator over a collection of any size.
+        """
+        queue: asyncio.Queue[tuple[str, str | None] | None] = asyncio.Queue(
+            maxsize=self.concurrency * 4
+        )
 
-        if response.status_code != 200:
-            logger.error(
-                f"Error fetching data: {response.status_code} - {data.get('message', 'No message')}"
+        iterator = iter(items)
+
+        async def produce() -> None:
+            try:
+                # Items may come from PocketBase or DuckDB, read a few at a time.
+                while batch := await self._blocking(
+                    lambda: list(islice(iterator, self.concurrency))
+                ):
+                    for item in batch:
+                        await queue.put(item)
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency,
+        )
+        start = time.perf_counter()
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replies-io")
+        try:
+            with tqdm(total=total, desc="Fetching tweets", unit="tweet") as bar:
+                async with httpx.AsyncClient(
+                    base_url=self.base_url,
+                    headers=HEADERS,
+                    limits=limits,
+                    timeout=httpx.Timeout(30.0),
+                ) as client:
+                    workers = [
+                        asyncio.create_task(self._worker(client, queue, bar))
+                        for _ in range(self.concurrency)
+                    ]
+                    await produce()
+                    await asyncio.gather(*workers)
+        finally:
+            self._io.shutdown()
+            self._io = None
+
+        self.stats.elapsed = time.perf_counter() - start
+        return self.stats
+
+    async def _blocking(self, function: Callable[..., Any], *args) -> Any:
+        """Run ``function(*args)`` on the I/O thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io, function, *args)
+
+    async def _worker(
+        self,
+        client: httpx.AsyncClient,
+        queue: asyncio.Queue[tuple[str, str | None] | None],
+        bar: tqdm,
+    ) -> None:
+        while (item := await queue.get()) is not None:
+            tweet_id, cursor = item
+            try:
+                remaining = await self.fetch_replies(client, tweet_id, cursor)
+                self.stats.tweets += 1
+                if self.frontier and remaining is None:
+                    await self._blocking(self.frontier.complete, tweet_id)
+                elif self.frontier:
+                    # Cut short by ``max_pages``: resume from the next page.
+                    await self._blocking(
+                        self.frontier.checkpoint, tweet_id, remaining
+                    )
+            except Exception as e:
+                self.stats.failed += 1
+                if self.frontier:
+                    await self._blocking(
+                        self.frontier.fail, tweet_id, f"{type(e).__name__} - {e}"
+                    )
+                logger.error(
+                    f"Giving up on tweet_id {tweet_id}: {type(e).__name__} - {e}"
+                )
+            finally:
+                bar.update(1)
+
+    async def fetch_replies(
+        self, client: httpx.AsyncClient, tweet_id: str, cursor: str | None = None
+    ) -> str | None:
+        """Fetch every reply page for one tweet, starting at ``cursor``.
+
+        Returns:
+            str | None: Cursor of the first page left unfetched once
+            ``max_pages`` is reached, ``None`` when every page was fetched.
+        """
+        token: str | None = cursor or INITIAL_CONTINUATION_TOKEN
+        pages = 0
+
+        while token:
+            if self.max_pages is not None and pages >= self.max_pages:
+                return token
+            data = await self._get(
+                client, {"tweet_id": tweet_id, "continuation_token": token}
             )
-            break
+            pages += 1
+            self.stats.pages += 1
+
+            replies = data.get("replies")
+            if replies is None:
+                raise ValueError("No replies found in the response")
+
+            if len(replies) == 0:
+                if pages == 1:
+                    logger.warning(f"No replies found for tweet_id {tweet_id}.")
+                return None
+
+            self.stats.replies += len(replies)
+            token = data.get("continuation_token")
+            await self._blocking(self._stage, tweet_id, replies, token)
+        return None
+
+    def _stage(self, tweet_id: str, replies: list[dict], token: str | None) -> None:
+        """Write a page of replies and checkpoint the cursor after it."""
+        if self.writer.index is not None:
+            # Replies already staged by an earlier run or another job.
+            seen = self.writer.index.contains([r.get("tweet_id") for r in replies])
+            self.stats.duplicates += int(seen.sum())
+            replies = [reply for reply, dup in zip(replies, seen) if not dup]
+        self.writer.write_many(replies)
+        if self.frontier and token:
+            self.frontier.checkpoint(tweet_id, token)
+
+    async def _get(self, client: httpx.AsyncClient, params: dict) -> dict:
+        endpoint = f"{self.base_url}{REPLIES_ENDPOINT}"
+        if self.cache is not None:
+            cached = await self._blocking(self.cache.get, endpoint, params)
+            if cached is not None:
+                return cached
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                response = await client.get(REPLIES_ENDPOINT, params=params)
+            except httpx.TransportError as e:
+                METRICS.record_error("fetch", e)
+                error: str = f"{type(e).__name__} - {e}"
+            else:
+                METRICS.record_response(
+                    REPLIES_ENDPOINT,
+                    response.status_code,
+                    time.perf_counter() - start,
+                    len(response.content),
+                )
+                if response.status_code == 200:
+                    data = response.json()
+                    if self.cache is not None:
+                        await self._blocking(self.cache.put, endpoint, params, data)
+                    return data
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                error = f"HTTP {response.status_code}"
+                if response.status_code == 429:
+                    self.bucket.pause(self._retry_after(response, attempt))
+
+            if attempt == self.max_retries:
+                raise RuntimeError(f"Retries exhausted, last error: {error}")
+
+            self.stats.retries += 1
+            METRICS.inc("http_retries_total", endpoint=REPLIES_ENDPOINT)
+            await asyncio.sleep(self._backoff(attempt))
+
+        raise AssertionError("unreachable")
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(60.0, 2**attempt) * (0.5 + random.random() / 2)
+
+    def _retry_after(self, response: httpx.Response, attempt: int) -> float:
+        try:
+            return float(response.headers["retry-after"])
+        except (KeyError, ValueError):
+            return self._backoff(attempt)
+
+
+def _frontier_items(
+    frontier: Frontier,
+    chunks: Iterable[list[str]],
+    retry_failed: bool = False,
+    page_size: int = 1000,
+) -> Iterator[tuple[str, str | None]]:
+    """Seed each chunk into ``frontier`` and yield its pending items in order.
+
+    Items left pending by earlier runs come first, then the new items of
+    every chunk as soon as it is seeded, walking the frontier in pages.
+    """
+    position = -1
+
+    def drain() -> Iterator[tuple[str, str | None]]:
+        nonlocal position
+        while page := frontier.pending_page(
+            after=position, limit=page_size, retry_failed=retry_failed
+        ):
+            position = page[-1][0]
+            for _, tweet_id, cursor in page:
+                yield tweet_id, cursor
+
+    yield from drain()
+    for chunk in chunks:
+        frontier.seed(chunk)
+        yield from drain()
+
+
+def get_tweet_replies(
+    tweet_ids: list[str] | Iterable[list[str]],
+    staging: Path,
+    base_url: str = TWITTER154_URL,
+    concurrency: int = 8,
+    rate: float = TWITTER154_RATE,
+    max_retries: int = 5,
+    max_pages: int | None = None,
+    frontier: Frontier | None = None,
+    retry_failed: bool = False,
+    cache: ResponseCache | None = None,
+    index: MembershipIndex | None = None,
+    writer: SegmentWriter | None = None,
+) -> FetchStats:
+    """Fetch the replies of ``tweet_ids`` into ``staging``.
+
+    Args:
+        tweet_ids (list[str] | Iterable[list[str]]): Tweet IDs, or chunks of
+            them consumed lazily as the fetch goes, e.g. from
+            ``PBWarehouse.iter_records``.
+        index (MembershipIndex | None): Index of the replies already staged,
+            defaults to the project's seen-tweets index. Pass another one
+            when fetching from a mock server.
+        writer (SegmentWriter | None): Writer to stage into instead of a new
+            one in ``staging`` using ``index``. It is flushed but left open.
+    """
+    chunks = [tweet_ids] if isinstance(tweet_ids, list) else tweet_ids
 
-        if "replies" not in data:
-            logger.error("No replies found in the response")
-            break
+    # src.config imports src.utils, so src.db can only be imported lazily here.
+    from src.db.membership import SEEN_TWEETS, MembershipIndex
+    from src.db.staging import SegmentWriter
 
-        replies = data["replies"]
+    owned = writer is None
+    if writer is None:
+        if index is None:
+            index = MembershipIndex(SEEN_TWEETS)
+        writer = SegmentWriter(staging, prefix="replies", index=index)
+    if frontier is not None:
+        frontier.before_flush = writer.flush
+        items = _frontier_items(frontier, chunks, retry_failed=retry_failed)
+    else:
+        items = ((tweet_id, None) for chunk in chunks for tweet_id in chunk)
 
-        if len(replies) == 0:
-            logger.warning(f"No replies found for tweet_id {tweet_id} in this request.")
+    fetcher = RepliesFetcher(
+        writer,
+        base_url=base_url,
+        concurrency=concurrency,
+        rate=rate,
+        max_retries=max_retries,
+        max_pages=max_pages,
+        frontier=frontier,
+        cache=cache,
+    )
+    try:
+        stats = asyncio.run(fetcher.run_items(items))
+    finally:
+        if owned:
+            writer.close()
+        else:
+            writer.flush()
+        if frontier is not None:
+            frontier.flush()
 
-        for tweet in replies:
-            json_filename = staging / f"{tweet['tweet_id']}.json"
-            with open(json_filename, "w", encoding="utf-8") as f:
-                json.dump(tweet, f, ensure_ascii=False, indent=4)
+    logger.info(
+        f"Fetched replies for {stats.tweets} tweets ({stats.failed} failed, "
+        f"{stats.replies} replies of which {stats.duplicates} already staged, "
+        f"{stats.pages} pages, {stats.retries} retries) "
+        f"in {stats.elapsed:.1f}s - {stats.tweets_per_sec:.2f} tweets/sec"
+    )
+    if cache is not None:
+        cache.log_stats()
+    return stats
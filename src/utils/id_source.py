@@ -0,0 +1,81 @@
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import polars as pl
+
+
+class IdSource:
+    """Tweet IDs packed into one contiguous ``uint64`` array.
+
+    A tweet ID costs 8 bytes here instead of a ~60 byte Python ``str``, and
+    ``chunks`` hands out views into the array, so scrapers only turn the IDs
+    of the batch they are about to request into strings.
+
+    Args:
+        ids (np.ndarray): Tweet IDs, converted to ``uint64`` if needed.
+    """
+
+    def __init__(self, ids: np.ndarray) -> None:
+        self.ids = np.ascontiguousarray(ids, dtype=np.uint64)
+
+    @classmethod
+    def from_file(
+        cls, path: Path, column: str = "tweetIds", keep_order: bool = True
+    ) -> "IdSource":
+        """Read a TAPS ID file and dedupe it.
+
+        The file is scanned lazily and cast to ``UInt64`` inside the query, so
+        the IDs are never held as strings. Rows that are not valid IDs are
+        dropped.
+
+        Args:
+            path (Path): CSV file with a ``column`` header.
+            column (str): Column holding the tweet IDs.
+            keep_order (bool): Keep the first occurrence of each ID in file
+                order, otherwise return the IDs sorted.
+        """
+        ids = (
+            pl.scan_csv(path, schema={column: pl.Utf8})
+            .select(pl.col(column).cast(pl.UInt64, strict=False))
+            .drop_nulls()
+            .collect(engine="streaming")
+            .to_series()
+            .to_numpy()
+        )
+        return cls(unique(ids, keep_order=keep_order))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: slice) -> "IdSource":
+        return IdSource(self.ids[index])
+
+    def chunks(self, size: int) -> Iterator[np.ndarray]:
+        """Yield consecutive views of at most ``size`` IDs, without copying."""
+        for start in range(0, len(self.ids), size):
+            yield self.ids[start : start + size]
+
+    def iter_strings(self, chunk_size: int = 10_000) -> Iterator[str]:
+        """Yield the IDs as strings, converting one chunk at a time."""
+        for chunk in self.chunks(chunk_size):
+            yield from as_strings(chunk)
+
+    def exclude(self, ids: np.ndarray) -> "IdSource":
+        """Return the IDs not in ``ids``, keeping their order."""
+        return IdSource(self.ids[~np.isin(self.ids, ids)])
+
+    def to_series(self, name: str = "tweetIds") -> pl.Series:
+        return pl.Series(name, self.ids)
+
+
+def unique(ids: np.ndarray, keep_order: bool = True) -> np.ndarray:
+    """Sort-unique ``ids``, optionally restoring the order of first occurrence."""
+    if not keep_order:
+        return np.unique(ids)
+    _, first = np.unique(ids, return_index=True)
+    return ids[np.sort(first)]
+
+
+def as_strings(chunk: np.ndarray) -> list[str]:
+    return chunk.astype(str).tolist()
@@ -0,0 +1,358 @@
+import bisect
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+from src.config import logger
+
+if TYPE_CHECKING:
+    import polars as pl
+
+# Upper bounds in seconds, shared by every latency histogram.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Labels = tuple[tuple[str, str], ...]
+
+SNAPSHOT_COLUMNS = ("name", "labels", "kind", "value", "count", "p50", "p95", "p99")
+
+
+class Histogram:
+    """Fixed-bucket histogram, as Prometheus would keep it."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Approximate the ``q`` quantile by the upper bound of its bucket."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound if bound != float("inf") else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Thread-safe registry of counters and latency histograms.
+
+    Every fetcher, writer and sink records into the module-level ``METRICS``
+    so one ``MetricsExporter`` can snapshot the whole run. Metric names
+    follow Prometheus conventions, e.g. ``http_requests_total`` with
+    ``endpoint`` and ``status`` labels.
+    """
+
+    def __init__(self) -> None:
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple[str, Labels]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_response(
+        self, endpoint: str, status: int, seconds: float, size: int = 0
+    ) -> None:
+        """Record one HTTP response of ``endpoint``."""
+        self.inc("http_requests_total", endpoint=endpoint, status=status)
+        self.observe("http_request_seconds", seconds, endpoint=endpoint)
+        if size:
+            self.inc("http_response_bytes_total", size, endpoint=endpoint)
+
+    def record_error(self, stage: str, error: BaseException | str) -> None:
+        error_class = error if isinstance(error, str) else type(error).__name__
+        self.inc("errors_total", stage=stage, error=error_class)
+
+    def snapshot(self) -> list[dict]:
+        """Return one row per counter and histogram."""
+        with self._lock:
+            rows = [
+                {
+                    "name": name,
+                    "labels": json.dumps(dict(labels)),
+                    "kind": "counter",
+                    "value": value,
+                    "count": None,
+                    "p50": None,
+                    "p95": None,
+                    "p99": None,
+                }
+                for (name, labels), value in self.counters.items()
+            ]
+            rows += [
+                {
+                    "name": name,
+                    "labels": json.dumps(dict(labels)),
+                    "kind": "histogram",
+                    "value": histogram.sum,
+                    "count": histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "p99": histogram.quantile(0.99),
+                }
+                for (name, labels), histogram in self.histograms.items()
+            ]
+        return rows
+
+    def to_prometheus(self) -> str:
+        """Render the registry in the Prometheus text exposition format."""
+
+        def render(labels: Labels, extra: dict | None = None) -> str:
+            pairs = [*labels, *(extra or {}).items()]
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in self.counters.items():
+                    if metric == name:
+                        lines.append(f"{name}{render(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in self.histograms.items():
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(
+                        (*histogram.buckets, "+Inf"), histogram.counts
+                    ):
+                        cumulative += count
+                        le = render(labels, {"le": bound})
+                        lines.append(f"{name}_bucket{le} {cumulative}")
+                    lines.append(f"{name}_sum{render(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{render(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+
+METRICS = Metrics()
+
+
+class MetricsExporter:
+    """Periodically write a ``Metrics`` snapshot to DuckDB and Prometheus.
+
+    Every ``interval`` seconds, and on ``close``, the snapshot is appended to
+    the ``metrics`` table of ``db_path`` under this run's ID and the
+    Prometheus text file at ``prom_path`` is rewritten, so a node exporter
+    textfile collector can scrape it.
+
+    Args:
+        command (str): Name of the command being measured, e.g. ``"ingest-data"``.
+        db_path (Path): DuckDB file holding the ``metrics`` table.
+        prom_path (Path | None): Prometheus text file, ``None`` to skip it.
+        interval (float): Seconds between exports.
+        metrics (Metrics): Registry to export.
+    """
+
+    def __init__(
+        self,
+        command: str,
+        db_path: Path,
+        prom_path: Path | None = None,
+        interval: float = 15.0,
+        metrics: Metrics = METRICS,
+    ) -> None:
+        self.command = command
+        self.db_path = Path(db_path)
+        self.prom_path = prom_path
+        self.interval = interval
+        self.metrics = metrics
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self) -> "MetricsExporter":
+        self._thread.start()
+        return self
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except Exception as e:
+                logger.warning(f"Metrics export failed: {type(e).__name__} - {e}")
+
+    def export(self) -> None:
+        rows = self.metrics.snapshot()
+        if not rows:
+            return
+        # Imported here so that starting the exporter does not slow CLI startup.
+        import duckdb
+
+        with self._lock:
+            exported_at = datetime.now()
+            connection = duckdb.connect(str(self.db_path))
+            try:
+                connection.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS metrics (
+                        run_id VARCHAR,
+                        command VARCHAR,
+                        started_at TIMESTAMP,
+                        exported_at TIMESTAMP,
+                        name VARCHAR,
+                        labels VARCHAR,
+                        kind VARCHAR,
+                        value DOUBLE,
+                        count BIGINT,
+                        p50 DOUBLE,
+                        p95 DOUBLE,
+                        p99 DOUBLE
+                    )
+                    """
+                )
+                connection.executemany(
+                    f"""
+                    INSERT INTO metrics (
+                        run_id, command, started_at, exported_at,
+                        {", ".join(SNAPSHOT_COLUMNS)}
+                    )
+                    VALUES ({", ".join("?" * (len(SNAPSHOT_COLUMNS) + 4))})
+                    """,
+                    [
+                        (
+                            self.run_id,
+                            self.command,
+                            self.started_at,
+                            exported_at,
+                            *(row[column] for column in SNAPSHOT_COLUMNS),
+                        )
+                        for row in rows
+                    ],
+                )
+            finally:
+                connection.close()
+
+            if self.prom_path is not None:
+                self.prom_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.prom_path.with_suffix(".tmp")
+                tmp.write_text(self.metrics.to_prometheus())
+                tmp.replace(self.prom_path)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        # Runs while the command exits, a failed export must not mask its error.
+        try:
+            self.export()
+        except Exception as e:
+            logger.warning(f"Metrics export failed: {type(e).__name__} - {e}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def summarize_run(
+    db_path: Path, run_id: str | None = None, command: str | None = None
+) -> tuple[dict, "pl.DataFrame"]:
+    """Summarize the last export of a run, by default the most recent one.
+
+    Returns:
+        tuple[dict, pl.DataFrame]: The run (ID, command, start, duration) and
+        one row per metric with its total, rate per second and latency
+        quantiles.
+    """
+    import duckdb
+    import polars as pl
+
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"No metrics recorded yet at {db_path}")
+    connection = duckdb.connect(str(db_path), read_only=True)
+    try:
+        runs = connection.execute(
+            """
+            SELECT run_id, command, started_at, MAX(exported_at) AS exported_at
+            FROM metrics
+            WHERE (? IS NULL OR run_id = ?) AND (? IS NULL OR command = ?)
+            GROUP BY ALL
+            ORDER BY started_at DESC
+            LIMIT 1
+            """,
+            (run_id, run_id, command, command),
+        ).fetchall()
+        if not runs:
+            raise ValueError("No matching run in the metrics table")
+        run_id, command, started_at, exported_at = runs[0]
+
+        summary = connection.execute(
+            """
+            SELECT
+                name,
+                labels,
+                CASE WHEN kind = 'histogram' THEN count ELSE value END AS total,
+                CASE WHEN kind = 'histogram' THEN value / NULLIF(count, 0) END AS mean,
+                p50,
+                p95,
+                p99
+            FROM metrics
+            WHERE run_id = ? AND exported_at = ?
+            ORDER BY name, labels
+            """,
+            (run_id, exported_at),
+        ).pl()
+    finally:
+        connection.close()
+
+    duration = max((exported_at - started_at).total_seconds(), 1e-9)
+    summary = summary.with_columns(
+        (pl.col("total") / duration).round(2).alias("per_sec")
+    ).select("name", "labels", "total", "per_sec", "mean", "p50", "p95", "p99")
+    run = {
+        "run_id": run_id,
+        "command": command,
+        "started_at": started_at,
+        "duration": duration,
+    }
+    return run, summary
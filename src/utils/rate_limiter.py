@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket rate limiter.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    Coroutines calling ``acquire`` wait until a token is available, so any
+    number of concurrent workers can share one bucket.
+
+    Args:
+        rate (float): Tokens added per second.
+        capacity (int | None): Maximum burst size. Defaults to ``ceil(rate)``.
+    """
+
+    def __init__(self, rate: float, capacity: int | None = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, int(rate + 0.999))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now <= self._updated:
+            # Still inside a pause, nothing accrues yet.
+            return
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """Wait until ``tokens`` tokens are available and consume them."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate, keeping the tokens accrued at the old rate."""
+        self._refill()
+        self.rate = rate
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds``, e.g. after an HTTP 429."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated = self._paused_until
@@ -0,0 +1,10 @@
+import pytest
+
+from benchmarks.mock_server import MockConfig, MockServer
+
+
+@pytest.fixture
+def mock_server():
+    """Mock Twitter/PocketBase server answering every request at once."""
+    with MockServer(MockConfig(pages=3, page_size=5)) as server:
+        yield server
@@ -0,0 +1,142 @@
+import os
+import signal
+import time
+
+import pytest
+
+from src.db import DB, BufferedSink
+
+
+@pytest.fixture
+def db(tmp_path):
+    with DB(tmp_path / "tweets.duckdb") as db:
+        yield db
+
+
+def rows(db: DB) -> list[tuple]:
+    return db.connection.execute("SELECT id, text FROM tweets ORDER BY id").fetchall()
+
+
+def test_flushes_full_batches(db):
+    with BufferedSink(db, "tweets", ["id", "text"], batch_size=3) as sink:
+        for i in range(7):
+            sink.add({"id": str(i), "text": f"tweet {i}", "lang": "en"})
+        assert len(rows(db)) == 6
+
+    assert len(rows(db)) == 7
+    assert sink.written == 7
+
+
+def test_written_leaves_out_ignored_conflicts(db):
+    with BufferedSink(db, "tweets", ["id", "text"], flush_interval=None) as sink:
+        for tweet_id in ["1", "2", "1", "3", "2"]:
+            sink.add({"id": tweet_id, "text": "same"})
+
+    assert sink.written == 3
+    assert len(rows(db)) == 3
+
+
+def test_bad_row_only_loses_itself(db):
+    db.connection.execute("INSERT INTO tweets (id, text) VALUES ('2', 'old')")
+
+    with BufferedSink(
+        db, "tweets", ["id", "text"], flush_interval=None, ignore_conflicts=False
+    ) as sink:
+        for i in range(4):
+            sink.add({"id": str(i), "text": "new"})
+
+    assert sink.written == 3
+    assert sink.failed == 1
+    assert rows(db) == [("0", "new"), ("1", "new"), ("2", "old"), ("3", "new")]
+
+
+def test_flushes_on_interval(db):
+    with BufferedSink(db, "tweets", ["id", "text"], flush_interval=0.05) as sink:
+        sink.add({"id": "1", "text": "tweet"})
+        deadline = time.monotonic() + 5
+        while sink.written == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert sink.written == 1
+
+
+def test_close_restores_signal_handlers(db):
+    before = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+
+    with BufferedSink(db, "tweets", ["id", "text"], flush_interval=None) as sink:
+        assert signal.getsignal(signal.SIGTERM) == sink._on_signal
+
+    assert (signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)) == before
+
+
+def test_sigterm_exits_through_close(db):
+    previous = signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        sink = BufferedSink(db, "tweets", ["id", "text"], flush_interval=None)
+        with pytest.raises(SystemExit) as exit_info, sink:
+            sink.add({"id": "1", "text": "tweet"})
+            assert signal.getsignal(signal.SIGTERM) == sink._on_signal
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(1)
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+    assert exit_info.value.code == 128 + signal.SIGTERM
+    assert sink.interrupted == signal.SIGTERM
+    assert rows(db) == [("1", "tweet")]
+
+
+@pytest.fixture
+def tweets(db):
+    db.execute(
+        """
+        INSERT INTO tweets (id, text, retweet_count)
+        SELECT i::VARCHAR, 'tweet ' || i, CASE WHEN i % 2 = 0 THEN i END
+        FROM range(1, 26) t(i)
+        """
+    )
+    return db
+
+
+def test_iter_batches_streams_bounded_frames(tweets):
+    frames = list(
+        tweets.iter_batches(
+            "tweets",
+            ["id", "retweet_count"],
+            where="retweet_count > ?",
+            order_by="retweet_count DESC",
+            limit=7,
+            params=(4,),
+            batch_size=3,
+        )
+    )
+
+    assert [len(frame) for frame in frames] == [3, 3, 1]
+    assert frames[0].columns == ["id", "retweet_count"]
+    assert frames[0]["retweet_count"].to_list() == [24, 22, 20]
+
+
+def test_select_rejects_unknown_names(tweets):
+    with pytest.raises(ValueError, match="Unknown table"):
+        next(tweets.iter_batches("nope"))
+    with pytest.raises(ValueError, match="Unknown columns in tweets: nope"):
+        next(tweets.iter_batches("tweets", ["id", "nope"]))
+
+
+def test_summarize_counts_nulls(tweets):
+    summary = tweets.summarize("tweets", ["id", "retweet_count"])
+
+    row = summary.filter(column="retweet_count").row(0, named=True)
+    assert (row["rows"], row["nulls"], row["min"], row["max"]) == (25, 13, "2", "24")
+
+
+def test_view_data_prints_pages_up_to_the_limit(tweets, capsys):
+    tweets.view_data(columns=["id"], order_by="id::INTEGER", limit=5, page_size=2)
+    pages = capsys.readouterr().out.count("shape:")
+
+    tweets.execute("INSERT INTO errors (id, error_type) VALUES ('1', 'Timeout')")
+    tweets.view_data("errors", summary=True)
+    summary = capsys.readouterr().out
+
+    assert pages == 3
+    assert "null_rate" in summary and "count" in summary
@@ -0,0 +1,64 @@
+import polars as pl
+import pytest
+
+from src.analytics.dedup import NearDuplicateIndex, near_duplicate_clusters
+from src.db import DB
+
+TEXTS = [
+    "Justice for George Floyd, share this everywhere and call your mayor today",
+    "justice for george floyd!! share this everywhere and call your mayor today",
+    "The protest downtown starts at noon, bring water and wear a mask",
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    with DB(tmp_path / "tweets.duckdb") as db:
+        yield db
+
+
+def insert(db: DB, texts: list[str]) -> None:
+    frame = pl.DataFrame(
+        {"id": [str(1000 + i) for i in range(len(texts))], "text": texts}
+    )
+    db.connection.register("frame", frame)
+    try:
+        db.connection.execute("INSERT INTO tweets (id, text) SELECT * FROM frame")
+    finally:
+        db.connection.unregister("frame")
+
+
+def test_update_hashes_every_batch(db):
+    # More tweets than one streamed batch, which used to stop after the first.
+    insert(db, [f"tweet number {i} about the march" for i in range(3000)])
+
+    with NearDuplicateIndex(db, num_perm=32, bands=8, workers=1) as index:
+        assert index.update(batch_size=700) == 3000
+        assert index.update(batch_size=700) == 0
+
+
+def test_near_duplicates_share_a_cluster(db):
+    insert(db, TEXTS)
+
+    with NearDuplicateIndex(db, workers=1) as index:
+        index.update()
+
+    rows = db.connection.execute("SELECT id, dup_cluster FROM tweets").fetchall()
+    clusters = dict(rows)
+    assert clusters["1000"] == clusters["1001"] == "1000"
+    assert clusters["1002"] == "1002"
+
+
+def test_changed_params_need_a_rebuild(db):
+    NearDuplicateIndex(db, num_perm=32, bands=8, workers=1).close()
+
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(db, num_perm=64, bands=8, workers=1).update()
+
+
+def test_near_duplicate_clusters_without_database():
+    frame = pl.DataFrame({"tweet_id": ["1", "2", "3"], "text": TEXTS})
+
+    clusters = near_duplicate_clusters(frame).sort("tweet_id")
+
+    assert clusters["dup_cluster"].to_list()[:2] == ["1", "1"]
@@ -0,0 +1,61 @@
+import pytest
+
+from src.db.frontier import DONE, FAILED, PENDING, Frontier
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    with Frontier("replies", db_path=tmp_path / "frontier.duckdb") as frontier:
+        yield frontier
+
+
+def test_seed_ignores_known_items(frontier):
+    assert frontier.seed(["1", "2", "3"]) == 3
+    assert frontier.seed(["3", "4"]) == 1
+    assert [item for _, item, _ in frontier.pending_page()] == ["1", "2", "3", "4"]
+
+
+def test_pending_page_walks_in_pages(frontier):
+    frontier.seed([str(i) for i in range(5)])
+
+    first = frontier.pending_page(limit=3)
+    second = frontier.pending_page(after=first[-1][0], limit=3)
+
+    assert [item for _, item, _ in first + second] == ["0", "1", "2", "3", "4"]
+
+
+def test_progress_is_buffered_until_flush(frontier):
+    frontier.seed(["1", "2", "3"])
+    frontier.checkpoint("1", "cursor-a")
+    frontier.complete("2")
+    frontier.fail("3", "rate limited")
+
+    assert frontier.count(PENDING) == 3
+    frontier.flush()
+    assert frontier.summary() == {PENDING: 1, DONE: 1, FAILED: 1}
+    assert frontier.pending() == [("1", "cursor-a")]
+    assert frontier.pending(retry_failed=True) == [("1", "cursor-a"), ("3", None)]
+
+
+def test_resume_after_close(tmp_path):
+    path = tmp_path / "frontier.duckdb"
+    with Frontier("replies", db_path=path) as frontier:
+        frontier.seed(["1", "2"])
+        frontier.checkpoint("1", "cursor-a")
+        frontier.complete("2")
+
+    with Frontier("replies", db_path=path) as frontier:
+        assert frontier.get_cursor("1") == "cursor-a"
+        assert frontier.pending() == [("1", "cursor-a")]
+        assert frontier.get_status("1") == PENDING
+        assert frontier.get_status("2") == DONE
+        assert frontier.get_status("3") is None
+
+
+def test_fail_stops_after_max_attempts(frontier):
+    frontier.seed(["1"])
+    for _ in range(3):
+        frontier.fail("1", "timeout")
+
+    assert frontier.pending(retry_failed=True) == []
+    assert frontier.pending(retry_failed=True, max_attempts=4) == [("1", None)]
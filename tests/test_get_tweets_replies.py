@@ -0,0 +1,71 @@
+import threading
+
+from src.db.frontier import DONE, PENDING, Frontier
+from src.db.membership import MembershipIndex
+from src.db.response_cache import ResponseCache
+from src.db.staging import SegmentReader, SegmentWriter
+from src.utils.get_tweets_replies import get_tweet_replies
+
+
+def fetch(server, tmp_path, frontier, **kwargs):
+    index = MembershipIndex("tweets", directory=tmp_path / "membership")
+    with SegmentWriter(tmp_path / "replies", prefix="replies", index=index) as writer:
+        return get_tweet_replies(
+            ["1", "2"],
+            writer.directory,
+            base_url=server.url,
+            rate=1_000.0,
+            frontier=frontier,
+            writer=writer,
+            **kwargs,
+        )
+
+
+def test_fetch_completes_every_tweet(mock_server, tmp_path):
+    with Frontier("replies", db_path=tmp_path / "frontier.duckdb") as frontier:
+        stats = fetch(mock_server, tmp_path, frontier)
+
+        assert stats.tweets == 2
+        assert stats.pages == 6
+        assert frontier.summary() == {DONE: 2}
+    assert SegmentReader(tmp_path / "replies").count() == 30
+
+
+def test_max_pages_leaves_the_rest_pending(mock_server, tmp_path):
+    path = tmp_path / "frontier.duckdb"
+    with Frontier("replies", db_path=path) as frontier:
+        fetch(mock_server, tmp_path, frontier, max_pages=2)
+
+        assert frontier.summary() == {PENDING: 2}
+        assert frontier.get_cursor("1") == "page-2"
+
+    # A restart fetches only the page that was cut off.
+    with Frontier("replies", db_path=path) as frontier:
+        stats = fetch(mock_server, tmp_path, frontier)
+
+        assert stats.pages == 2
+        assert frontier.summary() == {DONE: 2}
+    assert SegmentReader(tmp_path / "replies").count() == 30
+
+
+def test_cache_is_used_from_the_io_thread(mock_server, tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    threads = set()
+    for name in ("get", "put"):
+        method = getattr(cache, name)
+
+        def record(*args, method=method):
+            threads.add(threading.current_thread().name)
+            return method(*args)
+
+        setattr(cache, name, record)
+
+    fetch(mock_server, tmp_path, None, cache=cache)
+    stats = fetch(mock_server, tmp_path / "again", None, cache=cache)
+    cache.close()
+
+    assert stats.replies == 30
+    assert mock_server.state.requests == 6
+    assert cache.stats.hits == 6
+    assert len(threads) == 1
+    assert threads.pop().startswith("replies-io")
@@ -0,0 +1,46 @@
+import json
+
+from benchmarks.mock_server import TweetFactory
+from src.db.pb_warehouse import PBWriter
+from src.db.staging import SegmentWriter
+from src.pipeline.ingest import IngestPipeline, WorkUnit, process_unit
+
+
+def stage_files(directory, tweets: list[dict]) -> list:
+    paths = []
+    for tweet in tweets:
+        path = directory / f"{tweet['tweet_id']}.json"
+        path.write_text(json.dumps(tweet))
+        paths.append(path)
+    return paths
+
+
+def test_bad_files_do_not_drop_their_unit(tmp_path):
+    paths = stage_files(tmp_path, TweetFactory().tweets(3))
+    (tmp_path / "broken.json").write_text('{"tweet_id": "1", ')
+    (tmp_path / "list.json").write_text("[]")
+    unit = WorkUnit(files=[*paths, tmp_path / "broken.json", tmp_path / "list.json"])
+
+    batch = process_unit(unit)
+
+    assert len(batch.tweets) == 3
+    assert [error["error"].split(":")[0] for error in batch.errors] == [
+        "broken.json",
+        "list.json",
+    ]
+
+
+def test_pipeline_writes_segments_and_legacy_files(mock_server, tmp_path):
+    factory = TweetFactory(seed=1)
+    with SegmentWriter(tmp_path, prefix="search", flush_records=4) as writer:
+        writer.write_many(factory.tweets(10))
+    stage_files(tmp_path, factory.tweets(5))
+    (tmp_path / "broken.json").write_text("{")
+
+    with PBWriter(mock_server.url, batch_size=10) as writer:
+        stats = IngestPipeline(writer, workers=1).run(tmp_path)
+
+    assert stats.units == 4
+    assert stats.validated == 15
+    assert stats.invalid == 1
+    assert len(mock_server.state.collections["tweets"]) == 15
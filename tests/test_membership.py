@@ -0,0 +1,86 @@
+import numpy as np
+
+from benchmarks.mock_server import MockConfig, MockServer
+from src.db.membership import MembershipIndex
+from src.db.pb_warehouse import PBWriter
+from src.db.staging import SegmentWriter
+from src.utils.get_tweets_replies import get_tweet_replies
+
+
+def test_contains_any_id_form(tmp_path):
+    index = MembershipIndex("tweets", directory=tmp_path)
+    index.add(["10", 20, np.uint64(2**64 - 1), "not an id"])
+
+    assert index.contains(["10", "20", "30", "x", None]).tolist() == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+    assert 20 in index
+    assert "18446744073709551615" in index
+    assert "x" not in index
+    assert len(index) == 3
+
+
+def test_merges_into_a_sorted_file(tmp_path):
+    index = MembershipIndex("tweets", directory=tmp_path, merge_threshold=4)
+    index.add([5, 3, 9])
+    assert not index.path.exists()
+    index.add([3, 1])
+
+    assert np.fromfile(index.path, dtype=np.uint64).tolist() == [1, 3, 5, 9]
+    index.add([7])
+    index.close()
+
+    reopened = MembershipIndex("tweets", directory=tmp_path)
+    assert len(reopened) == 5
+    assert reopened.contains(np.array([1, 2, 7], dtype=np.uint64)).tolist() == [
+        True,
+        False,
+        True,
+    ]
+
+
+def test_staging_adds_flushed_ids(tmp_path):
+    index = MembershipIndex("tweets", directory=tmp_path / "membership")
+    with SegmentWriter(tmp_path / "staging", index=index) as writer:
+        writer.write({"tweet_id": "1"})
+        assert "1" not in index
+        writer.write({"response": {}}, ids=["2", "3"])
+
+    assert index.contains(["1", "2", "3"]).all()
+
+
+def test_pocketbase_skips_indexed_keys_across_runs(mock_server, tmp_path):
+    def write(tweet_ids: list[str]) -> PBWriter:
+        indexes = {"tweets": MembershipIndex("pb_tweets", directory=tmp_path)}
+        with PBWriter(mock_server.url, batch_size=10, indexes=indexes) as writer:
+            for tweet_id in tweet_ids:
+                writer.add("tweets", {"tweet_id": tweet_id, "text": "tweet"})
+        return writer
+
+    write(["1", "2"])
+    writer = write(["2", "3"])
+
+    assert writer.stats.written == 1
+    assert writer.stats.skipped == 1
+    assert len(mock_server.state.collections["tweets"]) == 3
+
+
+def test_replies_staged_before_are_skipped(tmp_path):
+    index = MembershipIndex("tweets", directory=tmp_path / "membership")
+
+    def fetch():
+        # A fresh server replays the same replies.
+        with MockServer(MockConfig(pages=2, page_size=5)) as server:
+            return get_tweet_replies(
+                ["1"], tmp_path / "replies", base_url=server.url, index=index
+            )
+
+    first, second = fetch(), fetch()
+
+    assert (first.replies, first.duplicates) == (10, 0)
+    assert (second.replies, second.duplicates) == (10, 10)
+    assert len(index) == 10
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from src.pipeline.normalize import (
+    DETAIL_SCHEMA,
+    TWEET_SCHEMA,
+    normalize,
+    normalize_tweety,
+    to_duckdb_tweets,
+)
+
+
+def graphql_tweet(tweet_id: str, **fields) -> dict:
+    return {
+        "rest_id": tweet_id,
+        "core": {
+            "user_results": {
+                "result": {"rest_id": "42", "legacy": {"screen_name": "someone"}}
+            }
+        },
+        "legacy": {
+            "full_text": f"tweet {tweet_id}",
+            "created_at": "Wed Jun 03 12:00:00 +0000 2020",
+            "user_id_str": "42",
+        },
+        **fields,
+    }
+
+
+def test_normalize_legacy_twttr_response():
+    # Legacy files hold the API result itself, without a "response" wrapper.
+    records = [
+        {"result": {"tweetResult": [{"result": graphql_tweet("1")}]}},
+        {"result": {"tweetResult": [{"result": graphql_tweet("2")}]}},
+        {"result": {"tweetResult": []}},
+    ]
+
+    batch = normalize(records)
+
+    assert batch.tweets["tweet_id"].to_list() == ["1", "2"]
+    assert batch.tweets.schema == TWEET_SCHEMA
+    assert batch.dropped == 1
+
+
+def test_normalize_staged_twttr_response():
+    records = [
+        {
+            "tweet_ids": ["1"],
+            "response": {"result": {"tweetResult": [{"result": graphql_tweet("1")}]}},
+        }
+    ]
+
+    batch = normalize(records)
+
+    assert batch.tweets["tweet_id"].to_list() == ["1"]
+    assert batch.users["username"].to_list() == ["someone"]
+
+
+def test_normalize_tweety_details():
+    payload = graphql_tweet(
+        "1",
+        hasModeratedReplies=True,
+        community_results={"result": {"name": "BLM"}},
+    )
+    payload["legacy"]["possibly_sensitive"] = True
+    replies = [[SimpleNamespace(id=2), SimpleNamespace(id=3)]]
+    tweets = [
+        SimpleNamespace(_tweet=payload, id=1, comments=replies),
+        SimpleNamespace(_tweet=graphql_tweet("4"), id=4, comments=[]),
+    ]
+
+    batch = normalize_tweety(tweets)
+    rows = to_duckdb_tweets(batch).sort("id").to_dicts()
+
+    assert batch.details.schema == DETAIL_SCHEMA
+    assert rows[0]["comments"] == "[2, 3]"
+    assert rows[0]["sensitive_flag"] is True
+    assert rows[0]["has_moderated_replies"] is True
+    assert rows[0]["community"] == "BLM"
+    assert rows[1]["comments"] == "[]"
+    assert rows[1]["sensitive_flag"] is False
+    assert rows[1]["community"] is None
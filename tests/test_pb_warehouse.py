@@ -0,0 +1,115 @@
+import io
+
+import pytest
+
+from benchmarks.mock_server import MockHandler, MockServer
+from src.db.pb_warehouse import PBWriter
+
+
+class StrictHandler(MockHandler):
+    """Rejects writes holding a ``"bad"`` record, optionally without a batch API."""
+
+    batch = True
+
+    def _handle(self, method: str) -> None:
+        raw = self.rfile.read(int(self.headers.get("content-length") or 0))
+        if self.path == "/api/batch" and not self.batch:
+            return self._send(404, {"message": "not found"})
+        if b'"bad":true' in raw:
+            return self._send(400, {"message": "invalid record"})
+        # Replay the body, then hand the connection's stream back for keep-alive.
+        connection, self.rfile = self.rfile, io.BytesIO(raw)
+        try:
+            super()._handle(method)
+        finally:
+            self.rfile = connection
+
+
+class NoBatchHandler(StrictHandler):
+    batch = False
+
+
+@pytest.fixture(params=[StrictHandler, NoBatchHandler], ids=["batch", "no-batch"])
+def server(request):
+    with MockServer() as server:
+        server.RequestHandlerClass = request.param
+        yield server
+
+
+def tweets(n: int, start: int = 0) -> list[dict]:
+    return [{"tweet_id": str(i), "text": f"tweet {i}"} for i in range(start, start + n)]
+
+
+def stored(server: MockServer, collection: str = "tweets") -> list[dict]:
+    return sorted(
+        server.state.collections.get(collection, {}).values(),
+        key=lambda record: int(record["tweet_id"]),
+    )
+
+
+def test_writes_every_record(server):
+    with PBWriter(server.url, concurrency=4, batch_size=20) as writer:
+        for record in tweets(50):
+            writer.add("tweets", record)
+
+    assert writer.stats.written == 50
+    assert writer.stats.failed == 0
+    assert [r["tweet_id"] for r in stored(server)] == [str(i) for i in range(50)]
+
+
+def test_uses_one_request_per_batch(mock_server):
+    with PBWriter(mock_server.url, batch_size=50) as writer:
+        for record in tweets(120):
+            writer.add("tweets", record)
+
+    assert writer.stats.requests == 3
+
+
+def test_bad_record_does_not_drop_its_batch(server):
+    records = tweets(10)
+    records[3]["bad"] = True
+
+    with PBWriter(server.url, batch_size=10) as writer:
+        for record in records:
+            writer.add("tweets", record)
+
+    assert writer.stats.written == 9
+    assert writer.stats.failed == 1
+    assert len(stored(server)) == 9
+
+
+def test_upsert_creates_updates_and_skips(mock_server):
+    with PBWriter(mock_server.url, batch_size=10) as writer:
+        for record in tweets(3):
+            writer.add("tweets", record)
+
+    changed = {"tweet_id": "1", "text": "edited"}
+    with PBWriter(mock_server.url, batch_size=10, upsert=True) as writer:
+        for record in [tweets(1)[0], changed, *tweets(1, start=3)]:
+            writer.add("tweets", record)
+
+    assert writer.stats.written == 1
+    assert writer.stats.updated == 1
+    assert writer.stats.skipped == 1
+    assert [r["text"] for r in stored(mock_server)] == [
+        "tweet 0",
+        "edited",
+        "tweet 2",
+        "tweet 3",
+    ]
+
+
+def test_upsert_drops_repeated_records_before_sending(mock_server):
+    user = {"user_id": "7", "username": "someone"}
+
+    with PBWriter(mock_server.url, batch_size=10, upsert=True) as writer:
+        for _ in range(5):
+            writer.add("tweet_users", user)
+        writer.flush()
+        requests = writer.stats.requests
+        writer.add("tweet_users", user)
+
+    assert writer.stats.written == 1
+    assert writer.stats.skipped == 5
+    assert writer.stats.requests == requests
+    assert len(mock_server.state.collections["tweet_users"]) == 1
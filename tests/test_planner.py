@@ -0,0 +1,72 @@
+import json
+from functools import partial
+
+import numpy as np
+import pytest
+
+from src.db import DB, planner
+from src.db.membership import MembershipIndex
+from src.db.planner import plan_remaining, staged_ids
+from src.db.staging import SegmentWriter
+from src.utils.id_source import IdSource
+
+
+def test_staged_ids_reads_indented_legacy_json(tmp_path):
+    # Legacy twttr files were written with ``json.dump(indent=4)``.
+    with open(tmp_path / "batch-0.json", "w") as f:
+        json.dump(
+            {
+                "tweet_ids": ["7", "8"],
+                "result": {"tweetResult": [{"result": {"rest_id": "9"}}]},
+            },
+            f,
+            indent=4,
+        )
+    with open(tmp_path / "batch-1.json", "w") as f:
+        json.dump([{"tweet_id": "10"}, {"tweet_id": 11}], f, indent=4)
+
+    assert staged_ids(tmp_path).sort().to_list() == [7, 8, 9, 10, 11]
+
+
+def test_staged_ids_reads_compact_json_and_segments(tmp_path):
+    (tmp_path / "batch.json").write_text('{"tweet_ids":["5","6"],"tweet_id":"6"}')
+    with SegmentWriter(tmp_path, prefix="replies") as writer:
+        writer.write_many([{"tweet_id": "123"}, {"tweet_id": "456"}])
+
+    assert staged_ids(tmp_path).sort().to_list() == [5, 6, 123, 456]
+
+
+def test_staged_ids_of_empty_directory(tmp_path):
+    assert staged_ids(tmp_path).is_empty()
+
+
+@pytest.fixture
+def done(tmp_path, monkeypatch):
+    """Tweets 1-2 stored, 3 failed, 4 staged and 5 in the seen index."""
+    with DB(tmp_path / "tweets.duckdb") as db:
+        db.execute("INSERT INTO tweets (id) VALUES ('1'), ('2')")
+        db.execute("INSERT INTO errors (id) VALUES ('3')")
+    (tmp_path / "staged").mkdir()
+    (tmp_path / "staged" / "4.json").write_text('{"tweet_id": "4"}')
+
+    index = partial(MembershipIndex, directory=tmp_path / "membership")
+    with index("tweets") as seen:
+        seen.add([5])
+    monkeypatch.setattr(planner, "MembershipIndex", index)
+    return {"db_path": tmp_path / "tweets.duckdb", "staged_dirs": [tmp_path / "staged"]}
+
+
+def plan(**kwargs) -> list[int]:
+    source = IdSource(np.arange(1, 11, dtype=np.uint64))
+    return plan_remaining(source, **kwargs).ids.tolist()
+
+
+def test_plan_remaining_skips_done_ids(done):
+    assert plan(**done) == [6, 7, 8, 9, 10]
+    assert plan(**done, skip_errors=False) == [3, 6, 7, 8, 9, 10]
+
+
+def test_plan_remaining_shards_are_disjoint(done):
+    shards = [plan(**done, order="id", shards=3, shard=shard) for shard in range(3)]
+
+    assert sorted(sum(shards, [])) == [6, 7, 8, 9, 10]
@@ -0,0 +1,83 @@
+import threading
+import time
+
+from benchmarks.mock_server import MockHandler, MockServer
+from src.db.response_cache import ResponseCache
+from src.scraper.RapidApi import RapidApi
+
+API_KEY = "x" * 50
+
+
+class RetryAfterHandler(MockHandler):
+    """Answers the first request with a 429 asking to wait 1.5 seconds."""
+
+    def _handle(self, method: str) -> None:
+        self.server.sent.append(time.monotonic())
+        if len(self.server.sent) == 1:
+            return self._send(429, {"message": "slow down"}, retry_after=1.5)
+        super()._handle(method)
+
+
+def batches(n: int, size: int = 3) -> list[list[str]]:
+    return [[str(i * size + j) for j in range(size)] for i in range(n)]
+
+
+def test_run_batches_writes_results_on_the_io_thread(mock_server):
+    api = RapidApi(api_key=API_KEY, base_url=mock_server.url, rate=1_000.0)
+    results, threads = [], set()
+
+    def on_result(result) -> None:
+        results.append(result)
+        threads.add(threading.current_thread().name)
+
+    api.run_batches(batches(6), on_result, concurrency=3)
+
+    assert sorted(tuple(r.tweet_ids) for r in results) == sorted(
+        tuple(batch) for batch in batches(6)
+    )
+    assert all(r.ok and len(r.data["result"]["tweetResult"]) == 3 for r in results)
+    assert len(threads) == 1
+    assert threads.pop().startswith("rapidapi-io")
+
+
+def test_requests_are_rate_limited(mock_server):
+    api = RapidApi(api_key=API_KEY, base_url=mock_server.url, rate=20.0)
+
+    start = time.perf_counter()
+    api.run_batches(batches(10), lambda result: None, concurrency=4)
+
+    # Four requests go out at once, the other six wait for tokens.
+    assert time.perf_counter() - start >= 0.25
+    assert mock_server.state.requests == 10
+
+
+def test_429_waits_for_retry_after():
+    with MockServer() as server:
+        server.RequestHandlerClass = RetryAfterHandler
+        server.sent = []
+        api = RapidApi(api_key=API_KEY, base_url=server.url, rate=1_000.0)
+        results = []
+
+        api.run_batches(batches(1), results.append)
+
+    assert results[0].ok
+    assert results[0].attempts == 2
+    # The backoff alone would have retried within a second.
+    assert server.sent[1] - server.sent[0] >= 1.4
+
+
+def test_cached_batches_are_not_requested_again(mock_server, tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    api = RapidApi(
+        api_key=API_KEY, base_url=mock_server.url, rate=1_000.0, cache=cache
+    )
+    first, second = [], []
+
+    api.run_batches(batches(3), first.append)
+    requests = mock_server.state.requests
+    api.run_batches(batches(3), second.append)
+    cache.close()
+
+    assert mock_server.state.requests == requests == 3
+    assert sorted(r.tweet_ids for r in first) == sorted(r.tweet_ids for r in second)
+    assert all(r.ok for r in second)
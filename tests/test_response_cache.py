@@ -0,0 +1,67 @@
+import pytest
+
+from src.db import response_cache
+from src.db.response_cache import ResponseCache
+
+URL = "https://api.test/search"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock.time)
+    return clock
+
+
+def test_round_trip_ignores_param_order(tmp_path):
+    with ResponseCache(tmp_path / "cache.sqlite") as cache:
+        cache.put(URL, {"q": "blm", "page": 2, "lang": None}, {"results": [1, 2]})
+
+        assert cache.get(URL, {"page": "2", "q": "blm"}) == {"results": [1, 2]}
+        assert cache.get(URL, {"page": "3", "q": "blm"}) is None
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    with ResponseCache(tmp_path / "cache.sqlite", ttl=60) as cache:
+        cache.put(URL, {"page": 1}, {"page": 1})
+        clock.now += 60
+        assert cache.get(URL, {"page": 1}) == {"page": 1}
+        clock.now += 1
+        assert cache.get(URL, {"page": 1}) is None
+
+    with ResponseCache(tmp_path / "cache.sqlite", ttl=None) as cache:
+        assert cache.get(URL, {"page": 1}) == {"page": 1}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    path = tmp_path / "cache.sqlite"
+    with ResponseCache(path) as cache:
+        cache.put(URL, {"page": 0}, {"page": 0})
+        size = cache._size
+    path.unlink()
+
+    # Room for three entries; the fourth trims the cache to two.
+    with ResponseCache(path, max_bytes=3 * size) as cache:
+        for page in range(3):
+            clock.now += 1
+            cache.put(URL, {"page": page}, {"page": page})
+        clock.now += 1
+        cache.get(URL, {"page": 0})
+        clock.now += 1
+        cache.put(URL, {"page": 3}, {"page": 3})
+
+        assert cache.stats.evicted == 2
+        cached = [cache.get(URL, {"page": page}) is not None for page in range(4)]
+        assert cached == [True, False, False, True]
+
+    with ResponseCache(path, max_bytes=3 * size) as cache:
+        assert cache._size == 2 * size
@@ -0,0 +1,108 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from src.analytics.search_index import SearchIndex, decode_varint, encode_varint
+from src.db import DB
+
+TWEETS = pl.DataFrame(
+    {
+        "tweet_id": [str(i) for i in range(1, 9)],
+        "text": [
+            "Protest downtown #BlackLivesMatter",
+            "March on city hall #blacklivesmatter @cnn",
+            "protest march tonight",
+            "#AllLivesMatter counter protest",
+            "Peaceful protest https://t.co/protest",
+            "Nothing to see here",
+            "@CNN coverage of the march",
+            "black lives matter protest",
+        ],
+    }
+)
+
+
+def brute_force(required: list[set[str]], excluded: set[str] = frozenset()):
+    """IDs of the tweets having a term of every set and none of ``excluded``."""
+    matches = []
+    for row in TWEETS.iter_rows(named=True):
+        terms = set(row["text"].lower().replace("https://t.co/protest", "").split())
+        if all(terms & alternatives for alternatives in required) and not (
+            terms & excluded
+        ):
+            matches.append(row["tweet_id"])
+    return sorted(matches, key=int, reverse=True)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(root=tmp_path / "search", max_segments=2)
+    for start in range(0, len(TWEETS), 3):
+        index.add(TWEETS.slice(start, 3))
+    return index
+
+
+@pytest.mark.parametrize(
+    "query, required, excluded",
+    [
+        ("protest", [{"protest"}], set()),
+        ("protest march", [{"protest"}, {"march"}], set()),
+        ("protest|march", [{"protest", "march"}], set()),
+        ("#blacklivesmatter -@cnn", [{"#blacklivesmatter"}], {"@cnn"}),
+        ("march -protest", [{"march"}], {"protest"}),
+    ],
+)
+def test_search_matches_brute_force(index, query, required, excluded):
+    result = index.search(query)
+
+    assert result.tweet_ids == brute_force(required, excluded)
+    assert result.count == len(result.tweet_ids)
+
+
+def test_update_only_indexes_new_tweets(tmp_path):
+    index = SearchIndex(root=tmp_path / "search")
+    index.add(TWEETS.head(3))
+
+    with DB(tmp_path / "tweets.duckdb") as db:
+        db.connection.register("frame", TWEETS)
+        try:
+            db.connection.execute(
+                "INSERT INTO tweets (id, text) SELECT tweet_id, text FROM frame"
+            )
+        finally:
+            db.connection.unregister("frame")
+
+        assert index.update(db, batch_size=2) == 5
+        assert index.update(db) == 0
+    assert index.search("protest").tweet_ids == brute_force([{"protest"}])
+
+
+def test_add_skips_nothing_and_merges(index):
+    assert len(index) == len(TWEETS)
+    assert len(index.segments) <= 2
+    assert index.indexed().tolist() == list(range(1, 9))
+    assert index.count("protest") == 5
+
+
+def test_reopened_index_answers_the_same(index):
+    reopened = SearchIndex(root=index.root)
+
+    assert reopened.search("protest").tweet_ids == index.search("protest").tweet_ids
+
+
+def test_links_are_not_indexed(index):
+    assert index.search("t").count == 0
+
+
+def test_query_needs_a_required_term(index):
+    with pytest.raises(ValueError):
+        index.search("-protest")
+
+
+def test_varint_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2**35, 2**64 - 1], dtype=np.uint64)
+
+    encoded = encode_varint(values)
+
+    assert len(encoded) == 1 + 1 + 1 + 2 + 2 + 6 + 10
+    assert decode_varint(encoded).tolist() == values.tolist()
@@ -0,0 +1,76 @@
+import json
+
+from src.db.staging import MANIFEST, SegmentReader, SegmentWriter, iter_staged_records
+
+
+def records(n: int, start: int = 0) -> list[dict]:
+    return [{"tweet_id": str(i), "text": f"tweet {i}"} for i in range(start, start + n)]
+
+
+def test_round_trip_in_write_order(tmp_path):
+    with SegmentWriter(tmp_path, flush_records=10) as writer:
+        writer.write_many(records(25))
+
+    reader = SegmentReader(tmp_path)
+    assert [entry["count"] for entry in reader.entries()] == [10, 10, 5]
+    assert reader.count() == 25
+    assert list(reader) == records(25)
+    assert [len(batch) for batch in reader.iter_batches(batch_size=12)] == [12, 12, 1]
+
+
+def test_entries_skip_frames_outside_the_id_range(tmp_path):
+    with SegmentWriter(tmp_path, flush_records=10) as writer:
+        writer.write_many(records(30))
+
+    reader = SegmentReader(tmp_path)
+    assert [e["min_id"] for e in reader.entries(min_id=12, max_id=15)] == ["10"]
+    frames = list(reader.iter_dataframes(min_id=20))
+    assert [frame["tweet_id"].to_list() for frame in frames] == [
+        [str(i) for i in range(20, 30)]
+    ]
+
+
+def test_ids_of_whole_responses(tmp_path):
+    with SegmentWriter(tmp_path, id_field=None) as writer:
+        writer.write({"response": {}}, ids=["5", "9"])
+
+    (entry,) = SegmentReader(tmp_path).entries()
+    assert (entry["min_id"], entry["max_id"]) == ("5", "9")
+
+
+def test_segments_rotate_and_resume_numbering(tmp_path):
+    writer = SegmentWriter(tmp_path, prefix="replies", flush_records=5, max_bytes=1)
+    with writer:
+        writer.write_many(records(10))
+    with SegmentWriter(tmp_path, prefix="replies") as writer:
+        writer.write_many(records(5, start=10))
+
+    segments = sorted(path.name for path in tmp_path.glob("*.zst"))
+    assert segments == [f"replies-{i:06d}.ndjson.zst" for i in (1, 2, 3)]
+    assert list(SegmentReader(tmp_path, prefix="replies")) == records(15)
+    assert list(SegmentReader(tmp_path, prefix="search")) == []
+
+
+def test_data_missing_from_the_manifest_is_not_read(tmp_path):
+    with SegmentWriter(tmp_path) as writer:
+        writer.write_many(records(3))
+        writer.flush()
+        # A frame on disk whose manifest line was never written...
+        writer.write_many(records(3, start=3))
+        writer.flush()
+    manifest = tmp_path / MANIFEST
+    lines = manifest.read_text().splitlines()
+    # ...and a torn line of an interrupted writer.
+    manifest.write_text(lines[0] + "\n" + lines[1][:10])
+
+    assert list(SegmentReader(tmp_path)) == records(3)
+
+
+def test_staged_records_include_legacy_files(tmp_path):
+    with SegmentWriter(tmp_path) as writer:
+        writer.write_many(records(2))
+    (tmp_path / "2.json").write_text(json.dumps(records(1, start=2)[0]))
+    (tmp_path / "3.json").write_text("{not json")
+
+    staged = [r for batch in iter_staged_records(tmp_path) for r in batch]
+    assert staged == records(3)